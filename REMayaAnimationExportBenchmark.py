@@ -0,0 +1,401 @@
+# RE Maya Animation Export Tool - Benchmark
+#
+# 不需要Maya: 用记录调用、可模拟延迟的maya.cmds / maya.mel替身测量导出工具自身的开销
+#
+# 用法:
+#   python REMayaAnimationExportBenchmark.py                      运行并输出结果
+#   python REMayaAnimationExportBenchmark.py --check              和基准比较，变慢时返回1
+#   python REMayaAnimationExportBenchmark.py --update-baselines   把本次结果写入基准文件
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+
+# 默认的片段数量
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+# 基准文件
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baselines.json")
+# 每个测试重复的次数（取最快的一次）
+DEFAULT_REPEAT = 3
+# 参考负载解析的Noesis行
+REFERENCE_PATTERN = re.compile(r"^@ (\d+) '(.+) \((\d+) frames\) ID: (\d+)'$")
+
+
+class FakeMaya:
+    """maya.cmds / maya.mel / OpenMaya的替身: 记录每次调用，可为每次调用模拟固定延迟"""
+
+    # 匹配FBX选项的设置和查询
+    SET_PATTERN = re.compile(r'^(FBX\w+(?: "[^"]*")?) -v (\S+)$')
+    QUERY_PATTERN = re.compile(r'`(FBX\w+(?: "[^"]*")?) -q`')
+
+    def __init__(self, latency=0.0, write_files=False):
+        self.latency = latency
+        self.write_files = write_files
+        self.cmds_calls = 0
+        self.mel_calls = 0
+        # 导出选项的当前值（查询时返回）
+        self.fbx_settings = {}
+        # OpenMaya DAG迭代器返回的节点: (路径, 可见, 中间对象)
+        self.dag_nodes = [('|rig', True, False), ('|rig|mesh', True, False)]
+
+    def wait(self):
+        """模拟一次命令往返的延迟"""
+        if self.latency:
+            time.sleep(self.latency)
+
+    def reset_counters(self):
+        self.cmds_calls = 0
+        self.mel_calls = 0
+
+    def cmds_command(self, name):
+        """maya.cmds中的命令"""
+        returns = {
+            'ls': lambda *args, **kwargs: ['|rig'],
+            'listRelatives': lambda *args, **kwargs: [],
+            'keyframe': lambda *args, **kwargs: [],
+            'pluginInfo': lambda *args, **kwargs: True,
+            'ogs': lambda *args, **kwargs: False,
+        }
+        result = returns.get(name)
+
+        def command(*args, **kwargs):
+            self.cmds_calls += 1
+            self.wait()
+            return result(*args, **kwargs) if result else None
+        return command
+
+    def mel_eval(self, script):
+        """maya.mel.eval: 记录FBX选项，FBXExport时按需写出文件"""
+        self.mel_calls += 1
+        self.wait()
+
+        values = []
+        for command in script.rstrip(';').split(';\n'):
+            command = command.strip()
+            match = self.SET_PATTERN.match(command)
+            if match:
+                value = match.group(2)
+                self.fbx_settings[match.group(1)] = {'true': '1', 'false': '0'}.get(value, value)
+                continue
+            match = self.QUERY_PATTERN.search(command)
+            if match:
+                values.append(self.fbx_settings.get(match.group(1), ''))
+                continue
+            if command.startswith('FBXExport -f "') and self.write_files:
+                path = command[len('FBXExport -f "'):].split('"')[0]
+                with open(path, 'wb') as f:
+                    f.write(b'Kaydara FBX Binary  \x00')
+            elif command.startswith('currentTimeUnitToFPS'):
+                return 30.0
+        return values or None
+
+    def install(self):
+        """把替身模块放入sys.modules（必须在导入导出工具之前）"""
+        fake = self
+
+        maya_module = types.ModuleType('maya')
+        cmds_module = types.ModuleType('maya.cmds')
+        cmds_module.__getattr__ = self.cmds_command
+        mel_module = types.ModuleType('maya.mel')
+        mel_module.eval = self.mel_eval
+        standalone_module = types.ModuleType('maya.standalone')
+        standalone_module.initialize = lambda *args, **kwargs: None
+        api_module = types.ModuleType('maya.api')
+
+        class MFn:
+            kTransform = 1
+            kAnimCurveTimeToAngular = 2
+            kAnimCurveTimeToDistance = 3
+            kAnimCurveTimeToTime = 4
+            kAnimCurveTimeToUnitless = 5
+
+        class MItDag:
+            kDepthFirst = 0
+
+            def __init__(self, *args):
+                self.index = 0
+
+            def reset(self, *args):
+                self.index = 0
+
+            def isDone(self):
+                return self.index >= len(fake.dag_nodes)
+
+            def next(self):
+                self.index += 1
+
+            def currentItem(self):
+                return fake.dag_nodes[self.index]
+
+            def fullPathName(self):
+                return fake.dag_nodes[self.index][0]
+
+            def getPath(self):
+                return fake.dag_nodes[self.index][0]
+
+        class Plug:
+            def __init__(self, value):
+                self.value = value
+
+            def asBool(self):
+                return self.value
+
+        class MFnDagNode:
+            def __init__(self, item):
+                self.item = item
+
+            def findPlug(self, name, want_networked):
+                return Plug(self.item[1])
+
+            @property
+            def isIntermediateObject(self):
+                return self.item[2]
+
+        class Messages:
+            """DAG / DG消息回调"""
+            next_id = 0
+
+            @classmethod
+            def add(cls, *args):
+                cls.next_id += 1
+                return cls.next_id
+
+            addAllDagChangesCallback = add
+            addNodeAddedCallback = add
+            addNodeRemovedCallback = add
+
+            @staticmethod
+            def removeCallbacks(ids):
+                pass
+
+        open_maya = types.ModuleType('maya.api.OpenMaya')
+        open_maya.MFn = MFn
+        open_maya.MItDag = MItDag
+        open_maya.MFnDagNode = MFnDagNode
+        open_maya.MDagMessage = Messages
+        open_maya.MDGMessage = Messages
+        open_maya.MMessage = Messages
+        open_maya_anim = types.ModuleType('maya.api.OpenMayaAnim')
+
+        maya_module.cmds = cmds_module
+        maya_module.mel = mel_module
+        maya_module.standalone = standalone_module
+        maya_module.api = api_module
+        api_module.OpenMaya = open_maya
+        api_module.OpenMayaAnim = open_maya_anim
+        sys.modules.update({
+            'maya': maya_module,
+            'maya.cmds': cmds_module,
+            'maya.mel': mel_module,
+            'maya.standalone': standalone_module,
+            'maya.api': api_module,
+            'maya.api.OpenMaya': open_maya,
+            'maya.api.OpenMayaAnim': open_maya_anim,
+        })
+
+
+def synthetic_noesis_list(clip_count, blend_pose_every=20):
+    """生成Noesis输出格式的动画列表，夹杂blend pose条目和无关的日志行"""
+    lines = ["Noesis RE_MESH animation export"]
+    start_frame = 0
+    for i in range(clip_count):
+        if blend_pose_every and i % blend_pose_every == blend_pose_every - 1:
+            name = f"ch00_blend{i % 4}_upper_pose_{i:06d}"
+            frame_count = 2
+        else:
+            name = f"ch00_{i:06d}_locomotion"
+            frame_count = 30 + i % 90
+        lines.append(f"@ {start_frame} '{name} ({frame_count} frames) ID: {i}'")
+        start_frame += frame_count
+        if i % 100 == 0:
+            lines.append(f"Exported {i} animations")
+    return '\n'.join(lines) + '\n'
+
+
+def reference_workload(text):
+    """参考负载: 用最简单的纯Python方式逐行解析列表（每个片段一次正则匹配和一个字典）
+
+    每个测试的吞吐量除以同一次运行中参考负载的吞吐量，得到和机器速度无关的相对速度。
+    """
+    records = []
+    for line in text.split('\n'):
+        match = REFERENCE_PATTERN.match(line)
+        if match:
+            records.append({'name': match.group(2), 'start_frame': int(match.group(1)),
+                            'frame_count': int(match.group(3)), 'id': int(match.group(4))})
+    return records
+
+
+def measure(function, with_memory, setup=None):
+    """运行一次function，返回(结果, 耗时, 内存峰值)；setup在计时之前调用"""
+    if setup is not None:
+        setup()
+    gc.collect()
+    if with_memory:
+        tracemalloc.start()
+    start_time = time.perf_counter()
+    try:
+        # 导出工具逐个片段输出日志，测量时丢弃
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            result = function()
+    finally:
+        elapsed = time.perf_counter() - start_time
+        peak = None
+        if with_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run_case(fake, function, clip_count, setup=None, repeat=DEFAULT_REPEAT):
+    """测量一个场景: 先测耗时（重复repeat次取最快的一次），再在tracemalloc下测内存峰值"""
+    fake.reset_counters()
+    _, elapsed, _ = measure(function, False, setup)
+    cmds_calls, mel_calls = fake.cmds_calls, fake.mel_calls
+    for _ in range(repeat - 1):
+        elapsed = min(elapsed, measure(function, False, setup)[1])
+    _, _, peak = measure(function, True, setup)
+    return {
+        'seconds': round(elapsed, 6),
+        'clips_per_second': round(clip_count / elapsed, 1) if elapsed else None,
+        'peak_bytes': peak,
+        'mel_calls_per_clip': round(mel_calls / clip_count, 4),
+        'cmds_calls_per_clip': round(cmds_calls / clip_count, 4),
+    }
+
+
+def run_benchmarks(sizes, latency=0.0, write_files=False, export_limit=None, repeat=DEFAULT_REPEAT):
+    """运行所有基准测试，返回{测试名称: {片段数: 指标}}
+
+    每个指标中的relative_speed为吞吐量相对于同样片段数的参考负载（reference）的倍数。
+    """
+    fake = FakeMaya(latency=latency, write_files=write_files)
+    fake.install()
+    import REMayaAnimationExportTool as tool
+
+    results = {'reference': {}, 'parse': {}, 'relayout': {}, 'export': {}}
+    for clip_count in sizes:
+        text = synthetic_noesis_list(clip_count)
+        exporter = tool.AnimationExporter()
+        cases = {}
+
+        cases['reference'] = run_case(fake, lambda: reference_workload(text), clip_count, repeat=repeat)
+        cases['parse'] = run_case(fake, lambda: exporter.parse_animation_text(text), clip_count, repeat=repeat)
+
+        # 每次都从还没有重新排列的片段表开始
+        def unordered_table():
+            exporter.animation_data = tool.ClipTable.from_records(tool.iter_noesis_clips(text.split('\n')))
+        cases['relayout'] = run_case(fake, exporter.fix_blend_pose_frames, clip_count, unordered_table, repeat)
+
+        if not (export_limit and clip_count > export_limit):
+            with tempfile.TemporaryDirectory(prefix="re_anim_benchmark_") as export_path:
+                animations = exporter.animation_data
+                cases['export'] = run_case(
+                    fake, lambda: exporter.export_animations(animations, export_path), clip_count, repeat=repeat)
+
+        reference_rate = cases['reference']['clips_per_second']
+        for benchmark, stats in cases.items():
+            stats['relative_speed'] = round(stats['clips_per_second'] / reference_rate, 4) \
+                if stats['clips_per_second'] and reference_rate else None
+            results[benchmark][str(clip_count)] = stats
+    return results
+
+
+def check_against_baselines(results, baselines, tolerance):
+    """和基准比较，返回变慢的项目
+
+    相对速度（相对于参考负载，不受机器速度影响）低于基准(1-tolerance)倍、
+    内存峰值高于基准(1+tolerance)倍、或每个片段的命令往返次数增加时视为变慢。
+    clips_per_second是记录基准的机器上的数值，只作参考，不比较。
+    """
+    regressions = []
+    for benchmark, cases in baselines.items():
+        for clip_count, expected in cases.items():
+            actual = results.get(benchmark, {}).get(clip_count)
+            if actual is None:
+                continue
+            label = f"{benchmark}[{clip_count}]"
+
+            if expected.get('relative_speed') and actual['relative_speed'] is not None and \
+                    actual['relative_speed'] < expected['relative_speed'] * (1 - tolerance):
+                regressions.append(f"{label}: {actual['relative_speed']}x the reference, "
+                                   f"baseline {expected['relative_speed']}x")
+            if expected.get('peak_bytes') and actual['peak_bytes'] > expected['peak_bytes'] * (1 + tolerance):
+                regressions.append(f"{label}: peak {actual['peak_bytes']} bytes, baseline {expected['peak_bytes']}")
+            for key in ('mel_calls_per_clip', 'cmds_calls_per_clip'):
+                if actual[key] > expected[key] + 1e-6:
+                    regressions.append(f"{label}: {actual[key]} {key}, baseline {expected[key]}")
+    return regressions
+
+
+def print_results(results):
+    """输出结果表格"""
+    print(f"{'benchmark':<10} {'clips':>7} {'seconds':>9} {'clips/s':>11} {'relative':>9} {'peak MB':>8} "
+          f"{'mel/clip':>9} {'cmds/clip':>9}")
+    for benchmark, cases in results.items():
+        for clip_count, stats in cases.items():
+            print(f"{benchmark:<10} {clip_count:>7} {stats['seconds']:>9.3f} {stats['clips_per_second'] or 0:>11.0f} "
+                  f"{stats['relative_speed'] or 0:>9.3f} {stats['peak_bytes'] / 1e6:>8.2f} "
+                  f"{stats['mel_calls_per_clip']:>9.3f} {stats['cmds_calls_per_clip']:>9.3f}")
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(
+        prog="REMayaAnimationExportBenchmark",
+        description="Benchmark the RE Maya Animation Export Tool against a stand-in for maya.cmds / maya.mel"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Numbers of clips in the synthetic lists (default: 100 1000 10000 100000)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Simulated seconds per cmds / mel round-trip (default: 0)")
+    parser.add_argument("--write-files", action="store_true",
+                        help="Write a small file for every FBXExport instead of only recording the call")
+    parser.add_argument("--export-limit", type=int, default=None,
+                        help="Skip the export benchmark for lists longer than this")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="Runs per case, the fastest is kept (default: 3)")
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--baselines", default=BASELINES_PATH, help="Baselines file")
+    parser.add_argument("--check", action="store_true", help="Fail if the results are slower than the baselines")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed drop of the speed relative to the reference workload, and memory growth, "
+                             "for --check (default: 0.5)")
+    parser.add_argument("--update-baselines", action="store_true", help="Write the results to the baselines file")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.latency, args.write_files, args.export_limit, max(args.repeat, 1))
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baselines:
+        with open(args.baselines, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baselines written to {args.baselines}")
+
+    if args.check:
+        with open(args.baselines, 'r', encoding='utf-8') as f:
+            baselines = json.load(f)
+        regressions = check_against_baselines(results, baselines, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+        print("No regressions against the baselines")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
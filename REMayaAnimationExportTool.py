@@ -2,25 +2,2651 @@
 # Version: v0.12
 # Last Release: June 4, 2025
 # Author: AtomAntzzz
+#
+# 用法:
+#   Maya中: 在Script Editor中运行本脚本打开工具窗口
+#   批处理: mayapy REMayaAnimationExportTool.py export --job scene.mb list.txt --output D:/export
+#   重定时: mayapy REMayaAnimationExportTool.py retime --scene scene.mb --source-fps 30 --target-fps 60 --in-place
+#   导出服务: mayapy REMayaAnimationExportTool.py serve，然后 python REMayaAnimationExportTool.py submit --job scene.mb list.txt --output D:/export
+#   离线拆分: python REMayaAnimationExportTool.py split --source timeline.fbx --list list.txt --output D:/export
 
-import maya.cmds as cmds
-import maya.mel as mel
+try:
+    import maya.cmds as cmds
+    import maya.mel as mel
+    import maya.api.OpenMaya as om
+    import maya.api.OpenMayaAnim as oma
+except ImportError:
+    # 不在Maya中运行（例如离线拆分FBX），只能使用不依赖Maya的功能
+    cmds = None
+    mel = None
+    om = None
+    oma = None
+try:
+    import numpy as np
+except ImportError:
+    # 没有NumPy时使用纯Python实现
+    np = None
+try:
+    # Maya 2025及以后使用PySide6
+    from PySide6 import QtWidgets
+except ImportError:
+    try:
+        from PySide2 import QtWidgets
+    except ImportError:
+        # 不在Maya界面中运行，不处理界面事件
+        QtWidgets = None
+import argparse
+import array
+import base64
+import bisect
+import contextlib
+import glob
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import mmap
+import multiprocessing
 import re
 import os
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+
+# 匹配Noesis插件fmt_RE_MESH.py中输出的格式
+NOESIS_LINE_PATTERN = re.compile(r'@\s*(\d+)\s*[\'"]([^\'\"]*)\s*\((\d+)\s*frames\).*ID:\s*(\d+)')
+
+
+class ParseSummary:
+    """Noesis列表的解析统计，收集无法解析的行而不是逐行输出"""
+
+    # 最多保留的错误行示例数
+    MAX_ERROR_SAMPLES = 10
+
+    def __init__(self):
+        self.line_count = 0
+        self.clip_count = 0
+        self.error_count = 0
+        # [(行号, 行内容), ...]
+        self.error_samples = []
+
+    def add_error(self, line_number, line):
+        """记录一行无法解析的动画条目"""
+        self.error_count += 1
+        if len(self.error_samples) < self.MAX_ERROR_SAMPLES:
+            self.error_samples.append((line_number, line))
+
+    def report(self):
+        """生成解析摘要"""
+        lines = [f"Parsed {self.clip_count} animations from {self.line_count} lines, "
+                 f"{self.error_count} unparsable animation lines"]
+        for line_number, line in self.error_samples:
+            lines.append(f"  Line {line_number}: {line}")
+        if self.error_count > len(self.error_samples):
+            lines.append(f"  ... and {self.error_count - len(self.error_samples)} more")
+        return "\n".join(lines)
+
+
+def iter_noesis_clips(lines, summary=None):
+    """逐行解析Noesis输出并逐个生成片段记录，与动画列表无关的行会被忽略"""
+    for line_number, line in enumerate(lines, 1):
+        if summary is not None:
+            summary.line_count = line_number
+
+        line = line.strip()
+        if not line.startswith('@'):
+            continue
+
+        match = NOESIS_LINE_PATTERN.search(line)
+        if not match:
+            if summary is not None:
+                summary.add_error(line_number, line)
+            continue
+
+        start_frame = int(match.group(1))
+        frame_count = int(match.group(3))
+        if summary is not None:
+            summary.clip_count += 1
+
+        yield {
+            'name': match.group(2).strip(),
+            'start_frame': start_frame,
+            'frame_count': frame_count,
+            'end_frame': start_frame + frame_count - 1,
+            'id': int(match.group(4))
+        }
+
+
+def open_noesis_source(path):
+    """打开Noesis日志文件（逐行读取），'-'表示标准输入"""
+    if path == '-':
+        return contextlib.nullcontext(sys.stdin)
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+def hashed_lines(lines, sha):
+    """逐行返回lines，同时更新sha（解析时顺便计算输入的哈希）"""
+    for line in lines:
+        sha.update(line.encode('utf-8', 'replace'))
+        yield line
+
+
+def noesis_source_hash(lines):
+    """Noesis输入（逐行）的SHA-1，用作片段目录的键"""
+    sha = hashlib.sha1()
+    for _ in hashed_lines(lines, sha):
+        pass
+    return sha.hexdigest()
+
+
+def is_blend_pose_name(name):
+    """是否是blend pose条目（包含_blend*_*pose_模式）"""
+    lower_name = name.lower()
+    return "_blend" in lower_name and "_pose_" in lower_name
+
+
+class ClipTable:
+    """按列存储的片段表
+
+    起始帧、帧数、结束帧、ID等保存在紧凑的整数数组中，名称使用intern字符串；
+    支持按名称、ID和帧号快速查找。迭代和索引返回与以前相同的字典记录。
+    """
+
+    def __init__(self):
+        self.names = []
+        self.start_frames = array.array('q')
+        self.frame_counts = array.array('q')
+        self.end_frames = array.array('q')
+        self.ids = array.array('q')
+        self.original_frame_counts = array.array('q')
+        # Noesis列表中原始的起始帧（重新排列前）
+        self.original_start_frames = array.array('q')
+        self.blend_flags = array.array('b')
+        # subset()取出的部分片段: 完整的片段表和对应的行号
+        self.source = None
+        self.source_rows = None
+        self._invalidate_indexes()
+
+    @classmethod
+    def from_records(cls, records):
+        """从片段记录（字典）创建，records可以是生成器"""
+        table = cls()
+        for record in records:
+            table.append(record['name'], record['start_frame'], record['frame_count'], record['id'],
+                         record.get('original_frame_count'), record.get('original_start_frame'))
+        return table
+
+    def append(self, name, start_frame, frame_count, anim_id, original_frame_count=None, original_start_frame=None):
+        """添加一个片段"""
+        name = sys.intern(name)
+        self.names.append(name)
+        self.start_frames.append(start_frame)
+        self.frame_counts.append(frame_count)
+        self.end_frames.append(start_frame + frame_count - 1)
+        self.ids.append(anim_id)
+        self.original_frame_counts.append(frame_count if original_frame_count is None else original_frame_count)
+        self.original_start_frames.append(start_frame if original_start_frame is None else original_start_frame)
+        self.blend_flags.append(is_blend_pose_name(name))
+        self._invalidate_indexes()
+
+    def _invalidate_indexes(self):
+        """数据变化后清除索引（下次查找时重建）"""
+        self._name_index = None
+        self._id_index = None
+        self._frame_order = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def record(self, row):
+        """第row个片段的字典记录"""
+        return {
+            'name': self.names[row],
+            'start_frame': self.start_frames[row],
+            'frame_count': self.frame_counts[row],
+            'end_frame': self.end_frames[row],
+            'id': self.ids[row],
+            'original_frame_count': self.original_frame_counts[row],
+            'original_start_frame': self.original_start_frames[row]
+        }
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self.record(i) for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("clip index out of range")
+        return self.record(row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.record(row)
+
+    # 紧凑格式的文件头: 标识、版本、片段数
+    PACK_HEADER = struct.Struct('<4sII')
+    PACK_MAGIC = b'RECT'
+    PACK_VERSION = 1
+
+    def to_bytes(self):
+        """打包为zlib压缩的紧凑格式（小端整数列 + 以'\0'分隔的UTF-8名称）"""
+        parts = [self.PACK_HEADER.pack(self.PACK_MAGIC, self.PACK_VERSION, len(self))]
+        for column in (self.start_frames, self.frame_counts, self.ids,
+                       self.original_frame_counts, self.original_start_frames):
+            if sys.byteorder == 'big':
+                column = array.array('q', column)
+                column.byteswap()
+            parts.append(column.tobytes())
+        parts.append('\0'.join(self.names).encode('utf-8'))
+        return zlib.compress(b''.join(parts), 6)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """从to_bytes的结果恢复（不重新计算帧范围）"""
+        data = zlib.decompress(data)
+        magic, version, count = cls.PACK_HEADER.unpack_from(data)
+        if magic != cls.PACK_MAGIC or version != cls.PACK_VERSION:
+            raise Exception("Unsupported clip table data")
+
+        table = cls()
+        offset = cls.PACK_HEADER.size
+        columns = []
+        for _ in range(5):
+            column = array.array('q')
+            column.frombytes(data[offset:offset + count * 8])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            columns.append(column)
+            offset += count * 8
+        (table.start_frames, table.frame_counts, table.ids,
+         table.original_frame_counts, table.original_start_frames) = columns
+
+        table.names = [sys.intern(name) for name in data[offset:].decode('utf-8').split('\0')] if count else []
+        if len(table.names) != count:
+            raise Exception("Corrupt clip table data")
+        table.end_frames = array.array('q', (start + frame_count - 1
+                                             for start, frame_count in zip(table.start_frames, table.frame_counts)))
+        table.blend_flags = array.array('b', (is_blend_pose_name(name) for name in table.names))
+        return table
+
+    def subset(self, rows):
+        """按行号取出部分片段，返回新的ClipTable
+
+        新表记录完整的片段表和对应的行号，检查片段范围时按完整的表检查。
+        """
+        rows = list(rows)
+        table = ClipTable()
+        for row in rows:
+            table.append(self.names[row], self.start_frames[row], self.frame_counts[row], self.ids[row],
+                         self.original_frame_counts[row], self.original_start_frames[row])
+        if self.source is not None:
+            table.source, table.source_rows = self.source, [self.source_rows[row] for row in rows]
+        else:
+            table.source, table.source_rows = self, rows
+        return table
+
+    @property
+    def blend_pose_count(self):
+        """blend pose条目数"""
+        return sum(self.blend_flags)
+
+    def relayout(self):
+        """修正blend pose的帧数为1，并按顺序重新计算起始帧（第一个片段保持原始起始帧）
+
+        返回起始帧发生变化的片段数。
+        """
+        if not self.names:
+            return 0
+
+        first_start = self.start_frames[0]
+        old_starts = self.start_frames
+
+        if np is not None:
+            original_counts = np.frombuffer(self.original_frame_counts, dtype=np.int64)
+            counts = np.where(np.frombuffer(self.blend_flags, dtype=np.int8) != 0, 1, original_counts)
+            # 每个片段的起始帧 = 第一个起始帧 + 前面所有片段的帧数之和
+            starts = np.empty_like(counts)
+            starts[0] = first_start
+            np.cumsum(counts[:-1], out=starts[1:])
+            starts[1:] += first_start
+            ends = starts + counts - 1
+            moved = int(np.count_nonzero(starts != np.frombuffer(old_starts, dtype=np.int64)))
+
+            self.frame_counts = array.array('q', counts.astype(np.int64).tobytes())
+            self.start_frames = array.array('q', starts.astype(np.int64).tobytes())
+            self.end_frames = array.array('q', ends.astype(np.int64).tobytes())
+        else:
+            counts = array.array('q', (1 if blend else count
+                                       for blend, count in zip(self.blend_flags, self.original_frame_counts)))
+            # 显式累加（Maya 2022的Python 3.7没有accumulate的initial参数）
+            starts = array.array('q')
+            start = first_start
+            for count in counts:
+                starts.append(start)
+                start += count
+            self.frame_counts = counts
+            self.start_frames = starts
+            self.end_frames = array.array('q', (start + count - 1 for start, count in zip(starts, counts)))
+            moved = sum(1 for old, new in zip(old_starts, starts) if old != new)
+
+        self._frame_order = None
+        return moved
+
+    def rows_by_name(self, name):
+        """指定名称的片段行号列表"""
+        if self._name_index is None:
+            self._name_index = {}
+            for row, clip_name in enumerate(self.names):
+                self._name_index.setdefault(clip_name, []).append(row)
+        return self._name_index.get(name, [])
+
+    def rows_by_id(self, anim_id):
+        """指定ID的片段行号列表"""
+        if self._id_index is None:
+            self._id_index = {}
+            for row, clip_id in enumerate(self.ids):
+                self._id_index.setdefault(clip_id, []).append(row)
+        return self._id_index.get(anim_id, [])
+
+    def row_at_frame(self, frame):
+        """包含指定帧的片段行号（二分查找），没有时返回None"""
+        if not self.names:
+            return None
+
+        if self._frame_order is None:
+            starts = self.start_frames
+            if all(starts[i] <= starts[i + 1] for i in range(len(starts) - 1)):
+                # 重新排列后起始帧是递增的，直接在原数组上二分
+                self._frame_order = (starts, None)
+            else:
+                order = sorted(range(len(starts)), key=starts.__getitem__)
+                self._frame_order = (array.array('q', (starts[i] for i in order)), order)
+
+        sorted_starts, order = self._frame_order
+        position = bisect.bisect_right(sorted_starts, frame) - 1
+        if position < 0:
+            return None
+        row = order[position] if order is not None else position
+        if self.start_frames[row] <= frame <= self.end_frames[row]:
+            return row
+        return None
+
+    def clip_at_frame(self, frame):
+        """包含指定帧的片段记录，没有时返回None"""
+        row = self.row_at_frame(frame)
+        return None if row is None else self.record(row)
+
+
+class ClipBrowserModel:
+    """片段浏览器的数据（不需要Maya）: 过滤、分页和跨页的多选
+
+    界面只为当前页创建行；过滤条件变长时只在上次的结果中查找。
+    过滤条件为名称（不区分大小写的子串）、数字（ID、包含该帧的片段或名称）、"id:N"或"frame:N"。
+    """
+
+    def __init__(self, table, page_size=200):
+        self.table = table
+        self.page_size = page_size
+        self.query = ""
+        # 过滤后的行号（没有过滤条件时为range，不占用内存）
+        self.rows = range(len(table))
+        # 选中的行号（ClipTable的行号，和过滤、分页无关）
+        self.selected = set()
+        self._lower_names = None
+
+    def set_filter(self, query):
+        """设置过滤条件，返回匹配的片段数"""
+        query = query.strip()
+        field, _, value = query.partition(':')
+        field = field.lower()
+
+        if not query:
+            rows = range(len(self.table))
+        elif field in ('id', 'frame', 'f') and value.strip().lstrip('-').isdigit():
+            number = int(value)
+            if field == 'id':
+                rows = self.table.rows_by_id(number)
+            else:
+                row = self.table.row_at_frame(number)
+                rows = [] if row is None else [row]
+        elif query.lstrip('-').isdigit():
+            number = int(query)
+            matches = set(self.table.rows_by_id(number))
+            row = self.table.row_at_frame(number)
+            if row is not None:
+                matches.add(row)
+            matches.update(self._rows_with_name(query, range(len(self.table))))
+            rows = sorted(matches)
+        else:
+            # 名称过滤: 条件变长时结果只会变少
+            previous = self.query.lower()
+            narrowing = (previous and query.lower().startswith(previous) and ':' not in previous
+                         and not previous.lstrip('-').isdigit())
+            rows = self._rows_with_name(query, self.rows if narrowing else range(len(self.table)))
+
+        self.query = query
+        self.rows = rows if isinstance(rows, range) else array.array('q', rows)
+        return len(self.rows)
+
+    def _rows_with_name(self, text, rows):
+        """rows中名称包含text（不区分大小写）的行号"""
+        if self._lower_names is None:
+            self._lower_names = [name.lower() for name in self.table.names]
+        text = text.lower()
+        lower_names = self._lower_names
+        return [row for row in rows if text in lower_names[row]]
+
+    @property
+    def page_count(self):
+        """页数（没有匹配的片段时为1）"""
+        return max((len(self.rows) + self.page_size - 1) // self.page_size, 1)
+
+    def page_rows(self, page):
+        """第page页的行号"""
+        start = page * self.page_size
+        return self.rows[start:start + self.page_size]
+
+    def label(self, row):
+        """列表中显示的文字"""
+        table = self.table
+        return (f"{table.names[row]} (Frames: {table.start_frames[row]}-{table.end_frames[row]}, "
+                f"ID: {table.ids[row]})")
+
+    def page_labels(self, page):
+        """第page页每行显示的文字"""
+        return [self.label(row) for row in self.page_rows(page)]
+
+    def select_on_page(self, page, indices):
+        """用页内的序号（从0开始）替换这一页的选择"""
+        page_rows = self.page_rows(page)
+        self.selected.difference_update(page_rows)
+        self.selected.update(page_rows[index] for index in indices)
+
+    def page_selection(self, page):
+        """这一页中选中的页内序号"""
+        return [index for index, row in enumerate(self.page_rows(page)) if row in self.selected]
+
+    def select_all_matching(self):
+        """选中所有匹配过滤条件的片段"""
+        self.selected.update(self.rows)
+
+    def selected_rows(self):
+        """按行号排序的选中片段"""
+        return sorted(self.selected)
+
+
+class ClipCatalog:
+    """片段目录: 解析并修正后的片段表，按Noesis输入的哈希保存，重新打开场景时不需要再次解析
+
+    保存在场景的fileInfo中（随场景保存），以及场景旁边的索引文件（<场景名>.reclips.json）中，
+    索引文件不需要Maya就可以读取，供批处理和其他工具查询片段范围。
+    """
+
+    FILE_INFO_KEY = "reAnimClipCatalog"
+    FILE_INFO_HASH_KEY = "reAnimClipCatalogHash"
+    SIDECAR_SUFFIX = ".reclips.json"
+    VERSION = 1
+    # 索引文件中最多保留的目录数（按保存时间）
+    MAX_SIDECAR_ENTRIES = 8
+
+    @staticmethod
+    def encode(table):
+        """片段表 -> fileInfo中可以保存的字符串（base64）"""
+        return base64.b64encode(table.to_bytes()).decode('ascii')
+
+    @staticmethod
+    def decode(text):
+        """encode的逆操作"""
+        return ClipTable.from_bytes(base64.b64decode(text))
+
+    @classmethod
+    def sidecar_path(cls, scene_path):
+        """场景的索引文件路径"""
+        return os.path.splitext(scene_path)[0] + cls.SIDECAR_SUFFIX
+
+    @classmethod
+    def read_sidecar(cls, scene_path):
+        """读取索引文件，不存在或无法读取时返回空的索引"""
+        try:
+            with open(cls.sidecar_path(scene_path), 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('version') == cls.VERSION:
+                return index
+        except (OSError, ValueError):
+            pass
+        return {'version': cls.VERSION, 'latest': None, 'catalogs': {}}
+
+    @classmethod
+    def load_sidecar(cls, scene_path, source_hash=None):
+        """从索引文件读取片段表，返回(片段表, 哈希)；source_hash为None时读取最近保存的，没有时返回None"""
+        index = cls.read_sidecar(scene_path)
+        source_hash = source_hash or index['latest']
+        entry = index['catalogs'].get(source_hash)
+        if entry is None:
+            return None
+        try:
+            return cls.decode(entry['data']), source_hash
+        except Exception as e:
+            print(f"Warning: Could not read clip catalog: {str(e)}")
+            return None
+
+    @classmethod
+    def save_sidecar(cls, scene_path, table, source_hash, source=None):
+        """把片段表写入索引文件，返回索引文件路径"""
+        index = cls.read_sidecar(scene_path)
+        catalogs = index['catalogs']
+        catalogs[source_hash] = {'source': source, 'clips': len(table),
+                                 'saved': time.time(), 'data': cls.encode(table)}
+        for old_hash in sorted(catalogs, key=lambda key: catalogs[key]['saved'])[:-cls.MAX_SIDECAR_ENTRIES]:
+            del catalogs[old_hash]
+        index['latest'] = source_hash
+
+        path = cls.sidecar_path(scene_path)
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(temp_path, path)
+        return path
+
+    @classmethod
+    def save_to_scene(cls, table, source_hash):
+        """把片段表保存到当前场景的fileInfo（场景保存后生效）"""
+        cmds.fileInfo(cls.FILE_INFO_KEY, cls.encode(table))
+        cmds.fileInfo(cls.FILE_INFO_HASH_KEY, source_hash)
+
+    @classmethod
+    def load_from_scene(cls):
+        """从当前场景的fileInfo读取片段表，返回(片段表, 哈希)，没有时返回None"""
+        data = cmds.fileInfo(cls.FILE_INFO_KEY, query=True)
+        if not data:
+            return None
+        source_hash = cmds.fileInfo(cls.FILE_INFO_HASH_KEY, query=True)
+        try:
+            return cls.decode(data[0]), (source_hash[0] if source_hash else None)
+        except Exception as e:
+            print(f"Warning: Could not read clip catalog from scene: {str(e)}")
+            return None
+
+
+class PreflightReport:
+    """导出前检查的结果: 按类型统计问题，每类只保留少量示例"""
+
+    # 每类问题最多保留的示例数
+    MAX_SAMPLES = 10
+    # 问题类型和说明
+    ISSUE_TYPES = {
+        'overlap': "overlapping ranges",
+        'gap': "gaps between ranges",
+        'out_of_range': "ranges outside the keyed animation",
+        'length_mismatch': "frame counts that do not match the Noesis start frames",
+        'total_length': "list length that does not match the keyed animation",
+    }
+
+    def __init__(self, clip_count=0, keyed_range=None):
+        self.clip_count = clip_count
+        # 场景中有关键帧的时间范围(起, 止)，None表示没有关键帧
+        self.keyed_range = keyed_range
+        # 没能读取关键帧范围时为True（只检查了列表本身）
+        self.partial = False
+        self.counts = dict.fromkeys(self.ISSUE_TYPES, 0)
+        self.samples = {issue_type: [] for issue_type in self.ISSUE_TYPES}
+
+    def add(self, issue_type, message):
+        """记录一个问题"""
+        self.counts[issue_type] += 1
+        if len(self.samples[issue_type]) < self.MAX_SAMPLES:
+            self.samples[issue_type].append(message)
+
+    @property
+    def issue_count(self):
+        return sum(self.counts.values())
+
+    def report(self):
+        """生成检查摘要"""
+        if self.partial:
+            keyed = "keyed range not checked"
+        elif self.keyed_range:
+            keyed = f"keyed frames {self.keyed_range[0]:g}-{self.keyed_range[1]:g}"
+        else:
+            keyed = "no keys found"
+        lines = [f"Pre-flight check of {self.clip_count} animations ({keyed}): {self.issue_count} issues"]
+        for issue_type, description in self.ISSUE_TYPES.items():
+            if not self.counts[issue_type]:
+                continue
+            lines.append(f"  {self.counts[issue_type]} {description}")
+            for message in self.samples[issue_type]:
+                lines.append(f"    {message}")
+            if self.counts[issue_type] > len(self.samples[issue_type]):
+                lines.append(f"    ... and {self.counts[issue_type] - len(self.samples[issue_type])} more")
+        return "\n".join(lines)
+
+
+def check_clip_ranges(animations, keyed_range=None):
+    """检查片段范围: 重叠、间隔、超出有关键帧的范围，以及和Noesis帧数不符的条目，返回PreflightReport
+
+    范围按起始帧排序后扫描，记录目前为止最远的结束帧（区间索引），整体为O(n log n)。
+    animations为ClipTable.subset()取出的部分片段时，按完整的片段表检查（部分片段之间不一定相邻），
+    只报告和这些片段有关的问题，也不比较列表的总长度。
+    """
+    animations = animations if isinstance(animations, ClipTable) else ClipTable.from_records(animations)
+    selected_rows = None
+    if animations.source is not None:
+        selected_rows = set(animations.source_rows)
+        animations = animations.source
+    report = PreflightReport(len(animations) if selected_rows is None else len(selected_rows), keyed_range)
+    if not report.clip_count:
+        return report
+
+    def is_selected(*rows):
+        return selected_rows is None or not selected_rows.isdisjoint(rows)
+
+    def label(row):
+        return f"{animations.names[row]} (ID: {animations.ids[row]}, frames " \
+               f"{animations.start_frames[row]}-{animations.end_frames[row]})"
+
+    starts, ends = animations.start_frames, animations.end_frames
+    order = sorted(range(len(animations)), key=lambda row: (starts[row], ends[row]))
+    furthest = order[0]
+    for row in order[1:]:
+        if is_selected(row, furthest):
+            if starts[row] <= ends[furthest]:
+                report.add('overlap', f"{label(row)} overlaps {label(furthest)}")
+            elif starts[row] > ends[furthest] + 1:
+                report.add('gap', f"{starts[row] - ends[furthest] - 1} frames before {label(row)}")
+        if ends[row] > ends[furthest]:
+            furthest = row
+
+    if keyed_range is not None:
+        keyed_start, keyed_end = keyed_range
+        for row in range(len(animations)):
+            if is_selected(row) and (starts[row] < keyed_start or ends[row] > keyed_end):
+                report.add('out_of_range', label(row))
+        list_end = max(ends)
+        if selected_rows is None and list_end < keyed_end:
+            report.add('total_length', f"the list ends at frame {list_end}, the keys end at frame {keyed_end:g}")
+
+    # Noesis列表中相邻条目起始帧的间隔应等于帧数（blend pose条目除外，它们的帧数会被修正）
+    original_starts = animations.original_start_frames
+    original_counts = animations.original_frame_counts
+    for row in range(len(animations) - 1):
+        if animations.blend_flags[row] or not is_selected(row):
+            continue
+        spacing = original_starts[row + 1] - original_starts[row]
+        if spacing != original_counts[row]:
+            report.add('length_mismatch', f"{animations.names[row]} (ID: {animations.ids[row]}) has "
+                                          f"{original_counts[row]} frames, the next animation starts {spacing} frames later")
+    return report
+
+
+# 仅骨骼导出时，绑定姿势几何体的文件名
+BIND_POSE_FILE_NAME = "bind_pose.fbx"
+# 导出内容对比报告的文件名
+CONTENT_REPORT_FILE_NAME = "content_mode_report.json"
+# 批量导出结果（每个片段的状态、尝试次数和错误）的文件名
+EXPORT_RESULTS_FILE_NAME = "re_anim_export_results.json"
+# 可以重新导出的片段状态
+RERUN_STATUSES = ('failed', 'quarantined', 'cancelled')
+
+
+def clip_file_name(anim):
+    """片段导出的FBX文件名"""
+    safe_name = re.sub(r'[<>:"/\\|?*]', '_', anim['name'])
+    return f"{safe_name}_ID{anim['id']}.fbx"
+
+
+def copy_duplicate_export(source_path, target_path, source_anim, anim, link=False):
+    """把已导出的FBX复制为重复片段的文件
+
+    复制时用FBX拆分的方法重写Take名称和时间范围，关键帧移到重复片段自己的帧范围；
+    link为True时改为硬链接，文件和来源完全相同（Take名称和关键帧时间仍是来源片段的）。
+    """
+    if os.path.exists(target_path):
+        os.remove(target_path)
+    if link:
+        try:
+            os.link(source_path, target_path)
+            return
+        except OSError:
+            # 不支持硬链接（例如跨磁盘）时退回复制
+            pass
+    document = read_fbx(source_path)
+    try:
+        split_fbx_clip(document, anim, target_path,
+                       source_range=(source_anim['start_frame'], source_anim['end_frame']))
+    finally:
+        document.close()
+
+
+def mel_string(value):
+    """转换为MEL字符串字面量"""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    """文件的SHA-1校验和"""
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ExportManifest:
+    """导出清单（保存在FBX输出目录中）
+
+    记录每个片段的帧范围、源曲线数据哈希、导出设置哈希和输出文件校验和，
+    再次导出时跳过没有变化的片段；导出过程中定期保存，中断后可以从上次完成的片段继续。
+    并行导出的工作进程各自写入一个分片文件，结束后由主进程合并。
+    """
+
+    FILE_NAME = "re_anim_export_manifest.json"
+    VERSION = 1
+    # 两次保存之间的最短间隔（秒）
+    SAVE_INTERVAL = 2.0
+
+    def __init__(self, export_path, part_name=None):
+        self.export_path = export_path
+        self.path = os.path.join(export_path, self.FILE_NAME)
+        # 分片名称（并行导出的工作进程使用），为None时直接写入清单文件
+        self.part_name = part_name
+        self.entries = {}
+        self.last_completed = None
+        self._dirty = False
+        self._last_save = 0.0
+        self.load()
+
+    def _part_paths(self):
+        """目录中所有清单分片文件"""
+        base = os.path.splitext(self.path)[0]
+        return sorted(glob.glob(glob.escape(base) + ".part-*.json"))
+
+    def load(self):
+        """读取清单和所有分片"""
+        for path in [self.path] + self._part_paths():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if data.get('version') != self.VERSION:
+                continue
+            self.entries.update(data.get('clips', {}))
+            self.last_completed = data.get('last_completed') or self.last_completed
+
+        if self.last_completed:
+            print(f"Export manifest: {len(self.entries)} clips recorded, last completed: {self.last_completed}")
+
+    def save(self, force=True):
+        """写入清单（先写临时文件再替换，避免中断时损坏）"""
+        if not self._dirty or (not force and time.time() - self._last_save < self.SAVE_INTERVAL):
+            return
+
+        if self.part_name:
+            path = os.path.splitext(self.path)[0] + f".part-{self.part_name}.json"
+        else:
+            path = self.path
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION, 'last_completed': self.last_completed, 'clips': self.entries}, f)
+        os.replace(temp_path, path)
+
+        self._dirty = False
+        self._last_save = time.time()
+
+    def consolidate(self):
+        """把所有分片合并到清单文件中并删除分片"""
+        part_paths = self._part_paths()
+        self.part_name = None
+        self._dirty = True
+        self.save()
+        for path in part_paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def is_up_to_date(self, file_name, fingerprint):
+        """输出文件存在、未被修改，并且帧范围、源数据和设置都没有变化"""
+        entry = self.entries.get(file_name)
+        if not entry or any(entry.get(key) != value for key, value in fingerprint.items()):
+            return False
+
+        output_path = os.path.join(self.export_path, file_name)
+        try:
+            stat = os.stat(output_path)
+        except OSError:
+            return False
+        if stat.st_size != entry['size']:
+            return False
+        # 修改时间没变时不重新计算校验和
+        if stat.st_mtime == entry['mtime']:
+            return True
+        return file_checksum(output_path) == entry['checksum']
+
+    def record(self, file_name, fingerprint, checksum=None):
+        """记录一个导出完成的片段（已知校验和时不再读取文件）"""
+        output_path = os.path.join(self.export_path, file_name)
+        stat = os.stat(output_path)
+        entry = dict(fingerprint)
+        entry.update({'checksum': checksum or file_checksum(output_path), 'size': stat.st_size,
+                      'mtime': stat.st_mtime})
+        self.entries[file_name] = entry
+        self.last_completed = file_name
+        self._dirty = True
+        self.save(force=False)
+
+
+# 导出错误的分类规则，按顺序匹配，都不匹配时视为暂时性错误（例如FBX插件偶发的错误、文件被占用）
+EXPORT_ERROR_CLASSES = [
+    # 片段定义有误，重试也不会成功
+    ('invalid', re.compile(r"invalid frame range|invalid animation|empty animation name", re.I)),
+    # 整个批次都无法继续
+    ('fatal', re.compile(r"no objects to export|no visible objects|no joints found|plugin.*not (loaded|found)|"
+                         r"could not load plugin|no space left|disk full|read-only file system", re.I)),
+]
+
+
+def classify_export_error(message):
+    """把导出错误分为'transient'（可以重试）、'invalid'（片段定义有误）或'fatal'（停止整个批次）"""
+    for failure_class, pattern in EXPORT_ERROR_CLASSES:
+        if pattern.search(message):
+            return failure_class
+    return 'transient'
+
+
+def validate_clip(anim):
+    """导出前检查片段定义，有误时返回错误信息"""
+    if not anim['name'].strip():
+        return "Empty animation name"
+    if anim['frame_count'] < 1 or anim['start_frame'] < 0:
+        return f"Invalid frame range: start {anim['start_frame']}, {anim['frame_count']} frames"
+    return None
+
+
+def write_export_results(export_path, animations, result, scene_path=None, merge=False):
+    """把导出结果（export_animations的返回值）中每个片段的状态写入导出目录的结果文件
+
+    merge为True时（只重新导出失败的片段）保留结果文件中其他片段的记录。
+    """
+    path = os.path.join(export_path, EXPORT_RESULTS_FILE_NAME)
+    records = {}
+    if merge:
+        records = {record['file']: record for record in read_export_results(export_path)}
+
+    for i, anim in enumerate(animations):
+        record = {'file': clip_file_name(anim), 'name': anim['name'], 'id': anim['id'],
+                  'start_frame': anim['start_frame'], 'frame_count': anim['frame_count'],
+                  'status': result['statuses'][i], 'attempts': result['attempts'][i]}
+        record.update(result['failures'].get(i, {}))
+        records[record['file']] = record
+
+    summary = {}
+    for record in records.values():
+        summary[record['status']] = summary.get(record['status'], 0) + 1
+
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'scene': scene_path, 'finished': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                   'summary': summary, 'clips': list(records.values())}, f, indent=1)
+    os.replace(temp_path, path)
+    return path
+
+
+def read_export_results(export_path):
+    """读取导出目录中的结果文件，返回片段记录的列表（没有结果文件时为空）"""
+    path = os.path.join(export_path, EXPORT_RESULTS_FILE_NAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('clips', [])
+    except (OSError, ValueError):
+        return []
+
+
+def verify_fbx_file(path):
+    """检查导出的FBX文件完整（非空，并且有二进制或ASCII FBX文件头），返回文件大小"""
+    size = os.path.getsize(path)
+    if size == 0:
+        raise Exception(f"Exported file is empty: {path}")
+    with open(path, 'rb') as f:
+        header = f.read(len(FBX_BINARY_MAGIC))
+    if not (header.startswith(FBX_BINARY_MAGIC[:18]) or header.lstrip().startswith(b';')):
+        raise Exception(f"Exported file is not an FBX file: {path}")
+    return size
+
+
+class OutputStager:
+    """暂存导出文件: FBX先写到本地临时目录，后台线程池校验后复制到最终目录（例如网络共享）
+
+    传输的I/O错误按指数退避重试；写入时使用临时文件名，完成后才替换为最终文件名。
+    """
+
+    def __init__(self, final_dir, scratch_dir=None, workers=4, max_retries=3, retry_delay=0.5):
+        self.final_dir = final_dir
+        os.makedirs(final_dir, exist_ok=True)
+        if scratch_dir:
+            os.makedirs(scratch_dir, exist_ok=True)
+        self.scratch_dir = tempfile.mkdtemp(prefix="re_anim_stage_", dir=scratch_dir)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.executor = ThreadPoolExecutor(max_workers=max(int(workers), 1),
+                                           thread_name_prefix="REAnimExportTransfer")
+        self.transferred_count = 0
+        self.transferred_bytes = 0
+        self.retry_count = 0
+        self._lock = threading.Lock()
+
+    def submit(self, file_name, keep_local=False):
+        """开始传输暂存目录中的一个文件，返回Future（结果为{'size', 'checksum'}）"""
+        return self.executor.submit(self._transfer, file_name, keep_local)
+
+    def _transfer(self, file_name, keep_local):
+        """校验并复制一个文件（在后台线程中执行）"""
+        local_path = os.path.join(self.scratch_dir, file_name)
+        size = verify_fbx_file(local_path)
+        checksum = file_checksum(local_path)
+
+        final_path = os.path.join(self.final_dir, file_name)
+        partial_path = final_path + ".part"
+        for attempt in range(self.max_retries + 1):
+            try:
+                shutil.copyfile(local_path, partial_path)
+                if os.path.getsize(partial_path) != size:
+                    raise OSError(f"size mismatch after copying {file_name}")
+                os.replace(partial_path, final_path)
+                break
+            except OSError as e:
+                if attempt == self.max_retries:
+                    raise Exception(f"Transfer failed after {attempt + 1} attempts: {str(e)}")
+                with self._lock:
+                    self.retry_count += 1
+                print(f"Warning: Transfer of {file_name} failed ({str(e)}), retrying")
+                time.sleep(self.retry_delay * 2 ** attempt)
+
+        if not keep_local:
+            os.remove(local_path)
+        with self._lock:
+            self.transferred_count += 1
+            self.transferred_bytes += size
+        return {'size': size, 'checksum': checksum}
+
+    def close(self):
+        """等待后台线程结束并删除暂存目录"""
+        self.executor.shutdown(wait=True)
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+
+def find_visible_transforms():
+    """用OpenMaya的DAG迭代器一次找出所有可见的transform（不含中间对象）"""
+    visible_objects = []
+    iterator = om.MItDag(om.MItDag.kDepthFirst, om.MFn.kTransform)
+    while not iterator.isDone():
+        dag_node = om.MFnDagNode(iterator.currentItem())
+        if dag_node.findPlug('visibility', False).asBool() and not dag_node.isIntermediateObject:
+            visible_objects.append(iterator.fullPathName())
+        iterator.next()
+    return visible_objects
+
+
+class ExportProfiler:
+    """导出性能记录: 按阶段记录耗时、写入字节数和MEL调用次数，输出JSON汇总和Chrome trace
+
+    关闭时phase()返回空上下文，几乎没有开销。
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        """清空已记录的阶段"""
+        # (阶段名称, 开始时间, 耗时, 参数)，时间单位为秒
+        self.events = []
+        self._origin = time.perf_counter()
+
+    def phase(self, name, **args):
+        """记录一个阶段: with profiler.phase('FBXExport', clip=...) as event，可在event中填写bytes等数据"""
+        if not self.enabled:
+            # 每次返回新的字典，调用方写入的数据被丢弃，不会在调用之间累积
+            return contextlib.nullcontext({})
+        return self._record(name, args)
+
+    @contextlib.contextmanager
+    def _record(self, name, args):
+        event = dict(args)
+        mel_calls_before = FBXExportSession.total_mel_calls
+        start_time = time.perf_counter()
+        try:
+            yield event
+        finally:
+            end_time = time.perf_counter()
+            event['mel_calls'] = FBXExportSession.total_mel_calls - mel_calls_before
+            self.events.append((name, start_time - self._origin, end_time - start_time, event))
+
+    def summary(self):
+        """按阶段和片段汇总"""
+        phases = {}
+        clips = {}
+        for name, _, duration, event in self.events:
+            totals = phases.setdefault(name, {'count': 0, 'seconds': 0.0, 'mel_calls': 0, 'bytes': 0})
+            totals['count'] += 1
+            totals['seconds'] += duration
+            totals['mel_calls'] += event['mel_calls']
+            totals['bytes'] += event.get('bytes', 0)
+
+            clip = event.get('clip')
+            if clip is not None:
+                stats = clips.setdefault(clip, {'seconds': 0.0, 'mel_calls': 0, 'bytes': 0})
+                if name == 'clip':
+                    stats['seconds'] += duration
+                    stats['mel_calls'] += event['mel_calls']
+                stats['bytes'] += event.get('bytes', 0)
+
+        return {'pid': os.getpid(), 'phases': phases, 'clips': clips}
+
+    def chrome_trace(self):
+        """Chrome trace格式（chrome://tracing或Perfetto中打开）"""
+        pid = os.getpid()
+        return {
+            'traceEvents': [
+                {'name': name, 'cat': 'export', 'ph': 'X', 'pid': pid, 'tid': 0,
+                 'ts': round(start * 1e6, 3), 'dur': round(duration * 1e6, 3), 'args': event}
+                for name, start, duration, event in self.events
+            ],
+            'displayTimeUnit': 'ms'
+        }
+
+    def write(self, directory, label):
+        """写入<label>.profile.json和<label>.trace.json，返回汇总"""
+        os.makedirs(directory, exist_ok=True)
+        summary = self.summary()
+        with open(os.path.join(directory, f"{label}.profile.json"), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        with open(os.path.join(directory, f"{label}.trace.json"), 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+
+        print(f"Profile written to {os.path.join(directory, label)}.*.json")
+        for name, totals in sorted(summary['phases'].items(), key=lambda item: -item[1]['seconds']):
+            print(f"  {name:<12} {totals['count']:>6}x {totals['seconds']:>9.3f}s "
+                  f"{totals['mel_calls']:>6} MEL calls {totals['bytes']:>12} bytes")
+        return summary
+
+
+class ExportProgress:
+    """批量导出进度: 按时间间隔限制界面更新，并在更新时检查是否取消"""
+
+    def __init__(self, callback=None, cancel_check=None, interval=0.25):
+        # callback(done, total, message)更新界面，cancel_check()返回True表示取消
+        self.callback = callback
+        self.cancel_check = cancel_check
+        self.interval = interval
+        self.cancelled = False
+        self.updates = 0
+        self._last_update = None
+
+    def cancel(self):
+        """请求在当前片段完成后停止导出"""
+        self.cancelled = True
+
+    def due(self, force=False):
+        """距上次界面更新已超过interval秒（或force）时返回True，并记为一次更新"""
+        now = time.perf_counter()
+        if not force and self._last_update is not None and now - self._last_update < self.interval:
+            return False
+        self._last_update = now
+        self.updates += 1
+        return True
+
+    def update(self, done, total, message, force=False):
+        """报告进度（距上次更新不足interval秒时跳过），返回是否已取消"""
+        if not self.due(force):
+            return self.cancelled
+
+        if self.callback:
+            self.callback(done, total, message)
+        if self.cancel_check and self.cancel_check():
+            self.cancelled = True
+        return self.cancelled
+
+
+def process_ui_events():
+    """处理等待中的Qt界面事件（同步导出期间让取消按钮可以点击），不在Maya界面中时什么也不做"""
+    if QtWidgets is None:
+        return
+    app = QtWidgets.QApplication.instance()
+    if app is not None:
+        app.processEvents()
+
+
+@contextlib.contextmanager
+def suspended_viewport():
+    """暂停视口刷新和Viewport 2.0绘制，结束时恢复原来的状态"""
+    refresh_suspended = False
+    ogs_paused = False
+    try:
+        # ogs -pause是切换开关，只在当前没有暂停时切换
+        if not cmds.ogs(query=True, pause=True):
+            cmds.ogs(pause=True)
+            ogs_paused = True
+    except Exception as e:
+        print(f"Warning: Could not pause viewport: {str(e)}")
+    try:
+        cmds.refresh(suspend=True)
+        refresh_suspended = True
+    except Exception as e:
+        print(f"Warning: Could not suspend refresh: {str(e)}")
+
+    try:
+        yield
+    finally:
+        if refresh_suspended:
+            cmds.refresh(suspend=False)
+        if ogs_paused:
+            cmds.ogs(pause=True)
+
+
+# 常用帧速率对应的Maya时间单位，其他帧速率使用"<fps>fps"
+MAYA_TIME_UNITS = {15: 'game', 24: 'film', 25: 'pal', 30: 'ntsc', 48: 'show', 50: 'palf', 60: 'ntscf'}
+
+
+def maya_time_unit(fps):
+    """帧速率对应的Maya时间单位名称"""
+    fps = float(fps)
+    if fps <= 0:
+        raise Exception(f"Invalid frame rate: {fps}")
+    return MAYA_TIME_UNITS.get(fps) or f"{fps:g}fps"
+
+
+def find_time_anim_curves(roots=None):
+    """用OpenMaya找出roots层级（默认整个场景）下所有以时间为输入的动画曲线名称
+
+    不包括驱动关键帧等非时间输入的曲线，重定时不能缩放它们。
+    """
+    time_curve_types = (om.MFn.kAnimCurveTimeToAngular, om.MFn.kAnimCurveTimeToDistance,
+                        om.MFn.kAnimCurveTimeToTime, om.MFn.kAnimCurveTimeToUnitless)
+
+    iterators = []
+    if roots:
+        selection = om.MSelectionList()
+        for root in roots:
+            selection.add(root)
+        for i in range(selection.length()):
+            iterator = om.MItDag(om.MItDag.kDepthFirst)
+            iterator.reset(selection.getDagPath(i), om.MItDag.kDepthFirst)
+            iterators.append(iterator)
+    else:
+        iterators.append(om.MItDag(om.MItDag.kDepthFirst))
+
+    # 多个根节点可能有重叠的层级，保持顺序去重
+    curves = {}
+    for iterator in iterators:
+        while not iterator.isDone():
+            path = iterator.getPath()
+            if oma.MAnimUtil.isAnimated(path):
+                for curve in oma.MAnimUtil.findAnimation(path):
+                    if curve.apiType() in time_curve_types:
+                        curves[om.MFnDependencyNode(curve).name()] = None
+            iterator.next()
+    return list(curves)
+
+
+def retime_key_times(times, source_fps, target_fps, pivot=0.0):
+    """计算重定时后关键帧在target_fps下的帧号（有NumPy时批量计算）
+
+    在source_fps下按source/target绕pivot缩放，再把时间单位换成target_fps，
+    帧号的变化只剩下pivot带来的偏移。
+    """
+    offset = pivot * target_fps / source_fps - pivot
+    if np is not None:
+        return np.asarray(times, dtype=np.float64) + offset
+    return array.array('d', (t + offset for t in times))
+
+
+def count_fractional_frames(frames, tolerance=1e-4):
+    """统计不在整数帧上的关键帧数量"""
+    if np is not None:
+        frames = np.asarray(frames, dtype=np.float64)
+        return int(np.count_nonzero(np.abs(frames - np.round(frames)) > tolerance))
+    return sum(1 for frame in frames if abs(frame - round(frame)) > tolerance)
+
+
+# 一次性烘焙的撤销块名称，恢复时只在撤销队列顶部是这个块时撤销
+BAKE_UNDO_CHUNK_NAME = "REAnimExportBakeTimeline"
+
+# 关键帧简化的默认误差（Maya界面单位: 厘米、度）
+DEFAULT_KEY_TOLERANCES = {'translate': 0.01, 'rotate': 0.05, 'scale': 0.001, 'other': 0.001}
+# 估算FBX中每个关键帧占用的字节数（KeyTime int64 + KeyValueFloat float32）
+ESTIMATED_FBX_BYTES_PER_KEY = 12
+
+
+def simplify_curve_keys(times, values, tolerance, keep_times=()):
+    """Douglas-Peucker简化一条曲线，返回每个关键帧是否保留的列表
+
+    去掉的关键帧由相邻保留关键帧线性插值重建，误差不超过tolerance；
+    第一个、最后一个和keep_times（例如片段起止帧）上的关键帧总是保留。
+    """
+    count = len(times)
+    keep = [True] * count
+    if count <= 2:
+        return keep
+
+    anchors = {0, count - 1}
+    for keep_time in keep_times:
+        index = bisect.bisect_left(times, keep_time - 1e-4)
+        if index < count and abs(times[index] - keep_time) <= 1e-4:
+            anchors.add(index)
+    anchors = sorted(anchors)
+
+    keep = [False] * count
+    for index in anchors:
+        keep[index] = True
+    if np is not None:
+        times = np.asarray(times, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+
+    stack = list(zip(anchors, anchors[1:]))
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        slope = (values[last] - values[first]) / (times[last] - times[first])
+        if np is not None:
+            errors = np.abs(values[first + 1:last] - (values[first] + slope * (times[first + 1:last] - times[first])))
+            worst = int(np.argmax(errors))
+            worst_error = errors[worst]
+        else:
+            worst_error, worst = max(
+                (abs(values[i] - (values[first] + slope * (times[i] - times[first]))), i - first - 1)
+                for i in range(first + 1, last))
+
+        if worst_error > tolerance:
+            split = first + 1 + worst
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def removed_key_ranges(keep):
+    """把保留列表转换为要删除的连续关键帧索引范围[(起, 止), ...]"""
+    ranges = []
+    start = None
+    for index, kept in enumerate(keep):
+        if not kept and start is None:
+            start = index
+        elif kept and start is not None:
+            ranges.append((start, index - 1))
+            start = None
+    if start is not None:
+        ranges.append((start, len(keep) - 1))
+    return ranges
+
+
+class ExportSelectionCache:
+    """导出选择缓存: 批量导出时只解析一次，场景DAG变化时失效
+
+    可以嵌套开始（例如界面的预检查和批量导出使用同一次解析），最外层结束时才移除回调。
+    """
+
+    def __init__(self):
+        self.active = False
+        # 嵌套开始的层数
+        self.depth = 0
+        # 导出选择的根节点（用户选择或所有可见物体），None表示需要重新解析
+        self.roots = None
+        # 按导出内容解析出的导出节点和对应的导出内容
+        self.nodes = None
+        self.content = None
+        # 导出节点是否已经选中（FBX导出使用当前选择）
+        self.selected = False
+        # 解析失败的原因（例如用户拒绝导出可见物体），同一批次不再重复询问
+        self.error = None
+        self._callback_ids = []
+
+    def start(self):
+        """开始缓存，并监听DAG变化；已经开始时沿用外层的缓存"""
+        self.depth += 1
+        if self.depth > 1:
+            return
+        self.active = True
+        self.invalidate()
+        self._callback_ids = [
+            om.MDagMessage.addAllDagChangesCallback(self.invalidate),
+            om.MDGMessage.addNodeAddedCallback(self.invalidate, "dagNode"),
+            om.MDGMessage.addNodeRemovedCallback(self.invalidate, "dagNode"),
+        ]
+
+    def stop(self):
+        """结束缓存，最外层结束时移除回调"""
+        self.depth = max(self.depth - 1, 0)
+        if self.depth:
+            return
+        if self._callback_ids:
+            om.MMessage.removeCallbacks(self._callback_ids)
+        self._callback_ids = []
+        self.active = False
+        self.invalidate()
+
+    def invalidate(self, *args):
+        """场景DAG变化时清除缓存"""
+        self.roots = None
+        self.nodes = None
+        self.content = None
+        self.selected = False
+        self.error = None
+
+
+class FBXExportSession:
+    """一个批次的FBX导出会话
+
+    导出选项每批只重置、设置和检查一次；每个片段只发送变化的部分（烘焙起止帧、Take分割），
+    并且把连续的MEL命令合并为一次mel.eval调用。
+    """
+
+    # 没有-v参数、直接跟值的命令
+    VALUE_ARGUMENT_COMMANDS = ('FBXExportConvertUnitString',)
+    # 所有会话的mel.eval调用总数（性能记录使用）
+    total_mel_calls = 0
+
+    def __init__(self, bake_complex=True):
+        # 导出选项，按顺序设置
+        self.settings = {
+            # 动画导出选项
+            'FBXExportBakeComplexAnimation': 'true' if bake_complex else 'false',
+            'FBXExportBakeComplexStep': '1',
+            # 导出几何体和动画
+            'FBXExportAnimationOnly': 'false',
+            # 启用删除原始Take（这样只保留我们分割的Takes）
+            'FBXExportDeleteOriginalTakeOnSplitAnimation': 'true',
+            # 其他常用设置
+            'FBXExportSmoothingGroups': 'true',
+            'FBXExportHardEdges': 'false',
+            'FBXExportTangents': 'false',
+            'FBXExportSmoothMesh': 'true',
+            'FBXExportInstances': 'false',
+            'FBXExportReferencedAssetsContent': 'true',
+            # 单位设置
+            'FBXExportConvertUnitString': '"cm"',
+        }
+        self.applied = False
+        # mel.eval调用次数（整个会话 / 最近一次导出）
+        self.mel_calls = 0
+        self.last_export_mel_calls = 0
+        # 上一次发送的烘焙范围，相同时不再重复发送
+        self._bake_range = None
+
+    def eval(self, commands):
+        """把多条MEL命令合并为一次mel.eval调用"""
+        if isinstance(commands, str):
+            commands = [commands]
+        self.mel_calls += 1
+        FBXExportSession.total_mel_calls += 1
+        return mel.eval(';\n'.join(commands) + ';')
+
+    def option_commands(self):
+        """生成设置导出选项的MEL命令"""
+        commands = ['FBXResetExport']
+        for command, value in self.settings.items():
+            if command in self.VALUE_ARGUMENT_COMMANDS:
+                commands.append(f'{command} {value}')
+            else:
+                commands.append(f'{command} -v {value}')
+        return commands
+
+    def apply(self):
+        """重置并设置导出选项（每批一次）"""
+        commands = self.option_commands()
+        try:
+            self.eval(commands)
+        except Exception as e:
+            # 合并执行失败时逐条执行，尽量设置其余可用的选项
+            print(f"Warning: Some FBX export settings may not be available: {str(e)}")
+            for command in commands:
+                try:
+                    self.eval(command)
+                except Exception as e:
+                    print(f"Warning: FBX export setting failed: {command} ({str(e)})")
+
+        self.applied = True
+        self._bake_range = None
+        self.verify()
+
+    def verify(self):
+        """一次查询所有开关类选项，检查是否生效"""
+        checked = [(command, value) for command, value in self.settings.items()
+                   if command not in self.VALUE_ARGUMENT_COMMANDS]
+        # mel.eval在全局作用域执行，变量会保留上一次的值，需要先清空
+        script = ['string $reAnimExportValues[]', 'clear $reAnimExportValues']
+        for command, _ in checked:
+            script.append(f'$reAnimExportValues[size($reAnimExportValues)] = (string)`{command} -q`')
+        script.append('$reAnimExportValues')
+
+        try:
+            values = self.eval(script) or []
+        except Exception as e:
+            print(f"Warning: Could not verify FBX export settings: {str(e)}")
+            return False
+
+        expected = {'true': '1', 'false': '0'}
+        mismatches = [f"{command} (expected {value}, got {actual})"
+                      for (command, value), actual in zip(checked, values)
+                      if expected.get(value, value) != str(actual)]
+        for mismatch in mismatches:
+            print(f"Warning: FBX export setting not applied: {mismatch}")
+        return not mismatches
+
+    def export_static(self, filepath):
+        """不分割Take直接导出当前选择"""
+        if not self.applied:
+            self.apply()
+        self.eval(['FBXExportSplitAnimationIntoTakes -clear', f'FBXExport -f {mel_string(filepath)} -s'])
+
+    def export_clip(self, take_name, start_frame, end_frame, filepath):
+        """导出一个片段作为独立的Take（正常情况下只需一次mel.eval）"""
+        calls_before = self.mel_calls
+        if not self.applied:
+            self.apply()
+
+        # 清除现有的动画分割设置
+        commands = ['FBXExportSplitAnimationIntoTakes -clear']
+
+        # 设置烘焙时间范围（只发送变化的部分）
+        if self._bake_range != (start_frame, end_frame):
+            commands.append(f'FBXExportBakeComplexStart -v {start_frame}')
+            commands.append(f'FBXExportBakeComplexEnd -v {end_frame}')
+
+        # 添加Take scripts/others/gameFbxExporter.mel
+        commands.append(f'FBXExportSplitAnimationIntoTakes -v {mel_string(take_name)} {start_frame} {end_frame}')
+
+        # 执行导出并清理
+        commands.append(f'FBXExport -f {mel_string(filepath)} -s')
+        commands.append('FBXExportSplitAnimationIntoTakes -clear')
+
+        try:
+            self.eval(commands)
+            self._bake_range = (start_frame, end_frame)
+        except Exception:
+            # 确保清理
+            self._bake_range = None
+            self.eval('FBXExportSplitAnimationIntoTakes -clear')
+            raise
+        finally:
+            self.last_export_mel_calls = self.mel_calls - calls_before
+
+
+class AnimationExporter:
+    """动画导出核心（不依赖UI，可在mayapy -batch中运行）"""
+
+    # 导出选项默认值（可JSON序列化，会原样传给并行导出的工作进程）
+    DEFAULT_OPTIONS = {
+        # 'per_clip': 每个片段由FBX插件烘焙复杂动画
+        # 'once': 批量导出前把整个时间范围一次性烘焙为普通关键帧，导出时关闭复杂动画烘焙
+        'bake_mode': 'per_clip',
+        # 一次性烘焙后是否撤销烘焙恢复场景（批处理中场景不会保存，可以关闭）
+        'restore_after_bake': True,
+        # 'per_clip': 每个片段调用一次FBXExport
+        # 'split': 整段时间轴只导出一次FBX，再离线拆分为每个片段的FBX
+        # 'pack': 不导出FBX，用OpenMaya采样骨骼通道，写入一个片段包文件（clips.reapack）
+        'export_mode': 'per_clip',
+        # 片段包每次采样的最多帧数（限制内存占用）
+        'pack_chunk_frames': 4096,
+        # 离线拆分使用的进程数，None为CPU核心数
+        'split_workers': None,
+        # 增量导出: 根据输出目录中的导出清单跳过没有变化的片段
+        'incremental': False,
+        # 导出清单分片名称（并行导出的工作进程使用）
+        'manifest_part': None,
+        # 性能记录输出目录，None表示不记录
+        'profile_dir': None,
+        # 导出前检查片段范围: 'off'、'warn'（只输出问题）、'strict'（有问题时不导出）
+        'preflight': 'off',
+        # 一次性烘焙后简化关键帧（只对bake_mode为'once'生效）
+        'reduce_keys': False,
+        # 各类通道的简化误差，见DEFAULT_KEY_TOLERANCES
+        'key_tolerances': None,
+        # 先写到本地临时目录，再在后台传输到导出目录（例如网络共享）
+        'staging': False,
+        # 暂存的本地目录，None表示系统临时目录
+        'scratch_dir': None,
+        # 后台传输线程数
+        'transfer_workers': 4,
+        # 每个片段最多尝试导出的次数（只重试暂时性的错误）
+        'max_attempts': 3,
+        # 第一轮重试前等待的秒数，之后每轮加倍
+        'retry_delay': 2.0,
+        # 'off': 每个片段都导出
+        # 'copy' / 'link': 动作完全相同的片段只导出一次，其余复制或硬链接（需要bake_mode为'once'）
+        'dedupe': 'off',
+        # 批量导出解析列表后，是否把片段表写入场景旁边的片段目录索引文件（<scene>.reclips.json）
+        # 默认只读取已有的索引文件，不在场景目录中写文件
+        'clip_catalog': False,
+        # 'full': 导出选择的几何体和动画
+        # 'skeleton': 只导出选择下的骨骼层级和烘焙后的动画曲线
+        'content': 'full',
+        # 仅骨骼导出时，是否另外把几何体导出一次为绑定姿势的FBX
+        'bind_pose_mesh': False,
+    }
+
+    def __init__(self, status_callback=None, confirm_callback=None, options=None):
+        self.animation_data = ClipTable()
+        # 最近一次解析的统计
+        self.parse_summary = ParseSummary()
+        # 当前动画列表的Noesis输入的哈希（片段目录的键）
+        self.source_hash = None
+        self.options = dict(self.DEFAULT_OPTIONS, **(options or {}))
+        # 当前时间范围是否已经一次性烘焙过，以及烘焙的撤销块是否在撤销队列顶部
+        self.timeline_baked = False
+        self.bake_undoable = False
+        # 当前批次的FBX导出会话
+        self.fbx_session = None
+        # 关键帧简化的统计: 文件名 -> {'keys_before', 'keys_after', 'bytes_saved'}
+        self.key_reduction = {}
+        # 上一个批次每个片段的导出尝试次数，以及失败片段的分类和错误: 索引 -> {'status', 'failure_class', 'error'}
+        self.clip_attempts = []
+        self.clip_failures = {}
+        # 批量导出时缓存导出选择
+        self.selection_cache = ExportSelectionCache()
+        # 性能记录（设置了profile_dir时启用）
+        self.profiler = ExportProfiler(enabled=bool(self.options['profile_dir']))
+        # 状态回调，为None时输出到控制台
+        self.status_callback = status_callback
+        # 没有选择物体时的确认回调，为None时直接导出所有可见物体（批处理模式）
+        self.confirm_callback = confirm_callback
+
+    def update_status(self, message):
+        """报告状态"""
+        if self.status_callback:
+            self.status_callback(message)
+        else:
+            print(message)
+
+    def open_scene(self, scene_path):
+        """打开场景（不保存当前场景）"""
+        cmds.file(scene_path, open=True, force=True, prompt=False)
+        # 新打开的场景还没有烘焙
+        self.timeline_baked = False
+        self.bake_undoable = False
+        print(f"Opened scene: {scene_path}")
+
+    def load_animation_file(self, list_path, scene_path=None):
+        """逐行读取Noesis日志文件中的动画列表，'-'表示标准输入
+
+        指定scene_path时先在场景的片段目录索引文件中查找同一输入的片段表；
+        没有时解析，clip_catalog选项打开时再写入索引文件（写入失败只输出警告）。
+        """
+        if scene_path and list_path != '-':
+            # 只读取一次文件: 计算哈希后，索引中没有时直接解析已经读取的内容
+            with open(list_path, 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read()
+            source_hash = noesis_source_hash(io.StringIO(text))
+            cached = ClipCatalog.load_sidecar(scene_path, source_hash)
+            if cached is not None:
+                self.animation_data, self.source_hash = cached
+                self.parse_summary = ParseSummary()
+                print(f"Loaded {len(self.animation_data)} animations for {list_path} from the clip catalog")
+                return self.animation_data
+            self.parse_animation_text(text)
+        else:
+            with open_noesis_source(list_path) as f:
+                self.load_animation_lines(f)
+
+        if scene_path and list_path != '-' and self.animation_data and self.options['clip_catalog']:
+            try:
+                ClipCatalog.save_sidecar(scene_path, self.animation_data, self.source_hash, list_path)
+            except Exception as e:
+                print(f"Warning: Could not write clip catalog: {str(e)}")
+        return self.animation_data
+
+    def parse_animation_text(self, text):
+        """解析动画文本数据"""
+        return self.load_animation_lines(io.StringIO(text))
+
+    def load_animation_lines(self, lines):
+        """解析逐行输入的Noesis输出，返回修正后的动画列表"""
+        self.parse_summary = ParseSummary()
+        sha = hashlib.sha1()
+        with self.profiler.phase('parse') as event:
+            self.animation_data = ClipTable.from_records(iter_noesis_clips(hashed_lines(lines, sha),
+                                                                           self.parse_summary))
+            event['lines'] = self.parse_summary.line_count
+            event['clips'] = len(self.animation_data)
+        print(self.parse_summary.report())
+
+        # 修正blend pose条目的帧数并重新计算起始帧
+        if self.animation_data:
+            with self.profiler.phase('relayout'):
+                self.fix_blend_pose_frames()
+
+        self.source_hash = sha.hexdigest()
+        return self.animation_data
+
+    def save_clip_catalog(self, source=None):
+        """把当前片段表保存到场景的fileInfo，场景保存过时也写入场景旁边的索引文件"""
+        if not self.animation_data or self.source_hash is None:
+            return
+        ClipCatalog.save_to_scene(self.animation_data, self.source_hash)
+        scene_path = cmds.file(query=True, sceneName=True)
+        if scene_path:
+            try:
+                ClipCatalog.save_sidecar(scene_path, self.animation_data, self.source_hash, source)
+            except OSError as e:
+                print(f"Warning: Could not write clip catalog: {str(e)}")
+
+    def load_clip_catalog(self):
+        """读取场景fileInfo中（或索引文件中最近保存）的片段表，没有时返回None"""
+        cached = ClipCatalog.load_from_scene()
+        if cached is None:
+            scene_path = cmds.file(query=True, sceneName=True)
+            if scene_path:
+                cached = ClipCatalog.load_sidecar(scene_path)
+        if cached is None:
+            return None
+        self.animation_data, self.source_hash = cached
+        self.parse_summary = ParseSummary()
+        return self.animation_data
+
+    def fix_blend_pose_frames(self):
+        """修正blend pose条目的帧数并重新计算起始帧"""
+        moved_count = self.animation_data.relayout()
+
+        # 统计修正的数量
+        blend_pose_count = self.animation_data.blend_pose_count
+        if blend_pose_count > 0 or moved_count > 0:
+            print(f"Fixed {blend_pose_count} blend pose animations and recalculated frame ranges "
+                  f"({moved_count} animations moved)")
+
+    def set_timeline_range(self, anim):
+        """设置timeline范围为指定动画的范围"""
+        # 设置动画范围
+        cmds.playbackOptions(
+            minTime=anim['start_frame'],
+            maxTime=anim['end_frame'],
+            animationStartTime=anim['start_frame'],
+            animationEndTime=anim['end_frame']
+        )
+
+        # 将当前时间设置为动画开始帧
+        cmds.currentTime(anim['start_frame'])
+
+        print(f"Timeline range set to: {anim['start_frame']}-{anim['end_frame']} for animation '{anim['name']}'")
+
+    def fix_framerate_for_dd2(self):
+        """修复DD2动画帧速率为60fps（作用于当前选择）"""
+        # 检查是否有选中的对象
+        if not cmds.ls(selection=True, long=True):
+            raise Exception("No object selected for DD2 frame rate fix")
+
+        report = self.retime_animation(30, 60, pivot=0)
+        print("DD2 frame rate fix completed successfully!")
+        return report
+
+    def retime_animation(self, source_fps, target_fps, pivot=0.0, roots=None, snap=False):
+        """把roots（默认当前选择）层级下的动画从source_fps重定时到target_fps，返回报告
+
+        帧号保持不变，动画按target_fps播放。所有修改在一个撤销块内，可以一次撤销。
+        snap为True时把重定时后不在整数帧上的关键帧吸附到整数帧。
+        """
+        if roots is None:
+            roots = cmds.ls(selection=True, long=True)
+            if not roots:
+                raise Exception("No object selected for retiming")
+
+        source_fps = float(source_fps)
+        target_fps = float(target_fps)
+        source_unit = maya_time_unit(source_fps)
+        target_unit = maya_time_unit(target_fps)
+
+        curves = find_time_anim_curves(roots)
+        time_scale = source_fps / target_fps
+
+        cmds.undoInfo(openChunk=True, chunkName="REAnimRetime")
+        try:
+            cmds.currentUnit(time=source_unit)
+            # 切换到源时间单位后再一次查询所有曲线的关键帧时间（帧号按源帧速率计算）
+            times = (cmds.keyframe(curves, query=True, timeChange=True) or []) if curves else []
+            frames = retime_key_times(times, source_fps, target_fps, pivot)
+            if curves:
+                cmds.scaleKey(curves, timeScale=time_scale, timePivot=pivot)
+            # 切换时间单位时保持关键帧的实际时间，帧号回到原来的数值
+            cmds.currentUnit(time=target_unit)
+            fractional_keys = count_fractional_frames(frames)
+            if snap and fractional_keys and curves:
+                cmds.snapKey(curves, timeMultiple=1)
+        finally:
+            cmds.undoInfo(closeChunk=True)
+
+        report = {
+            'source_fps': source_fps,
+            'target_fps': target_fps,
+            'pivot': pivot,
+            'curves': len(curves),
+            'keys': len(times),
+            'first_frame': float(min(frames)) if len(frames) else None,
+            'last_frame': float(max(frames)) if len(frames) else None,
+            'fractional_keys': fractional_keys,
+            'snapped': bool(snap and fractional_keys)
+        }
+        print(f"Retimed {report['keys']} keys on {report['curves']} curves "
+              f"from {source_fps:g}fps ({source_unit}) to {target_fps:g}fps ({target_unit}), pivot {pivot:g}")
+        if fractional_keys:
+            action = "snapped to whole frames" if snap else "between frames"
+            print(f"  {fractional_keys} keys {action}")
+        return report
+
+    def export_animations(self, animations, export_path, clip_callback=None, progress=None):
+        """依次导出多个动画，返回导出结果（不弹出对话框）
+
+        clip_callback(index, anim, status, error)在每个片段完成后调用，
+        status为'exported'、'skipped'（增量导出时没有变化）或'failed'。
+        progress为ExportProgress时用它报告进度，取消后剩余的片段放入结果的'cancelled'。
+        export_mode为'pack'时改为写入片段包（见export_animations_to_pack）。
+        暂时性的失败在所有片段导出后按退避间隔重试，超过max_attempts次的片段被隔离；
+        遇到致命错误时停止导出，剩余的片段也放入'cancelled'。
+        每个片段的状态和尝试次数按列保存在结果的'statuses'和'attempts'中，失败的详细信息在'failures'中。
+        """
+        if self.options['export_mode'] == 'pack':
+            return self.export_animations_to_pack(animations, export_path, clip_callback, progress)
+
+        exported = []
+        skipped = []
+        failed_exports = []
+        cancelled = []
+        dedupe_groups = []
+        failed_names = set()
+        manifest = None
+        stager = None
+        quarantined = []
+        fatal_errors = []
+        # 失败后等待重试的片段索引
+        retry_queue = []
+        # 按列保存每个片段的结果，片段很多时不为每个片段创建字典
+        statuses = ['cancelled'] * len(animations)
+        attempts = self.clip_attempts = [0] * len(animations)
+        self.clip_failures = {}
+        self.key_reduction = {}
+        self.selection_cache.start()
+
+        def finish_clip(i, anim, error, checksum=None):
+            """记录一个片段的最终结果（暂存输出时在传输完成后调用）"""
+            if error is None:
+                exported.append(anim)
+                statuses[i] = 'exported'
+                reduction = self.key_reduction.get(clip_file_name(anim))
+                if reduction and reduction['keys_before']:
+                    print(f"  Keys: {reduction['keys_before']} -> {reduction['keys_after']} "
+                          f"({reduction['keys_after'] / reduction['keys_before']:.0%}), "
+                          f"about {reduction['bytes_saved']} bytes smaller")
+                if manifest is not None:
+                    manifest.record(clip_file_name(anim), fingerprints[i], checksum)
+            else:
+                failure_class = classify_export_error(error)
+                if failure_class == 'transient' and attempts[i] < self.options['max_attempts']:
+                    print(f"Failed to export {anim['name']} (attempt {attempts[i]}): {error}, will retry")
+                    retry_queue.append(i)
+                    return
+                status = 'quarantined' if failure_class == 'transient' else 'failed'
+                if status == 'quarantined':
+                    quarantined.append(anim)
+                if failure_class == 'fatal':
+                    fatal_errors.append(error)
+                statuses[i] = status
+                self.clip_failures[i] = {'status': status, 'failure_class': failure_class, 'error': error}
+                failed_exports.append(f"{anim['name']}: {error}")
+                failed_names.add(clip_file_name(anim))
+                print(f"Failed to export {anim['name']} ({status}, {failure_class}): {error}")
+
+            if clip_callback:
+                clip_callback(i, anim, 'exported' if error is None else 'failed', error)
+
+        try:
+            if self.options['preflight'] != 'off' and animations:
+                self.update_status("Checking animation ranges...")
+                with self.profiler.phase('preflight'):
+                    preflight = self.preflight(animations)
+                if preflight.issue_count and self.options['preflight'] == 'strict':
+                    raise Exception(f"Pre-flight check found {preflight.issue_count} issues, nothing exported")
+
+            if self.options['content'] == 'skeleton' and self.options['bind_pose_mesh'] and animations:
+                self.update_status("Exporting bind pose mesh...")
+                with self.profiler.phase('bind pose') as event:
+                    bind_pose_path = self.export_bind_pose_mesh(export_path)
+                    if self.profiler.enabled:
+                        event['bytes'] = os.path.getsize(bind_pose_path)
+
+            if self.options['reduce_keys'] and self.options['bake_mode'] != 'once':
+                print("Warning: Key reduction needs the timeline baked once, keys are not reduced")
+
+            # 增量导出: 在烘焙前用源动画曲线计算每个片段的指纹，和导出清单比较
+            fingerprints = [None] * len(animations)
+            up_to_date = [False] * len(animations)
+            if self.options['incremental'] and animations:
+                self.update_status("Checking export manifest...")
+                with self.profiler.phase('manifest'):
+                    manifest = ExportManifest(export_path, self.options['manifest_part'])
+                    # 导出设置按烘焙后的会话计算（一次性烘焙时不由FBX插件烘焙）
+                    bake_complex = self.options['bake_mode'] != 'once' and not self.timeline_baked
+                    fingerprints = self.clip_fingerprints(animations, self.create_fbx_export_session(bake_complex))
+                    up_to_date = [manifest.is_up_to_date(clip_file_name(anim), fingerprint)
+                                  for anim, fingerprint in zip(animations, fingerprints)]
+                print(f"Export manifest: {up_to_date.count(True)}/{len(animations)} animations up to date")
+
+            pending = [i for i in range(len(animations)) if not up_to_date[i]]
+
+            # 只烘焙需要导出的片段，全部片段都没有变化时不烘焙
+            if self.options['bake_mode'] == 'once' and pending:
+                self.update_status(f"Baking timeline for {len(pending)} animations...")
+                with self.profiler.phase('bake'):
+                    self.bake_timeline([animations[i] for i in pending], select=True)
+
+            # 整个批次只设置一次导出选项
+            with self.profiler.phase('setup'):
+                session = self.fbx_session = self.setup_fbx_export_settings_for_clips()
+
+            # 重复片段: 索引 -> 同组中导出的片段索引
+            duplicates = {}
+            if self.options['dedupe'] != 'off' and len(pending) > 1:
+                if self.timeline_baked:
+                    self.update_status("Looking for duplicate animations...")
+                    with self.profiler.phase('dedupe'):
+                        groups = self.find_duplicate_clips([animations[i] for i in pending])
+                    for group in groups:
+                        for member in group[1:]:
+                            duplicates[pending[member]] = pending[group[0]]
+                        dedupe_groups.append([clip_file_name(animations[pending[member]]) for member in group])
+                    pending = [i for i in pending if i not in duplicates]
+                    print(f"Found {len(duplicates)} duplicate animations in {len(dedupe_groups)} groups")
+                else:
+                    print("Warning: Duplicate detection needs the timeline baked once, exporting every animation")
+
+            # 暂存输出: FBX先写到本地临时目录，后台传输到导出目录
+            output_path = export_path
+            transferring = deque()
+            if self.options['staging'] and pending:
+                stager = OutputStager(export_path, self.options['scratch_dir'], self.options['transfer_workers'])
+                output_path = stager.scratch_dir
+            # 重复片段的来源文件在本地保留到批次结束，供复制使用
+            dedupe_sources = set(duplicates.values())
+
+            if self.options['export_mode'] == 'split' and pending:
+                split_errors = self.export_timeline_and_split([animations[i] for i in pending], output_path)
+                errors = dict(zip(pending, split_errors))
+            else:
+                errors = None
+
+            def finish_transfers(wait=False):
+                """处理已完成（wait为True时等待所有）的传输"""
+                if wait and transferring:
+                    self.update_status(f"Waiting for {len(transferring)} file transfers...")
+                while transferring and (wait or transferring[0][2].done()):
+                    i, anim, future = transferring.popleft()
+                    try:
+                        finish_clip(i, anim, None, future.result()['checksum'])
+                    except Exception as e:
+                        finish_clip(i, anim, str(e))
+
+            def export_clip(i, anim, first_pass):
+                """导出（重复片段则复制）一个片段并记录结果"""
+                attempts[i] += 1
+                error = validate_clip(anim)
+                if error is not None:
+                    finish_clip(i, anim, error)
+                    return
+
+                if i in duplicates:
+                    source = animations[duplicates[i]]
+                    try:
+                        if clip_file_name(source) in failed_names:
+                            raise Exception(f"Identical animation {source['name']} failed to export")
+                        copy_duplicate_export(os.path.join(output_path, clip_file_name(source)),
+                                              os.path.join(output_path, clip_file_name(anim)),
+                                              source, anim, link=self.options['dedupe'] == 'link')
+                        print(f"Reused export of {source['name']} (ID: {source['id']}) for {anim['name']} (ID: {anim['id']})")
+                    except Exception as e:
+                        error = str(e)
+                elif errors is not None and first_pass:
+                    error = errors[i]
+                else:
+                    # 重试时即使是拆分模式也单独导出片段
+                    try:
+                        if progress is None:
+                            self.update_status(f"Exporting... {i+1}/{len(animations)}: {anim['name']}")
+                        with self.profiler.phase('clip', clip=clip_file_name(anim)):
+                            self.export_single_animation_as_take(anim, output_path)
+                    except Exception as e:
+                        error = str(e)
+
+                if stager is not None and error is None:
+                    future = stager.submit(clip_file_name(anim), keep_local=i in dedupe_sources)
+                    transferring.append((i, anim, future))
+                    finish_transfers()
+                else:
+                    finish_clip(i, anim, error)
+
+            for i, anim in enumerate(animations):
+                if progress is not None and progress.update(i, len(animations), f"Exporting... {i+1}/{len(animations)}: {anim['name']}"):
+                    cancelled = list(animations[i:])
+                    print(f"Export cancelled, {len(cancelled)} animations not exported")
+                    break
+
+                if fatal_errors:
+                    cancelled = list(animations[i:])
+                    print(f"Export stopped: {fatal_errors[0]}, {len(cancelled)} animations not exported")
+                    break
+
+                if up_to_date[i]:
+                    skipped.append(anim)
+                    statuses[i] = 'skipped'
+                    if clip_callback:
+                        clip_callback(i, anim, 'skipped', None)
+                    continue
+
+                export_clip(i, anim, first_pass=True)
+
+            # 所有传输完成后才算导出完成，传输失败的片段也会进入重试
+            with self.profiler.phase('transfer wait'):
+                finish_transfers(wait=True)
+
+            # 暂时性失败的片段: 按指数退避间隔一轮一轮重试
+            retry_round = 0
+            while retry_queue and not cancelled and not fatal_errors:
+                retry = sorted(retry_queue)
+                retry_queue.clear()
+                delay = self.options['retry_delay'] * 2 ** retry_round
+                retry_round += 1
+                print(f"Retrying {len(retry)} animations in {delay:.1f}s (round {retry_round})")
+                time.sleep(delay)
+
+                for position, i in enumerate(retry):
+                    anim = animations[i]
+                    message = f"Retrying... {position+1}/{len(retry)}: {anim['name']}"
+                    if progress is not None and progress.update(len(animations) - len(retry) + position,
+                                                                len(animations), message):
+                        cancelled = [animations[j] for j in retry[position:]]
+                        print(f"Export cancelled, {len(cancelled)} animations not exported")
+                        break
+                    if fatal_errors:
+                        cancelled = [animations[j] for j in retry[position:]]
+                        break
+                    export_clip(i, anim, first_pass=False)
+
+                with self.profiler.phase('transfer wait'):
+                    finish_transfers(wait=True)
+
+            # 取消或停止时仍在等待重试的片段
+            cancelled += [animations[i] for i in sorted(retry_queue)]
+            if stager is not None:
+                print(f"Transferred {stager.transferred_count} files ({stager.transferred_bytes} bytes) "
+                      f"to {export_path}, {stager.retry_count} retries")
+        finally:
+            if stager is not None:
+                stager.close()
+            self.fbx_session = None
+            self.selection_cache.stop()
+            if manifest is not None:
+                manifest.save()
+            if self.timeline_baked and self.options['restore_after_bake']:
+                self.restore_baked_timeline()
+            if self.profiler.enabled:
+                label = f"{os.path.basename(os.path.normpath(export_path))}-{os.getpid()}"
+                self.profiler.write(self.options['profile_dir'], label)
+                self.profiler.reset()
+
+        if progress is not None:
+            progress.update(len(animations) - len(cancelled), len(animations), "Finishing export...", force=True)
+        print(f"FBX export used {session.mel_calls} MEL calls for {len(animations)} animations")
+        for group in dedupe_groups[:20]:
+            print(f"  Identical: {group[0]} -> {', '.join(group[1:])}")
+        if len(dedupe_groups) > 20:
+            print(f"  ... and {len(dedupe_groups) - 20} more duplicate groups")
+        if quarantined:
+            print(f"Quarantined {len(quarantined)} animations that failed {self.options['max_attempts']} times")
+
+        return {'exported': exported, 'skipped': skipped, 'failed': failed_exports, 'cancelled': cancelled,
+                'quarantined': quarantined, 'fatal': fatal_errors[0] if fatal_errors else None,
+                'statuses': statuses, 'attempts': attempts, 'failures': self.clip_failures,
+                'duplicates': dedupe_groups, 'key_reduction': self.key_reduction, 'mel_calls': session.mel_calls}
+
+    def export_animations_to_pack(self, animations, export_path, clip_callback=None, progress=None):
+        """不经过FBX插件，把每个片段的骨骼局部通道采样写入导出目录中的片段包，返回与export_animations相同格式的结果
+
+        骨骼通道按块批量采样（每块最多pack_chunk_frames帧），每个片段ID在包中只有一个条目。
+        """
+        statuses = ['cancelled'] * len(animations)
+        self.clip_attempts = [0] * len(animations)
+        self.clip_failures = {}
+        self.key_reduction = {}
+        failed_exports = []
+        cancelled = []
+
+        # 每个ID只写入第一个片段
+        packed = []
+        seen_ids = set()
+        for i, anim in enumerate(animations):
+            error = validate_clip(anim)
+            if error is None and anim['id'] in seen_ids:
+                error = f"Duplicate clip ID {anim['id']}"
+            if error is None:
+                seen_ids.add(anim['id'])
+                packed.append(i)
+            else:
+                statuses[i] = 'failed'
+                self.clip_failures[i] = {'status': 'failed', 'failure_class': 'invalid', 'error': error}
+                failed_exports.append(f"{anim['name']}: {error}")
+
+        pack_path = os.path.join(export_path, CLIP_PACK_FILE_NAME)
+        self.selection_cache.start()
+        try:
+            if self.options['bake_mode'] == 'once' and packed:
+                self.update_status(f"Baking timeline for {len(packed)} animations...")
+                with self.profiler.phase('bake'):
+                    self.bake_timeline([animations[i] for i in packed])
+            elif cmds.ls(type='ikHandle'):
+                print("Warning: Joints driven by IK are only sampled correctly with the timeline baked once")
+
+            with self.profiler.phase('selection'):
+                joints, parents = self.collect_pack_joints()
+            if not joints:
+                raise Exception("No joints found under the export selection!")
+            sampler = JointChannelSampler(joints)
+            print(f"Sampling {len(joints)} joints: {len(sampler.curves)} curves, "
+                  f"{len(sampler.driven_plugs)} driven and {len(sampler.constants)} constant channels")
+
+            frame_size = 4 * len(joints) * len(CLIP_PACK_CHANNELS)
+            chunk_frames = self.options['pack_chunk_frames']
+
+            def clip_data():
+                """按块采样，逐个返回片段的数据"""
+                position = 0
+                while position < len(packed):
+                    chunk = [packed[position]]
+                    frame_total = animations[packed[position]]['frame_count']
+                    position += 1
+                    while (position < len(packed)
+                           and frame_total + animations[packed[position]]['frame_count'] <= chunk_frames):
+                        frame_total += animations[packed[position]]['frame_count']
+                        chunk.append(packed[position])
+                        position += 1
+
+                    if progress is not None and progress.update(position - len(chunk), len(animations),
+                                                                f"Sampling... {position}/{len(packed)}"):
+                        raise ExportCancelled()
+                    if progress is None:
+                        self.update_status(f"Sampling... {position}/{len(packed)}")
+
+                    # 块内所有片段的帧只采样一次（重叠的片段共用）
+                    frames = sorted({frame for i in chunk
+                                     for frame in range(animations[i]['start_frame'], animations[i]['end_frame'] + 1)})
+                    rows = {frame: row for row, frame in enumerate(frames)}
+                    with self.profiler.phase('sample', frames=len(frames)):
+                        data = sampler.sample(frames)
+                    for i in chunk:
+                        first = rows[animations[i]['start_frame']]
+                        self.clip_attempts[i] = 1
+                        yield data[first * frame_size:(first + animations[i]['frame_count']) * frame_size]
+
+            fps = mel.eval('currentTimeUnitToFPS')
+            with self.profiler.phase('pack') as event:
+                write_clip_pack(pack_path, joints, parents, fps, [animations[i] for i in packed], clip_data(),
+                                sampler.joint_orients, sampler.rotate_axes, sampler.rotate_orders)
+                if self.profiler.enabled:
+                    event['bytes'] = os.path.getsize(pack_path)
+            for i in packed:
+                statuses[i] = 'exported'
+            print(f"Wrote {len(packed)} animations to {pack_path} ({os.path.getsize(pack_path)} bytes)")
+        except ExportCancelled:
+            cancelled = [animations[i] for i in packed]
+            print(f"Export cancelled, {len(cancelled)} animations not exported")
+        finally:
+            self.selection_cache.stop()
+            if self.timeline_baked and self.options['restore_after_bake']:
+                self.restore_baked_timeline()
+            if self.profiler.enabled:
+                label = f"{os.path.basename(os.path.normpath(export_path))}-{os.getpid()}"
+                self.profiler.write(self.options['profile_dir'], label)
+                self.profiler.reset()
+
+        exported = [animations[i] for i in range(len(animations)) if statuses[i] == 'exported']
+        if clip_callback:
+            for i, anim in enumerate(animations):
+                if statuses[i] != 'cancelled':
+                    clip_callback(i, anim, 'exported' if statuses[i] == 'exported' else 'failed',
+                                  self.clip_failures.get(i, {}).get('error'))
+        return {'exported': exported, 'skipped': [], 'failed': failed_exports, 'cancelled': cancelled,
+                'quarantined': [], 'fatal': None, 'statuses': statuses, 'attempts': self.clip_attempts,
+                'failures': self.clip_failures, 'duplicates': [], 'key_reduction': {}, 'mel_calls': 0,
+                'pack': pack_path}
+
+    def collect_pack_joints(self):
+        """导出选择（含子级）中的骨骼，父骨骼在前，返回(长名称列表, 父骨骼序号列表)"""
+        roots = self.ensure_export_selection()
+        joints = cmds.ls(roots, type='joint', long=True) or []
+        # listRelatives按深度优先的逆序返回
+        descendants = cmds.listRelatives(roots, allDescendents=True, type='joint', fullPath=True) or []
+        joints = list(dict.fromkeys(joints + descendants[::-1]))
+        index = {joint: i for i, joint in enumerate(joints)}
+        parents = [index.get(joint.rsplit('|', 1)[0], -1) for joint in joints]
+        return joints, parents
+
+    def scene_keyed_range(self):
+        """导出选择的动画曲线上第一个和最后一个关键帧的时间，没有关键帧时返回None"""
+        _, curves = self.collect_export_curves()
+        if not curves:
+            return None
+        # findKeyframe在所有曲线上一次查找
+        first_key = cmds.findKeyframe(curves, which='first')
+        last_key = cmds.findKeyframe(curves, which='last')
+        return (first_key, last_key)
+
+    def preflight(self, animations):
+        """导出前检查片段范围和场景中的关键帧，输出并返回PreflightReport"""
+        report = check_clip_ranges(animations, self.scene_keyed_range())
+        print(report.report())
+        return report
+
+    def collect_export_curves(self):
+        """导出选择（含所有子级）的节点和连接的动画曲线"""
+        roots = self.ensure_export_selection()
+        nodes = sorted(set(roots + (cmds.listRelatives(roots, allDescendents=True, fullPath=True) or [])))
+        curves = sorted(set(cmds.keyframe(nodes, query=True, name=True) or []))
+        return nodes, curves
+
+    def clip_fingerprints(self, animations, session=None):
+        """每个片段的指纹: 帧范围、源曲线数据哈希和导出设置哈希
+
+        源数据哈希包含导出节点、动画曲线名称和片段范围内的关键帧（每个片段一次批量查询），
+        不包含非动画的改动（例如模型修改），这时请关闭增量导出重新导出。
+        一次性烘焙时要在烘焙前计算，session为用来计算导出设置哈希的会话（默认为当前批次的会话）。
+        """
+        session = session or self.fbx_session
+        nodes, curves = self.collect_export_curves()
+        scene_hash = hashlib.sha1('\n'.join(nodes + curves).encode('utf-8'))
+
+        settings_hash = hashlib.sha1(json.dumps({
+            'fbx': session.option_commands(),
+            'bake_mode': self.options['bake_mode'],
+            'export_mode': self.options['export_mode'],
+            'key_tolerances': dict(DEFAULT_KEY_TOLERANCES, **(self.options['key_tolerances'] or {}))
+            if self.options['reduce_keys'] else None,
+        }, sort_keys=True).encode('utf-8')).hexdigest()
+
+        fingerprints = []
+        for anim in animations:
+            source_hash = scene_hash.copy()
+            if curves:
+                keys = cmds.keyframe(curves, query=True, time=(anim['start_frame'], anim['end_frame']),
+                                     timeChange=True, valueChange=True) or []
+                source_hash.update(array.array('d', keys).tobytes())
+
+            fingerprints.append({
+                'name': anim['name'],
+                'id': anim['id'],
+                'start_frame': anim['start_frame'],
+                'end_frame': anim['end_frame'],
+                'source_hash': source_hash.hexdigest(),
+                'settings_hash': settings_hash
+            })
+        return fingerprints
+
+    def clip_motion_hashes(self, animations):
+        """不受时间偏移影响的片段动作哈希（基于烘焙后的关键帧）
+
+        每条曲线只查询一次全部关键帧，再按片段范围切片，
+        哈希片段长度、相对片段起点的关键帧时间和数值。片段范围内没有关键帧时为None。
+        """
+        _, curves = self.collect_export_curves()
+        snapshots = []
+        for curve in curves:
+            keys = cmds.keyframe(curve, query=True, timeChange=True, valueChange=True) or []
+            if np is not None:
+                keys = np.asarray(keys, dtype=np.float64).reshape(-1, 2)
+                snapshots.append((keys[:, 0], keys[:, 1]))
+            else:
+                snapshots.append((keys[0::2], keys[1::2]))
+
+        # 浮点误差范围内相同的数值视为相同
+        epsilon = 1e-4
+        hashes = []
+        for anim in animations:
+            start_frame, end_frame = anim['start_frame'], anim['end_frame']
+            digest = hashlib.sha1(struct.pack('<d', end_frame - start_frame))
+            key_count = 0
+            for times, values in snapshots:
+                if np is not None:
+                    first = int(np.searchsorted(times, start_frame - epsilon, 'left'))
+                    last = int(np.searchsorted(times, end_frame + epsilon, 'right'))
+                    data = np.concatenate((np.round(times[first:last] - start_frame, 4),
+                                           np.round(values[first:last], 6))) + 0.0
+                    data = data.tobytes()
+                else:
+                    first = bisect.bisect_left(times, start_frame - epsilon)
+                    last = bisect.bisect_right(times, end_frame + epsilon)
+                    data = array.array('d', [round(t - start_frame, 4) + 0.0 for t in times[first:last]] +
+                                       [round(v, 6) + 0.0 for v in values[first:last]]).tobytes()
+                key_count += last - first
+                digest.update(struct.pack('<I', last - first))
+                digest.update(data)
+            hashes.append(digest.hexdigest() if key_count else None)
+        return hashes
+
+    def find_duplicate_clips(self, animations):
+        """按动作哈希分组，返回包含两个以上片段的组（animations中的索引，第一个为要导出的片段）"""
+        groups = {}
+        for i, motion_hash in enumerate(self.clip_motion_hashes(animations)):
+            if motion_hash is not None:
+                groups.setdefault(motion_hash, []).append(i)
+        return [group for group in groups.values() if len(group) > 1]
+
+    def export_timeline_and_split(self, animations, export_path):
+        """整段时间轴只导出一次FBX，再离线拆分为每个片段的FBX，返回与animations对应的错误列表"""
+        start_frame = min(anim['start_frame'] for anim in animations)
+        end_frame = max(anim['end_frame'] for anim in animations)
+        self.ensure_export_selection(select=True)
+
+        work_dir = tempfile.mkdtemp(prefix="re_anim_timeline_")
+        timeline_path = os.path.join(work_dir, "timeline.fbx").replace('\\', '/')
+        try:
+            self.update_status(f"Exporting timeline: frames {start_frame}-{end_frame}...")
+            with self.profiler.phase('FBXExport', clip=TIMELINE_TAKE_NAME) as event:
+                self.fbx_session.export_clip(TIMELINE_TAKE_NAME, start_frame, end_frame, timeline_path)
+                if self.profiler.enabled:
+                    event['bytes'] = os.path.getsize(timeline_path)
+            fps = self.fbx_session.eval('currentTimeUnitToFPS')
+
+            self.update_status(f"Splitting timeline into {len(animations)} animations...")
+            with self.profiler.phase('split', clips=len(animations)):
+                errors = split_fbx_clips(timeline_path, animations, export_path,
+                                         workers=self.options['split_workers'], fps=fps)
+            print(f"Split timeline {start_frame}-{end_frame} into {errors.count(None)}/{len(animations)} FBX files")
+            return errors
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def bake_timeline(self, animations, select=False):
+        """把所有片段覆盖的时间范围一次性烘焙为普通关键帧
+
+        需要导出后恢复时，烘焙放在一个撤销块中，并且应是之后撤销队列顶部的一步:
+        select为True时在烘焙前选中导出节点，导出过程中不再改变选择。撤销关闭时拒绝烘焙。
+        """
+        start_frame = min(anim['start_frame'] for anim in animations)
+        end_frame = max(anim['end_frame'] for anim in animations)
+
+        restore = self.options['restore_after_bake']
+        if restore and not cmds.undoInfo(query=True, state=True):
+            raise Exception("Undo is turned off, the timeline bake could not be restored after export")
+
+        roots = self.ensure_export_selection(select=select)
+        nodes = roots + (cmds.listRelatives(roots, allDescendents=True, fullPath=True, type='transform') or [])
+
+        cmds.undoInfo(openChunk=True, chunkName=BAKE_UNDO_CHUNK_NAME)
+        try:
+            cmds.bakeResults(
+                nodes,
+                time=(start_frame, end_frame),
+                sampleBy=1,
+                simulation=True,
+                disableImplicitControl=True,
+                preserveOutsideKeys=True,
+                sparseAnimCurveBake=False,
+                minimizeRotation=False
+            )
+            # 简化关键帧和烘焙在同一个撤销块中，恢复时一起撤销
+            if self.options['reduce_keys']:
+                with self.profiler.phase('key reduction'):
+                    self.reduce_baked_keys(nodes, animations)
+        finally:
+            cmds.undoInfo(closeChunk=True)
+
+        self.timeline_baked = True
+        self.bake_undoable = BAKE_UNDO_CHUNK_NAME in (cmds.undoInfo(query=True, undoName=True) or '')
+        if restore and not self.bake_undoable:
+            print("Warning: Timeline bake is not in the undo queue, baked keys will not be restored")
+        print(f"Baked {len(nodes)} nodes over frames {start_frame}-{end_frame}")
+
+    def classify_curve_channels(self, curves):
+        """按曲线类型和连接的属性把动画曲线分为translate、rotate、scale、other"""
+        channels = dict.fromkeys(curves, 'other')
+        for curve in cmds.ls(curves, type='animCurveTL') or []:
+            channels[curve] = 'translate'
+        for curve in cmds.ls(curves, type='animCurveTA') or []:
+            channels[curve] = 'rotate'
+
+        unitless_curves = cmds.ls(curves, type='animCurveTU') or []
+        if unitless_curves:
+            # 一次查询所有无单位曲线连接的属性，返回[曲线.output, 节点.属性, ...]
+            connections = cmds.listConnections(unitless_curves, connections=True, plugs=True,
+                                               source=False, destination=True) or []
+            for curve_plug, target_plug in zip(connections[0::2], connections[1::2]):
+                if target_plug.rsplit('.', 1)[-1].startswith('scale'):
+                    channels[curve_plug.split('.')[0]] = 'scale'
+        return channels
+
+    def reduce_baked_keys(self, nodes, animations):
+        """简化烘焙后的关键帧: 在误差范围内删除常量和线性段上多余的关键帧，片段起止帧的关键帧总是保留
+
+        统计每个片段简化前后的关键帧数，保存在self.key_reduction中。
+        """
+        tolerances = dict(DEFAULT_KEY_TOLERANCES, **(self.options['key_tolerances'] or {}))
+        curves = cmds.keyframe(nodes, query=True, name=True) or []
+        if not curves:
+            return
+        channels = self.classify_curve_channels(curves)
+
+        boundaries = sorted({frame for anim in animations for frame in (anim['start_frame'], anim['end_frame'])})
+        start_frames = [anim['start_frame'] for anim in animations]
+        end_frames = [anim['end_frame'] for anim in animations]
+        if np is not None:
+            range_starts = np.asarray(start_frames, dtype=np.float64) - 1e-4
+            range_ends = np.asarray(end_frames, dtype=np.float64) + 1e-4
+            keys_before = np.zeros(len(animations), dtype=np.int64)
+            keys_after = np.zeros(len(animations), dtype=np.int64)
+        else:
+            keys_before = [0] * len(animations)
+            keys_after = [0] * len(animations)
+        removed_count = 0
+
+        for curve in curves:
+            keys = cmds.keyframe(curve, query=True, timeChange=True, valueChange=True) or []
+            times, values = keys[0::2], keys[1::2]
+            keep = simplify_curve_keys(times, values, tolerances[channels.get(curve, 'other')], boundaries)
+
+            ranges = removed_key_ranges(keep)
+            if ranges:
+                cmds.cutKey(curve, index=ranges, clear=True)
+                removed_count += sum(last - first + 1 for first, last in ranges)
+
+            # 每个片段范围内简化前后的关键帧数（kept_count[i]为前i个关键帧中保留的数量）
+            kept_count = [0]
+            kept_count.extend(itertools.accumulate(keep))
+            if np is not None:
+                firsts = np.searchsorted(times, range_starts, 'left')
+                lasts = np.searchsorted(times, range_ends, 'right')
+                kept_count = np.asarray(kept_count, dtype=np.int64)
+                keys_before += lasts - firsts
+                keys_after += kept_count[lasts] - kept_count[firsts]
+            else:
+                for i in range(len(animations)):
+                    first = bisect.bisect_left(times, start_frames[i] - 1e-4)
+                    last = bisect.bisect_right(times, end_frames[i] + 1e-4)
+                    keys_before[i] += last - first
+                    keys_after[i] += kept_count[last] - kept_count[first]
+
+        # 保留的关键帧之间使用线性插值，和简化时的误差计算一致
+        cmds.keyTangent(curves, time=(min(start_frames), max(end_frames)),
+                        inTangentType='linear', outTangentType='linear')
+
+        for anim, before, after in zip(animations, map(int, keys_before), map(int, keys_after)):
+            self.key_reduction[clip_file_name(anim)] = {
+                'keys_before': before,
+                'keys_after': after,
+                'bytes_saved': (before - after) * ESTIMATED_FBX_BYTES_PER_KEY
+            }
+        print(f"Key reduction removed {removed_count} keys from {len(curves)} curves")
+
+    def restore_baked_timeline(self):
+        """撤销一次性烘焙，恢复原始动画，返回是否恢复成功
+
+        只在撤销队列顶部是烘焙的撤销块时撤销一步；烘焙之后队列有其他变化时不撤销，
+        避免撤销用户的其他操作。
+        """
+        undoable, self.bake_undoable = self.bake_undoable, False
+        undo_name = cmds.undoInfo(query=True, undoName=True) or ''
+        if not undoable or BAKE_UNDO_CHUNK_NAME not in undo_name:
+            # 烘焙的关键帧仍在场景中，timeline_baked保持为True
+            print(f"Warning: Timeline bake is not the last undo step ({undo_name or 'empty undo queue'}), "
+                  f"baked keys were not restored")
+            return False
+        cmds.undo()
+        self.timeline_baked = False
+        print("Restored animation after timeline bake")
+        return True
+
+    def export_roots(self):
+        """导出选择的根节点: 当前选择，没有选择时确认后使用所有可见物体（不改变选择）
+
+        批量导出期间结果会被缓存（只询问一次），场景DAG变化时重新解析。
+        """
+        cache = self.selection_cache
+        if cache.active:
+            if cache.error:
+                raise Exception(cache.error)
+            if cache.roots is not None:
+                return cache.roots
+
+        try:
+            with self.profiler.phase('selection'):
+                roots = self.resolve_export_roots()
+        except Exception as e:
+            if cache.active:
+                cache.error = str(e)
+            raise
+
+        if cache.active:
+            cache.roots = roots
+        return roots
+
+    def ensure_export_selection(self, select=False):
+        """返回导出节点（仅骨骼导出时为其中的骨骼），select为True时同时选中这些节点
+
+        解析导出节点不改变选择，FBX导出前才选中（批量导出期间只选择一次）。
+        """
+        cache = self.selection_cache
+        content = self.options['content']
+        roots = self.export_roots()
+        if cache.active and cache.nodes is not None and cache.content == content:
+            nodes = cache.nodes
+        else:
+            nodes = self.resolve_export_selection(roots, content)
+            if cache.active:
+                cache.nodes, cache.content, cache.selected = nodes, content, False
+
+        if select and not (cache.active and cache.selected):
+            cmds.select(nodes)
+            cache.selected = cache.active
+        return nodes
+
+    def resolve_export_roots(self):
+        """当前选择，没有选择时确认后返回所有可见物体"""
+        selected_objects = cmds.ls(selection=True, long=True)
+        if selected_objects:
+            return selected_objects
+
+        if self.confirm_callback and not self.confirm_callback():
+            raise Exception("Export cancelled - no objects to export!")
+
+        selected_objects = find_visible_transforms()
+        if not selected_objects:
+            raise Exception("No visible objects found to export!")
+        print(f"Using {len(selected_objects)} visible objects for export")
+        return selected_objects
+
+    def resolve_export_selection(self, roots, content=None):
+        """按导出内容解析导出节点: 完整导出时为roots，仅骨骼导出时为其中和其下的骨骼"""
+        content = content or self.options['content']
+        if content != 'skeleton':
+            return roots
+
+        # 只导出骨骼，FBX导出时不会带上几何体
+        joints = (cmds.ls(roots, type='joint', long=True) or []) + \
+                 (cmds.listRelatives(roots, allDescendents=True, type='joint', fullPath=True) or [])
+        joints = sorted(set(joints))
+        if not joints:
+            raise Exception("No joints found under the export selection!")
+
+        print(f"Found {len(joints)} joints for skeleton-only export")
+        return joints
+
+    def export_bind_pose_mesh(self, export_path):
+        """把几何体和骨骼导出一次为绑定姿势、不含动画的FBX（配合仅骨骼导出使用）"""
+        # 使用完整的导出选择（含几何体），而不是仅骨骼导出时选中的骨骼
+        roots = self.export_roots()
+        filepath = os.path.join(export_path, BIND_POSE_FILE_NAME).replace('\\', '/')
+
+        session = FBXExportSession(bake_complex=False)
+        session.settings['FBXProperty "Export|IncludeGrp|Animation"'] = 'false'
+        session.apply()
+
+        # 临时选中完整的导出选择并恢复绑定姿势，导出后一起撤销
+        cmds.undoInfo(openChunk=True, chunkName="REAnimExportBindPose")
+        try:
+            cmds.select(roots)
+            # 选择中的骨骼和选择下的所有骨骼
+            joints = (cmds.ls(roots, type='joint', long=True) or []) + \
+                     (cmds.listRelatives(roots, allDescendents=True, type='joint', fullPath=True) or [])
+            joints = sorted(set(joints))
+            try:
+                if joints:
+                    cmds.dagPose(joints, restore=True, g=True, bindPose=True)
+            except Exception as e:
+                print(f"Warning: Could not restore bind pose, exporting the current pose: {str(e)}")
+            session.export_static(filepath)
+        finally:
+            # 撤销同时恢复导出前的选择，不在撤销队列中留下其他步骤
+            cmds.undoInfo(closeChunk=True)
+            cmds.undo()
+
+        print(f"Exported bind pose mesh to {filepath} ({os.path.getsize(filepath)} bytes)")
+        return filepath
+
+    def compare_content_modes(self, animations, export_path, sample_size=10):
+        """用部分片段对比完整导出和仅骨骼导出的文件大小和耗时，返回报告
+
+        两种模式都从原始动画开始: 上一个模式的一次性烘焙没有撤销时（批处理中不撤销），
+        重新打开场景并恢复选择后再导出下一个模式。
+        """
+        step = max(len(animations) // max(sample_size, 1), 1)
+        sample = [animations[i] for i in range(0, len(animations), step)][:sample_size]
+        scene_path = cmds.file(query=True, sceneName=True)
+        selection = cmds.ls(selection=True, long=True) or []
+
+        report = {'clips': len(sample), 'modes': {}}
+        saved_options = dict(self.options)
+        # 对比时不导出绑定姿势文件、不跳过已导出的片段
+        self.options.update({'bind_pose_mesh': False, 'incremental': False})
+        try:
+            for content in ('full', 'skeleton'):
+                if self.timeline_baked:
+                    if not scene_path or self.options['restore_after_bake']:
+                        raise Exception("The timeline bake of the previous content mode was not undone, "
+                                        "the modes cannot be compared")
+                    self.open_scene(scene_path)
+                    cmds.select(clear=True)
+                    if selection:
+                        cmds.select(selection)
+                self.options['content'] = content
+                mode_path = os.path.join(export_path, f"_compare_{content}")
+                os.makedirs(mode_path, exist_ok=True)
+
+                start_time = time.perf_counter()
+                result = self.export_animations(sample, mode_path)
+                elapsed = time.perf_counter() - start_time
+                total_bytes = sum(os.path.getsize(os.path.join(mode_path, clip_file_name(anim)))
+                                  for anim in result['exported'])
+                report['modes'][content] = {
+                    'exported': len(result['exported']),
+                    'seconds': round(elapsed, 3),
+                    'bytes': total_bytes
+                }
+        finally:
+            self.options = saved_options
+
+        full, skeleton = report['modes']['full'], report['modes']['skeleton']
+        print(f"Content mode comparison ({len(sample)} clips):")
+        for content, stats in report['modes'].items():
+            print(f"  {content:<9} {stats['exported']} clips, {stats['bytes']} bytes, {stats['seconds']:.2f}s")
+        if full['bytes'] and full['seconds']:
+            print(f"  skeleton/full: size {skeleton['bytes'] / full['bytes']:.1%}, "
+                  f"time {skeleton['seconds'] / full['seconds']:.1%}")
+        return report
+
+    def export_single_animation_as_take(self, anim_data, export_path):
+        """导出单个动画片段作为独立的Take"""
+        # 批量导出时使用当前批次的会话，单独导出时新建会话
+        session = self.fbx_session or self.setup_fbx_export_settings_for_clips()
+
+        # 创建单个Take
+        take_name = f"{anim_data['name']}_ID{anim_data['id']}"
+        start_frame = anim_data['start_frame']
+        end_frame = anim_data['end_frame']
+
+        # 检查并选中导出节点
+        self.ensure_export_selection(select=True)
+
+        # 生成文件名
+        filepath = os.path.join(export_path, clip_file_name(anim_data)).replace('\\', '/')
+
+        # 执行导出
+        with self.profiler.phase('FBXExport', clip=clip_file_name(anim_data)) as event:
+            session.export_clip(take_name, start_frame, end_frame, filepath)
+            if self.profiler.enabled:
+                event['bytes'] = os.path.getsize(filepath)
+
+        print(f"Exported animation: {anim_data['name']} (Frames: {start_frame}-{end_frame}, ID: {anim_data['id']}) "
+              f"to {filepath} [MEL calls: {session.last_export_mel_calls}]")
+
+    def setup_fbx_export_settings_for_clips(self):
+        """设置FBX导出选项用于动画片段，返回本批次的导出会话"""
+        session = self.create_fbx_export_session()
+        session.apply()
+        return session
+
+    def create_fbx_export_session(self, bake_complex=None):
+        """创建用于动画片段的导出会话（还没有设置到FBX插件）
+
+        bake_complex为None时，时间范围已经一次性烘焙为普通关键帧则不再由FBX插件烘焙。
+        """
+        if bake_complex is None:
+            bake_complex = not self.timeline_baked
+        session = FBXExportSession(bake_complex=bake_complex)
+        if self.options['export_mode'] == 'split' or self.options['dedupe'] == 'copy':
+            # 离线拆分（以及用它改写的重复片段）只支持二进制FBX
+            session.settings['FBXExportInAscii'] = 'false'
+        if self.options['content'] == 'skeleton':
+            # 只导出骨骼层级和动画，不导出几何体相关的数据
+            session.settings.update({
+                'FBXExportSmoothingGroups': 'false',
+                'FBXExportSmoothMesh': 'false',
+                'FBXExportSkins': 'false',
+                'FBXExportShapes': 'false',
+                'FBXExportInputConnections': 'false',
+                'FBXExportConstraints': 'false',
+                'FBXExportCameras': 'false',
+                'FBXExportLights': 'false',
+            })
+        return session
 
 
 class AnimationExporterUI:
     def __init__(self):
         self.window_name = "animationExporterWindow"
-        self.animation_data = []
+        self.exporter = AnimationExporter(
+            status_callback=self.update_status,
+            confirm_callback=self.confirm_export_visible
+        )
         self.create_ui()
-    
+        self.load_clip_catalog()
+
+    @property
+    def animation_data(self):
+        """当前解析的动画列表（由导出核心持有）"""
+        return self.exporter.animation_data
+
     def create_ui(self):
         """创建UI界面"""
         # 如果窗口已存在，删除它
         if cmds.window(self.window_name, exists=True):
             cmds.deleteUI(self.window_name)
-        
+
         # 创建窗口
         self.window = cmds.window(
             self.window_name,
@@ -29,7 +2655,7 @@ class AnimationExporterUI:
             resizeToFitChildren=True,
             sizeable=False
         )
-        
+
         # 主布局
         main_layout = cmds.columnLayout(
             adjustableColumn=True,
@@ -37,11 +2663,11 @@ class AnimationExporterUI:
             rowSpacing=12,
             parent=self.window
         )
-        
+
         # 标题
         cmds.text(label="RE Maya Animation Export Tool", font="boldLabelFont", height=25)
         cmds.separator(height=15, style="in")
-        
+
         # Paste Noesis List按钮
         self.paste_button = cmds.button(
             label="Paste Noesis List",
@@ -49,7 +2675,16 @@ class AnimationExporterUI:
             height=35,
             backgroundColor=(0.45, 0.55, 0.7)
         )
-        
+
+        # 从Noesis日志文件读取
+        self.load_file_button = cmds.button(
+            label="Load Noesis Log File...",
+            command=self.show_file_dialog,
+            height=30,
+            backgroundColor=(0.45, 0.55, 0.7),
+            annotation="Read the animation list from a saved Noesis log; unrelated log lines are ignored"
+        )
+
         # 添加fixframerateforDD2按钮
         self.fix_framerate_button = cmds.button(
             label="Fix Frame Rate for DD2",
@@ -58,19 +2693,53 @@ class AnimationExporterUI:
             backgroundColor=(0.7, 0.45, 0.6),
             annotation="Convert animation from 30fps to 60fps with frame offset for DD2 compatibility"
         )
-        
+
         cmds.separator(height=15)
-        
-        # 动画列表标签和下拉框
+
+        # 动画列表: 过滤框、只显示一页的列表和翻页滚动条
         cmds.text(label="Animation List:", align="left", font="boldLabelFont")
-        self.animation_combo = cmds.optionMenu(
-            label="",
+        self.filter_field = cmds.textField(
+            placeholderText="Filter by name, ID or frame (id:12, frame:340)",
+            textChangedCommand=self.on_filter_changed,
             enable=False,
-            changeCommand=self.on_animation_selected,
-            height=25
+            height=22
+        )
+        self.clip_list = cmds.textScrollList(
+            allowMultiSelection=True,
+            numberOfRows=10,
+            append=["No animations loaded"],
+            selectCommand=self.on_animation_selected,
+            doubleClickCommand=self.set_timeline_range,
+            enable=False
+        )
+        self.page_scroll = cmds.intScrollBar(
+            horizontal=True,
+            minValue=0,
+            maxValue=1,
+            value=0,
+            step=1,
+            largeStep=5,
+            changeCommand=self.on_page_changed,
+            dragCommand=self.on_page_changed,
+            enable=False
+        )
+        cmds.rowLayout(numberOfColumns=3, adjustableColumn=1)
+        self.clip_list_info = cmds.text(label="", align="left")
+        self.select_matching_button = cmds.button(
+            label="Select All Matching",
+            command=self.select_all_matching,
+            enable=False,
+            annotation="Select every animation that matches the filter, on all pages"
+        )
+        self.clear_selection_button = cmds.button(
+            label="Clear",
+            command=self.clear_clip_selection,
+            enable=False
         )
-        cmds.menuItem(label="No animations loaded", parent=self.animation_combo)
-        
+        cmds.setParent('..')
+        self.clip_browser = None
+        self.clip_page = 0
+
         # 添加 Set Timeline Range 按钮
         self.set_timeline_button = cmds.button(
             label="Set Timeline to Selected Animation",
@@ -80,27 +2749,78 @@ class AnimationExporterUI:
             backgroundColor=(0.6, 0.5, 0.8),
             annotation="Adjust Maya timeline to match the selected animation's frame range"
         )
-        
+
         cmds.separator(height=15)
-        
+
         cmds.text(label="Export Options:", align="left", font="boldLabelFont")
-        
+
         # 单选按钮组
         self.radio_collection = cmds.radioCollection()
-        
+
         self.export_selected_radio = cmds.radioButton(
-            label="Export Selected Animation",
+            label="Export Selected Animations",
             collection=self.radio_collection,
             select=True,
             onCommand=self.on_export_option_changed
         )
-        
+
         self.export_all_radio = cmds.radioButton(
             label="Export All Animations",
             collection=self.radio_collection,
             onCommand=self.on_export_option_changed
         )
-        
+
+        # 一次性烘焙选项（只对Export All生效）
+        self.bake_once_checkbox = cmds.checkBox(
+            label="Bake timeline once (faster Export All)",
+            value=False,
+            annotation="Bake the whole timeline to plain keys once, then export each clip without FBX complex bake. "
+                       "The bake is undone after the export."
+        )
+
+        # 烘焙后简化关键帧
+        self.reduce_keys_checkbox = cmds.checkBox(
+            label="Reduce baked keys (with bake once)",
+            value=False,
+            annotation="Remove baked keys on constant and linear segments within small per-channel tolerances"
+        )
+
+        # 重复片段只导出一次
+        self.dedupe_checkbox = cmds.checkBox(
+            label="Reuse identical animations (with bake once)",
+            value=False,
+            annotation="Export animations with identical baked motion only once; the others are copies of that FBX "
+                       "with their own take name and frame range"
+        )
+
+        # 增量导出选项
+        self.incremental_checkbox = cmds.checkBox(
+            label="Skip up-to-date animations",
+            value=False,
+            annotation="Use the export manifest in the export folder to skip animations whose frame range, "
+                       "curve data, settings and FBX file have not changed, and to resume an interrupted export"
+        )
+
+        # 本地暂存后台传输选项
+        self.staging_checkbox = cmds.checkBox(
+            label="Stage files locally (for network folders)",
+            value=False,
+            annotation="Write each FBX to a local temp folder and copy it to the export folder in the background"
+        )
+
+        # 仅骨骼导出选项
+        self.skeleton_only_checkbox = cmds.checkBox(
+            label="Skeleton only (no geometry)",
+            value=False,
+            annotation="Export only the joints under the selection and their animation. "
+                       "Skins, blend shapes and meshes are left out of the clip files."
+        )
+        self.bind_pose_mesh_checkbox = cmds.checkBox(
+            label="Also export bind pose mesh",
+            value=False,
+            annotation=f"With skeleton only, export the geometry once in bind pose to {BIND_POSE_FILE_NAME}"
+        )
+
         # 导出按钮
         self.export_button = cmds.button(
             label="Export",
@@ -109,9 +2829,9 @@ class AnimationExporterUI:
             enable=False,
             backgroundColor=(0.4, 0.7, 0.4)
         )
-        
+
         cmds.separator(height=15)
-        
+
         # 状态标签
         self.status_text = cmds.text(
             label="Ready - Please paste Noesis animation list first",
@@ -119,475 +2839,2424 @@ class AnimationExporterUI:
             backgroundColor=(0.25, 0.25, 0.25),
             height=25
         )
-        
+
+        # 批量导出进度和取消按钮
+        cmds.rowLayout(numberOfColumns=2, adjustableColumn=1, columnAttach=[(1, 'both', 0), (2, 'left', 5)])
+        self.progress_bar = cmds.progressBar(maxValue=100, height=20)
+        self.cancel_button = cmds.button(
+            label="Cancel",
+            command=self.cancel_export,
+            enable=False,
+            annotation="Stop the export after the current animation (Esc also works)"
+        )
+        cmds.setParent('..')
+        self.progress = None
+        self.main_progress_bar = None
+        # 没有批量导出时限制状态刷新频率（批量导出时使用self.progress的间隔）
+        self.status_throttle = ExportProgress()
+
         # 显示窗口
         cmds.showWindow(self.window)
-    
+
     def fix_framerate_for_dd2(self, *args):
         """修复DD2动画帧速率为60fps"""
+        if not cmds.ls(selection=True, long=True):
+            cmds.warning("Please select an object first!")
+            self.update_status("Error: No object selected for DD2 frame rate fix")
+            return
+
+        try:
+            self.update_status("Applying DD2 frame rate fix...")
+            self.exporter.fix_framerate_for_dd2()
+
+            # 完成
+            self.update_status("DD2 frame rate fix completed successfully")
+
+            # 显示完成对话框
+            cmds.confirmDialog(
+                title="DD2 Frame Rate Fix Complete",
+                message="Successfully applied DD2 frame rate fix:\n"
+                       "Fix animation speed issues caused by incorrect frame rate export settings in Noesis",
+                button=["OK"]
+            )
+
+        except Exception as e:
+            error_msg = f"DD2 frame rate fix failed: {str(e)}"
+            cmds.error(error_msg)
+            self.update_status("DD2 frame rate fix failed - Check script editor")
+
+            cmds.confirmDialog(
+                title="DD2 Frame Rate Fix Error",
+                message=f"Failed to apply DD2 frame rate fix:\n{str(e)}",
+                button=["OK"],
+                icon="critical"
+            )
+
+    def show_input_dialog(self, *args):
+        """显示手动输入对话框"""
+        result = cmds.promptDialog(
+            title='Paste Noesis Animation List',
+            message='Please paste your Noesis animation list here:\n(Example: @ 0 \'animation_name (165 frames) ID: 0\')',
+            button=['OK', 'Cancel'],
+            defaultButton='OK',
+            cancelButton='Cancel',
+            dismissString='Cancel',
+            scrollableField=True,
+            text=""
+        )
+
+        if result == 'OK':
+            text = cmds.promptDialog(query=True, text=True)
+            if text.strip():
+                self.parse_animation_text(text)
+            else:
+                self.update_status("No text provided")
+                cmds.warning("No animation data provided!")
+
+    def show_file_dialog(self, *args):
+        """选择Noesis日志文件"""
+        list_path = cmds.fileDialog2(
+            caption="Select Noesis Log File",
+            fileMode=1,  # 选择已有文件
+            fileFilter="Text Files (*.txt *.log);;All Files (*.*)",
+            okCaption="Load"
+        )
+        if list_path:
+            self.load_animation_list(self.exporter.load_animation_file, list_path[0], list_path[0])
+
+    def parse_animation_text(self, text):
+        """解析动画文本数据"""
+        self.load_animation_list(self.exporter.parse_animation_text, text)
+
+    def load_clip_catalog(self):
+        """打开窗口时读取场景中保存的片段目录，不需要重新粘贴Noesis列表"""
+        try:
+            if self.exporter.load_clip_catalog():
+                self.show_animation_list()
+                self.update_status(f"Loaded {len(self.animation_data)} animations from the scene's clip catalog")
+        except Exception as e:
+            print(f"Warning: Could not load clip catalog: {str(e)}")
+
+    def show_animation_list(self):
+        """用当前的动画列表刷新界面"""
+        # 列表只显示一页，过滤条件保留
+        self.clip_browser = ClipBrowserModel(self.animation_data)
+        self.clip_browser.set_filter(cmds.textField(self.filter_field, query=True, text=True))
+        if self.clip_browser.rows:
+            self.clip_browser.selected.add(self.clip_browser.rows[0])
+        self.show_clip_page(0)
+
+        # 启用控件
+        self.set_clip_browser_enabled(True)
+        cmds.button(self.export_button, edit=True, enable=True)
+        cmds.button(self.set_timeline_button, edit=True, enable=True)
+
+    def load_animation_list(self, load_function, source, source_name=None):
+        """用导出核心解析动画列表、保存到片段目录并刷新界面"""
+        try:
+            load_function(source)
+
+            if self.animation_data:
+                self.show_animation_list()
+                try:
+                    self.exporter.save_clip_catalog(source_name)
+                except Exception as e:
+                    print(f"Warning: Could not save clip catalog: {str(e)}")
+
+                status = f"Successfully parsed {len(self.animation_data)} animations"
+                if self.exporter.parse_summary.error_count:
+                    status += f" ({self.exporter.parse_summary.error_count} lines skipped)"
+                self.update_status(status)
+            else:
+                cmds.warning("No valid animation data found in text!")
+                self.update_status("No valid animation data found!")
+
+        except Exception as e:
+            error_msg = f"Failed to parse animation text: {str(e)}"
+            cmds.error(error_msg)
+            self.update_status("Parse failed - Check script editor for details")
+
+    def show_clip_page(self, page):
+        """在列表中显示过滤结果的第page页（只创建这一页的行）"""
+        browser = self.clip_browser
+        page = min(max(int(page), 0), browser.page_count - 1)
+        self.clip_page = page
+
+        cmds.textScrollList(self.clip_list, edit=True, removeAll=True)
+        labels = browser.page_labels(page)
+        if labels:
+            cmds.textScrollList(self.clip_list, edit=True, append=labels)
+            # textScrollList的序号从1开始
+            for index in browser.page_selection(page):
+                cmds.textScrollList(self.clip_list, edit=True, selectIndexedItem=index + 1)
+        else:
+            cmds.textScrollList(self.clip_list, edit=True, append=["No matching animations"])
+
+        cmds.intScrollBar(self.page_scroll, edit=True, maxValue=max(browser.page_count - 1, 1), value=page,
+                          enable=browser.page_count > 1)
+        self.update_clip_list_info()
+
+    def update_clip_list_info(self):
+        """显示当前页的范围、匹配数和选中数"""
+        browser = self.clip_browser
+        first = self.clip_page * browser.page_size
+        shown = len(browser.page_rows(self.clip_page))
+        label = f"{first + 1 if shown else 0}-{first + shown} of {len(browser.rows)}"
+        if len(browser.rows) != len(browser.table):
+            label += f" (filtered from {len(browser.table)})"
+        label += f", {len(browser.selected)} selected"
+        cmds.text(self.clip_list_info, edit=True, label=label)
+
+    def set_clip_browser_enabled(self, enabled):
+        """启用或禁用动画列表的控件"""
+        for control in (self.filter_field, self.clip_list):
+            cmds.control(control, edit=True, enable=enabled)
+        cmds.intScrollBar(self.page_scroll, edit=True,
+                          enable=enabled and self.clip_browser is not None and self.clip_browser.page_count > 1)
+        cmds.button(self.select_matching_button, edit=True, enable=enabled)
+        cmds.button(self.clear_selection_button, edit=True, enable=enabled)
+
+    def on_filter_changed(self, text):
+        """过滤条件改变时只重建第一页"""
+        if self.clip_browser is None:
+            return
+        count = self.clip_browser.set_filter(text)
+        self.show_clip_page(0)
+        self.update_status(f"{count} animations match \"{text}\"" if text.strip() else
+                           f"{len(self.animation_data)} animations")
+
+    def on_page_changed(self, *args):
+        """拖动翻页滚动条"""
+        if self.clip_browser is None:
+            return
+        page = cmds.intScrollBar(self.page_scroll, query=True, value=True)
+        if page != self.clip_page:
+            self.show_clip_page(page)
+
+    def select_all_matching(self, *args):
+        """选中所有匹配过滤条件的动画"""
+        if self.clip_browser is None:
+            return
+        self.clip_browser.select_all_matching()
+        self.show_clip_page(self.clip_page)
+
+    def clear_clip_selection(self, *args):
+        """清除选择"""
+        if self.clip_browser is None:
+            return
+        self.clip_browser.selected.clear()
+        self.show_clip_page(self.clip_page)
+
+    def selected_clip_rows(self):
+        """选中动画的行号（按列表顺序）"""
+        if self.clip_browser is None:
+            return []
+        return self.clip_browser.selected_rows()
+
+    def on_animation_selected(self, *args):
+        """动画选择改变时的回调"""
+        browser = self.clip_browser
+        if browser is None or not browser.rows:
+            return
+        indices = cmds.textScrollList(self.clip_list, query=True, selectIndexedItem=True) or []
+        browser.select_on_page(self.clip_page, [index - 1 for index in indices])
+        self.update_clip_list_info()
+
+        rows = self.selected_clip_rows()
+        if len(rows) == 1:
+            anim = self.animation_data[rows[0]]
+            self.update_status(f"Selected: {anim['name']} ({anim['frame_count']} frames, ID: {anim['id']})")
+        elif rows:
+            self.update_status(f"Selected {len(rows)} animations")
+
+    def set_timeline_range(self, *args):
+        """设置timeline范围为选中动画的范围"""
+        if not self.animation_data:
+            cmds.warning("No animation data available!")
+            return
+
+        rows = self.selected_clip_rows()
+        if rows:
+            # 选中多个动画时使用第一个
+            anim = self.animation_data[rows[0]]
+
+            try:
+                self.exporter.set_timeline_range(anim)
+
+                # 更新状态
+                self.update_status(f"Timeline set to {anim['name']}: frames {anim['start_frame']}-{anim['end_frame']}")
+
+            except Exception as e:
+                error_msg = f"Failed to set timeline range: {str(e)}"
+                cmds.error(error_msg)
+                self.update_status("Failed to set timeline range")
+        else:
+            cmds.warning("Invalid animation selection!")
+
+    def on_export_option_changed(self, *args):
+        """导出选项改变时的处理"""
+        selected_radio = cmds.radioCollection(self.radio_collection, query=True, select=True)
+
+        # 使用字符串比较来判断选中的单选按钮
+        if cmds.radioButton(self.export_selected_radio, query=True, select=True):
+            # Export Selected Animation 被选中
+            if self.animation_data:  # 只有在有动画数据时才启用动画列表
+                self.set_clip_browser_enabled(True)
+                cmds.button(self.set_timeline_button, edit=True, enable=True)
+                rows = self.selected_clip_rows()
+                if len(rows) == 1:
+                    anim = self.animation_data[rows[0]]
+                    self.update_status(f"Export mode: Selected animation - {anim['name']}")
+                elif rows:
+                    self.update_status(f"Export mode: {len(rows)} selected animations")
+                else:
+                    self.update_status("Export mode: Selected animation")
+            else:
+                self.set_clip_browser_enabled(False)
+                cmds.button(self.set_timeline_button, edit=True, enable=False)
+                self.update_status("Export mode: Selected animation (No animations loaded)")
+        else:
+            # Export All Animations 被选中
+            self.set_clip_browser_enabled(False)
+            cmds.button(self.set_timeline_button, edit=True, enable=False)
+            if self.animation_data:
+                self.update_status(f"Export mode: All animations ({len(self.animation_data)} total)")
+            else:
+                self.update_status("Export mode: All animations (No animations loaded)")
+
+    def export_animation(self, *args):
+        """导出动画"""
+        if not self.animation_data:
+            cmds.warning("No animation data to export!")
+            return
+
+        # 分别导出每个动画
+        self.export_animations_separately()
+
+    def export_animations_separately(self):
+        """分别导出每个动画"""
+        # 选择导出文件夹
+        export_path = cmds.fileDialog2(
+            caption="Select Export Directory",
+            fileMode=3,  # 文件夹选择模式
+            okCaption="Select"
+        )
+
+        if not export_path:
+            self.update_status("Export cancelled by user")
+            return
+
+        export_path = export_path[0]
+
         try:
-            # 检查是否有选中的对象
-            selected_objects = cmds.ls(selection=True, long=True)
-            if not selected_objects:
-                cmds.warning("Please select an object first!")
-                self.update_status("Error: No object selected for DD2 frame rate fix")
-                return
-            
-            self.update_status("Applying DD2 frame rate fix...")
-            
-            # 步骤1: 设置帧速率为30fps
-            cmds.currentUnit(time='ntsc')  # 30fps
-            print("Step 1: Set frame rate to 30fps")
-            
-            # 步骤2: 选择当前选中物体的所有子级
-            mel.eval('select -hierarchy;')
-            print(f"Step 2: Selected All Hierarchy")
-            
-            # 步骤3: 将时间缩短一半
+            export_selected = cmds.radioButton(self.export_selected_radio, query=True, select=True)
+            skeleton_only = cmds.checkBox(self.skeleton_only_checkbox, query=True, value=True)
+            self.exporter.options['content'] = 'skeleton' if skeleton_only else 'full'
+            self.exporter.options['bind_pose_mesh'] = cmds.checkBox(self.bind_pose_mesh_checkbox, query=True, value=True)
+
+            if export_selected:
+                rows = self.selected_clip_rows()
+                if not rows:
+                    cmds.warning("Invalid animation selection!")
+                    return
+                if len(rows) == 1:
+                    # 导出选中的动画
+                    anim = self.animation_data[rows[0]]
+                    self.update_status(f"Exporting: {anim['name']}...")
+                    self.exporter.export_single_animation_as_take(anim, export_path)
+                    self.update_status(f"Exported: {anim['name']}")
+                    cmds.confirmDialog(
+                        title="Export Complete",
+                        message=f"Successfully exported: {anim['name']}\nTo: {export_path}",
+                        button=["OK"]
+                    )
+                    return
+                # 选中多个动画时按批量导出的方式导出这些动画
+                animations = self.animation_data.subset(rows)
+            else:
+                # 导出所有动画
+                animations = self.animation_data
+
+            bake_once = cmds.checkBox(self.bake_once_checkbox, query=True, value=True)
+            self.exporter.options['bake_mode'] = 'once' if bake_once else 'per_clip'
+            self.exporter.options['incremental'] = cmds.checkBox(self.incremental_checkbox, query=True, value=True)
+            self.exporter.options['reduce_keys'] = cmds.checkBox(self.reduce_keys_checkbox, query=True, value=True)
+            self.exporter.options['staging'] = cmds.checkBox(self.staging_checkbox, query=True, value=True)
+            reuse_identical = cmds.checkBox(self.dedupe_checkbox, query=True, value=True)
+            self.exporter.options['dedupe'] = 'copy' if reuse_identical else 'off'
+            # 预检查和批量导出使用同一次选择解析（没有选择时只询问一次）
+            self.exporter.selection_cache.start()
             try:
-                # 对选中的所有对象执行时间缩放
-                mel.eval('scaleKey -timeScale 0.5 -timePivot 0;')
-                print("Step 3: Applied time scale 0.5 with pivot at frame 0")
-                
-            except Exception as e:
-                print(f"Warning during scaleKey operation: {str(e)}")
-                # 即使scaleKey失败也继续执行后续步骤
-            
-            # 步骤4: 设置帧速率为60fps
-            cmds.currentUnit(time='ntscf')  # 60fps
-            print("Step 4: Set frame rate to 60fps")
-            
-            # 完成
-            self.update_status("DD2 frame rate fix completed successfully")
-            
-            # 显示完成对话框
-            cmds.confirmDialog(
-                title="DD2 Frame Rate Fix Complete",
-                message="Successfully applied DD2 frame rate fix:\n"
-                       "Fix animation speed issues caused by incorrect frame rate export settings in Noesis",
-                button=["OK"]
-            )
-            
-            print("DD2 frame rate fix completed successfully!")
-            
+                if not self.confirm_preflight(animations):
+                    self.update_status("Export cancelled - check the animation ranges")
+                    return
+                result = self.run_batch_export(animations, export_path)
+            finally:
+                self.exporter.selection_cache.stop()
+            # 增量导出时跳过的片段视为已导出
+            exported_count = len(result['exported']) + len(result['skipped'])
+            failed_exports = result['failed']
+
+            try:
+                write_export_results(export_path, animations, result)
+            except OSError as e:
+                print(f"Warning: Could not write export results: {str(e)}")
+
+            if result['fatal']:
+                self.update_status(f"Export stopped: {exported_count}/{len(animations)} exported")
+                cmds.confirmDialog(
+                    title="Export Stopped",
+                    message=f"Export stopped after {exported_count}/{len(animations)} animations:\n"
+                            f"{result['fatal']}",
+                    button=["OK"],
+                    icon="critical"
+                )
+            elif result['cancelled']:
+                self.update_status(f"Export cancelled: {exported_count}/{len(animations)} exported")
+                cmds.confirmDialog(
+                    title="Export Cancelled",
+                    message=f"Export cancelled after {exported_count}/{len(animations)} animations "
+                            f"({len(failed_exports)} failed).",
+                    button=["OK"]
+                )
+            elif failed_exports:
+                self.update_status(f"Export complete: {exported_count}/{len(animations)} successful")
+                error_message = f"Exported {exported_count}/{len(animations)} animations.\n\nFailed exports:\n" + "\n".join(failed_exports[:5])
+                if len(failed_exports) > 5:
+                    error_message += f"\n... and {len(failed_exports)-5} more"
+                error_message += f"\n\nAll results: {EXPORT_RESULTS_FILE_NAME}"
+                cmds.confirmDialog(
+                    title="Export Complete with Errors",
+                    message=error_message,
+                    button=["OK"],
+                    icon="warning"
+                )
+            else:
+                self.update_status(f"Export complete: {exported_count} animations")
+                cmds.confirmDialog(
+                    title="Export Complete",
+                    message=f"Successfully exported all {exported_count} animations to:\n{export_path}",
+                    button=["OK"]
+                )
+
         except Exception as e:
-            error_msg = f"DD2 frame rate fix failed: {str(e)}"
+            error_msg = f"Export failed: {str(e)}"
             cmds.error(error_msg)
-            self.update_status("DD2 frame rate fix failed - Check script editor")
-            
+            self.update_status("Export failed - Check script editor for details")
             cmds.confirmDialog(
-                title="DD2 Frame Rate Fix Error",
-                message=f"Failed to apply DD2 frame rate fix:\n{str(e)}",
+                title="Export Error",
+                message=f"Export failed:\n{str(e)}",
                 button=["OK"],
                 icon="critical"
             )
-    
-    def show_input_dialog(self, *args):
-        """显示手动输入对话框"""
-        result = cmds.promptDialog(
-            title='Paste Noesis Animation List',
-            message='Please paste your Noesis animation list here:\n(Example: @ 0 \'animation_name (165 frames) ID: 0\')',
-            button=['OK', 'Cancel'],
-            defaultButton='OK',
-            cancelButton='Cancel',
-            dismissString='Cancel',
-            scrollableField=True,
-            text=""
+
+    def confirm_preflight(self, animations):
+        """批量导出前检查片段范围，有问题时询问是否继续"""
+        self.update_status("Checking animation ranges...")
+        report = self.exporter.preflight(animations)
+        if not report.issue_count:
+            return True
+
+        lines = report.report().split("\n")
+        message = "\n".join(lines[:25])
+        if len(lines) > 25:
+            message += "\n... (see Script Editor)"
+        result = cmds.confirmDialog(
+            title="Animation Range Check",
+            message=message + "\n\nExport anyway?",
+            button=["Export", "Cancel"],
+            defaultButton="Cancel",
+            cancelButton="Cancel",
+            dismissString="Cancel",
+            icon="warning"
         )
-        
-        if result == 'OK':
-            text = cmds.promptDialog(query=True, text=True)
-            if text.strip():
-                self.parse_animation_text(text)
+        return result == "Export"
+
+    def run_batch_export(self, animations, export_path):
+        """批量导出动画: 显示进度、支持取消，导出期间暂停视口刷新"""
+        # Maya主窗口的进度条，按Esc可以取消
+        main_progress_bar = self.main_progress_bar = mel.eval('$tmp = $gMainProgressBar')
+        total = len(animations)
+
+        self.progress = ExportProgress(
+            callback=self.update_progress,
+            cancel_check=lambda: cmds.progressBar(main_progress_bar, query=True, isCancelled=True)
+        )
+        cmds.progressBar(self.progress_bar, edit=True, maxValue=max(total, 1), progress=0)
+        cmds.progressBar(main_progress_bar, edit=True, beginProgress=True, isInterruptable=True,
+                         status="Exporting animations...", maxValue=max(total, 1))
+        # 导出期间会处理界面事件（取消按钮可以点击），禁用会修改场景或列表的按钮
+        busy_buttons = [self.paste_button, self.load_file_button, self.fix_framerate_button, self.export_button]
+        busy_states = [cmds.button(button, query=True, enable=True) for button in busy_buttons]
+        for button in busy_buttons:
+            cmds.button(button, edit=True, enable=False)
+        cmds.button(self.cancel_button, edit=True, enable=True)
+        try:
+            with suspended_viewport():
+                return self.exporter.export_animations(animations, export_path, progress=self.progress)
+        finally:
+            cmds.progressBar(main_progress_bar, edit=True, endProgress=True)
+            cmds.button(self.cancel_button, edit=True, enable=False)
+            for button, enabled in zip(busy_buttons, busy_states):
+                cmds.button(button, edit=True, enable=enabled)
+            self.progress = None
+
+    def update_progress(self, done, total, message):
+        """更新进度条和状态（由ExportProgress按时间间隔调用）"""
+        cmds.progressBar(self.progress_bar, edit=True, progress=done)
+        cmds.progressBar(self.main_progress_bar, edit=True, progress=done)
+        cmds.text(self.status_text, edit=True, label=message)
+        self.refresh_ui()
+
+    def cancel_export(self, *args):
+        """取消正在进行的批量导出"""
+        if self.progress:
+            self.progress.cancel()
+            self.update_status("Cancelling after the current animation...")
+
+    def confirm_export_visible(self):
+        """没有选择物体时询问是否导出所有可见物体"""
+        result = cmds.confirmDialog(
+            title="No Selection",
+            message="No objects selected. Export all visible objects?",
+            button=["Yes", "No"],
+            defaultButton="Yes",
+            cancelButton="No",
+            dismissString="No"
+        )
+        return result == "Yes"
+
+    def update_status(self, message):
+        """更新状态显示，和进度共用ExportProgress的时间间隔限制界面刷新"""
+        cmds.text(self.status_text, edit=True, label=message)
+        throttle = self.progress or self.status_throttle
+        if throttle.due():
+            self.refresh_ui()
+
+    def refresh_ui(self):
+        """强制刷新界面，并处理等待中的界面事件（导出期间可以点击取消按钮）"""
+        cmds.refresh()
+        process_ui_events()
+
+    def close_window(self):
+        """关闭窗口"""
+        if cmds.window(self.window_name, exists=True):
+            cmds.deleteUI(self.window_name)
+
+
+def show_animation_exporter():
+    """显示动画导出工具"""
+    exporter = AnimationExporterUI()
+    return exporter
+
+
+# ---------------------------------------------------------------------------
+# 二进制FBX读写与离线拆分（不依赖Maya）
+# ---------------------------------------------------------------------------
+
+FBX_BINARY_MAGIC = b'Kaydara FBX Binary  \x00\x1a\x00'
+FBX_TICKS_PER_SECOND = 46186158000
+# 文件尾的默认标识（合成的FBX文件没有原始文件尾时使用）
+FBX_FOOTER_ID = b'\xfa\xbc\xab\x09\xd0\xc8\xd4\x66\xb1\x76\xfb\x83\x1c\xf7\x26\x7e'
+FBX_FOOTER_MAGIC = b'\xf8\x5a\x8c\x6a\xde\xf5\xd9\x7e\xec\xe9\x0c\xe3\x75\x8f\x29\x0b'
+# GlobalSettings中TimeMode对应的帧速率（14为自定义帧速率）
+FBX_TIME_MODE_FPS = {
+    1: 120.0, 2: 100.0, 3: 60.0, 4: 50.0, 5: 48.0, 6: 30.0, 7: 30.0, 8: 29.97, 9: 29.97,
+    10: 25.0, 11: 24.0, 12: 1000.0, 13: 23.976, 15: 96.0, 16: 72.0, 17: 59.94, 18: 119.88
+}
+# 属性类型: 标量的struct格式、数组对应的array类型
+FBX_SCALAR_FORMATS = {'Y': '<h', 'C': '<B', 'I': '<i', 'F': '<f', 'D': '<d', 'L': '<q'}
+FBX_ARRAY_TYPECODES = {'f': 'f', 'd': 'd', 'l': 'q', 'i': 'i', 'b': 'b'}
+# 整段时间轴导出时使用的Take名称
+TIMELINE_TAKE_NAME = "REAnimExportTimeline"
+
+
+class FBXNode:
+    """二进制FBX节点，属性在第一次访问时才从文件中解析"""
+
+    def __init__(self, name, properties=None, children=None):
+        self.name = name
+        self.children = children or []
+        self._properties = properties
+        # 从文件读取时，属性数据在文件中的位置
+        self._source = None
+        self._property_span = None
+        self._property_count = 0
+        self.has_sentinel = False
+
+    @property
+    def properties(self):
+        """属性列表[(类型代码, 值), ...]"""
+        if self._properties is None:
+            start, end = self._property_span
+            self._properties = decode_fbx_properties(self._source, start, self._property_count)
+        return self._properties
+
+    def raw_properties(self):
+        """从文件读取的节点返回原始属性字节（可以直接复制），否则返回None"""
+        if self._source is None:
+            return None
+        start, end = self._property_span
+        return self._source[start:end]
+
+    def value(self, index=0):
+        """第index个属性的值"""
+        return self.properties[index][1]
+
+    def find(self, name):
+        """第一个指定名称的子节点"""
+        for child in self.children:
+            if child.name == name:
+                return child
+        return None
+
+    def find_all(self, name):
+        """所有指定名称的子节点"""
+        return [child for child in self.children if child.name == name]
+
+
+class FBXDocument:
+    """二进制FBX文件: 顶层节点、版本号和文件尾"""
+
+    def __init__(self, version, nodes, footer=b'', source=None, file_handle=None):
+        self.version = version
+        self.nodes = nodes
+        self.footer = footer
+        self._source = source
+        self._file_handle = file_handle
+
+    def find(self, name):
+        """第一个指定名称的顶层节点"""
+        for node in self.nodes:
+            if node.name == name:
+                return node
+        return None
+
+    def close(self):
+        """关闭内存映射"""
+        if self._source is not None:
+            self._source.close()
+            self._file_handle.close()
+            self._source = None
+
+
+def decode_fbx_properties(buffer, offset, count):
+    """解析节点的属性数据"""
+    properties = []
+    for _ in range(count):
+        code = chr(buffer[offset])
+        offset += 1
+
+        if code in FBX_SCALAR_FORMATS:
+            fmt = FBX_SCALAR_FORMATS[code]
+            value = struct.unpack_from(fmt, buffer, offset)[0]
+            offset += struct.calcsize(fmt)
+        elif code in ('S', 'R'):
+            length = struct.unpack_from('<I', buffer, offset)[0]
+            offset += 4
+            value = bytes(buffer[offset:offset + length])
+            offset += length
+        elif code in FBX_ARRAY_TYPECODES:
+            length, encoding, data_length = struct.unpack_from('<III', buffer, offset)
+            offset += 12
+            data = buffer[offset:offset + data_length]
+            offset += data_length
+            if encoding == 1:
+                data = zlib.decompress(data)
+            value = array.array(FBX_ARRAY_TYPECODES[code])
+            value.frombytes(data)
+            if sys.byteorder != 'little':
+                value.byteswap()
+            if len(value) != length:
+                raise ValueError(f"FBX array property has {len(value)} items, expected {length}")
+        else:
+            raise ValueError(f"Unknown FBX property type '{code}' at offset {offset - 1}")
+
+        properties.append((code, value))
+    return properties
+
+
+def encode_fbx_properties(properties):
+    """把属性列表编码为FBX属性数据"""
+    chunks = []
+    for code, value in properties:
+        chunks.append(code.encode('ascii'))
+
+        if code in FBX_SCALAR_FORMATS:
+            chunks.append(struct.pack(FBX_SCALAR_FORMATS[code], value))
+        elif code in ('S', 'R'):
+            if isinstance(value, str):
+                value = value.encode('utf-8')
+            chunks.append(struct.pack('<I', len(value)))
+            chunks.append(value)
+        elif code in FBX_ARRAY_TYPECODES:
+            items = array.array(FBX_ARRAY_TYPECODES[code], value)
+            if sys.byteorder != 'little':
+                items.byteswap()
+            data = items.tobytes()
+            # 较大的数组使用zlib压缩（与FBX SDK相同）
+            encoding = 1 if len(data) > 128 else 0
+            if encoding:
+                data = zlib.compress(data, 1)
+            chunks.append(struct.pack('<III', len(items), encoding, len(data)))
+            chunks.append(data)
+        else:
+            raise ValueError(f"Unknown FBX property type '{code}'")
+
+    return b''.join(chunks)
+
+
+def _fbx_header_format(version):
+    """节点头的格式和空节点长度（7.5及以上版本使用64位偏移）"""
+    if version >= 7500:
+        return '<QQQ', 25
+    return '<III', 13
+
+
+def read_fbx(path):
+    """以内存映射方式读取二进制FBX（只解析节点结构，属性按需解析）"""
+    file_handle = open(path, 'rb')
+    try:
+        source = mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        file_handle.close()
+        raise ValueError(f"Empty FBX file: {path}")
+
+    if source[:len(FBX_BINARY_MAGIC)] != FBX_BINARY_MAGIC:
+        source.close()
+        file_handle.close()
+        raise ValueError(f"Not a binary FBX file: {path}")
+
+    version = struct.unpack_from('<I', source, len(FBX_BINARY_MAGIC))[0]
+    header_format, null_length = _fbx_header_format(version)
+    header_size = struct.calcsize(header_format)
+
+    def read_node(offset):
+        end_offset, property_count, property_length = struct.unpack_from(header_format, source, offset)
+        if end_offset == 0:
+            return None, offset + null_length
+
+        name_length = source[offset + header_size]
+        name_start = offset + header_size + 1
+        node = FBXNode(source[name_start:name_start + name_length].decode('ascii', 'replace'))
+        node._source = source
+        property_start = name_start + name_length
+        node._property_span = (property_start, property_start + property_length)
+        node._property_count = property_count
+
+        # 属性之后到节点结束之间是子节点和空节点
+        position = property_start + property_length
+        if position < end_offset:
+            node.has_sentinel = True
+            while position < end_offset - null_length:
+                child, position = read_node(position)
+                if child is None:
+                    break
+                node.children.append(child)
+        return node, end_offset
+
+    nodes = []
+    position = len(FBX_BINARY_MAGIC) + 4
+    while position < len(source):
+        node, position = read_node(position)
+        if node is None:
+            break
+        nodes.append(node)
+
+    return FBXDocument(version, nodes, bytes(source[position:]), source, file_handle)
+
+
+def write_fbx(path, document, overrides=None):
+    """写出二进制FBX
+
+    overrides为{节点: 新属性列表}，用于修改属性而不改动原始文档；
+    没有修改的节点直接复制原始属性字节。
+    """
+    overrides = overrides or {}
+    header_format, null_length = _fbx_header_format(document.version)
+    null_record = b'\x00' * null_length
+
+    with open(path, 'wb') as out:
+        def write_node(node):
+            if node in overrides:
+                property_data = encode_fbx_properties(overrides[node])
+                property_count = len(overrides[node])
             else:
-                self.update_status("No text provided")
-                cmds.warning("No animation data provided!")
-    
-    def parse_animation_text(self, text):
-        """解析动画文本数据"""
+                property_data = node.raw_properties()
+                if property_data is None:
+                    property_data = encode_fbx_properties(node.properties)
+                    property_count = len(node.properties)
+                else:
+                    property_count = node._property_count
+
+            name = node.name.encode('ascii')
+            header_offset = out.tell()
+            # 先写入占位的节点头，写完子节点后再回填结束位置
+            out.write(struct.pack(header_format, 0, property_count, len(property_data)))
+            out.write(bytes([len(name)]))
+            out.write(name)
+            out.write(property_data)
+
+            if node.children or node.has_sentinel:
+                for child in node.children:
+                    write_node(child)
+                out.write(null_record)
+
+            end_offset = out.tell()
+            out.seek(header_offset)
+            out.write(struct.pack(header_format, end_offset, property_count, len(property_data)))
+            out.seek(end_offset)
+
+        out.write(FBX_BINARY_MAGIC)
+        out.write(struct.pack('<I', document.version))
+        for node in document.nodes:
+            write_node(node)
+        out.write(null_record)
+
+        # 文件尾: 标识 + 16字节对齐 + 版本号 + 120个0 + 结束标识
+        footer = document.footer
+        footer_id = footer[:16] if len(footer) >= 16 + 16 else FBX_FOOTER_ID
+        footer_magic = footer[-16:] if len(footer) >= 16 + 16 else FBX_FOOTER_MAGIC
+        out.write(footer_id)
+        offset = out.tell()
+        padding = ((offset + 15) & ~15) - offset
+        out.write(b'\x00' * (padding or 16))
+        out.write(struct.pack('<I', document.version))
+        out.write(b'\x00' * 120)
+        out.write(footer_magic)
+
+
+def fbx_properties70(node):
+    """节点Properties70中的属性，返回{名称: P节点}"""
+    properties70 = node.find('Properties70') if node else None
+    if properties70 is None:
+        return {}
+    return {p.value(0): p for p in properties70.find_all('P')}
+
+
+def fbx_frame_rate(document):
+    """从GlobalSettings读取场景的帧速率"""
+    settings = fbx_properties70(document.find('GlobalSettings'))
+    time_mode = settings[b'TimeMode'].properties[-1][1] if b'TimeMode' in settings else None
+    if time_mode == 14 and b'CustomFrameRate' in settings:
+        return settings[b'CustomFrameRate'].properties[-1][1]
+    return FBX_TIME_MODE_FPS.get(time_mode)
+
+
+def frame_to_fbx_time(frame, fps):
+    """帧转换为FBX时间（tick）"""
+    return int(round(frame * FBX_TICKS_PER_SECOND / fps))
+
+
+def _override_p70_value(overrides, p_node, value):
+    """修改Properties70中P节点的值（最后一个属性）"""
+    properties = list(p_node.properties)
+    properties[-1] = (properties[-1][0], value)
+    overrides[p_node] = properties
+
+
+def _slice_key_attributes(ref_counts, first_key, last_key):
+    """截取关键帧范围[first_key, last_key)对应的属性引用，返回[(属性索引, 引用数), ...]"""
+    runs = []
+    position = 0
+    for attr_index, count in enumerate(ref_counts):
+        run_start, position = position, position + count
+        overlap = min(position, last_key) - max(run_start, first_key)
+        if overlap > 0:
+            runs.append((attr_index, overlap))
+        if position >= last_key:
+            break
+    return runs
+
+
+def slice_fbx_anim_curve(curve, start_time, end_time, overrides, tolerance=0, time_offset=0):
+    """把AnimationCurve的关键帧截取到[start_time, end_time]范围（允许tolerance的取整误差）
+
+    time_offset不为0时，截取的关键帧时间再加上time_offset。
+    """
+    key_time = curve.find('KeyTime')
+    key_value = next((child for child in curve.children if child.name.startswith('KeyValue')), None)
+    if key_time is None or key_value is None:
+        return
+
+    times = key_time.value()
+    values = key_value.value()
+    if not times:
+        return
+
+    first_key = bisect.bisect_left(times, start_time - tolerance)
+    last_key = bisect.bisect_right(times, end_time + tolerance)
+
+    if first_key >= last_key:
+        # 范围内没有关键帧: 在起始帧保留一个关键帧，值为之前最后一个关键帧的值
+        source_key = max(first_key - 1, 0)
+        new_times = array.array('q', [start_time])
+        new_values = array.array(values.typecode, [values[source_key]])
+        first_key, last_key = source_key, source_key + 1
+    else:
+        new_times = times[first_key:last_key]
+        new_values = values[first_key:last_key]
+    if time_offset:
+        new_times = array.array('q', (time + time_offset for time in new_times))
+
+    overrides[key_time] = [('l', new_times)]
+    overrides[key_value] = [(key_value.properties[0][0], new_values)]
+
+    # 关键帧属性是按引用数压缩的，需要重新计算
+    flags_node = curve.find('KeyAttrFlags')
+    data_node = curve.find('KeyAttrDataFloat')
+    ref_node = curve.find('KeyAttrRefCount')
+    if flags_node is None or data_node is None or ref_node is None:
+        return
+
+    flags = flags_node.value()
+    data = data_node.value()
+    runs = _slice_key_attributes(ref_node.value(), first_key, last_key)
+    overrides[flags_node] = [('i', array.array('i', [flags[index] for index, _ in runs]))]
+    overrides[data_node] = [('f', array.array('f', [item for index, _ in runs for item in data[index * 4:index * 4 + 4]]))]
+    overrides[ref_node] = [('i', array.array('i', [count for _, count in runs]))]
+
+
+def split_fbx_clip(document, anim, output_path, fps=None, source_range=None):
+    """从整段时间轴的FBX中截取一个片段，写出为独立的FBX
+
+    source_range为(起始帧, 结束帧)时从文档的这个范围截取关键帧，再移到片段自己的帧范围
+    （用于把已导出的片段改写为另一个相同的片段）。
+    """
+    fps = fps or fbx_frame_rate(document)
+    if not fps:
+        raise ValueError("Could not determine frame rate from FBX, please specify it")
+
+    # 允许少量的取整误差
+    tolerance = int(FBX_TICKS_PER_SECOND / fps * 0.01)
+    start_time = frame_to_fbx_time(anim['start_frame'], fps)
+    end_time = frame_to_fbx_time(anim['end_frame'], fps)
+    source_start, source_end = source_range or (anim['start_frame'], anim['end_frame'])
+    source_start_time = frame_to_fbx_time(source_start, fps)
+    source_end_time = frame_to_fbx_time(source_end, fps)
+    take_name = f"{anim['name']}_ID{anim['id']}".encode('utf-8')
+
+    overrides = {}
+    objects = document.find('Objects')
+    for node in objects.children if objects else []:
+        if node.name == 'AnimationCurve':
+            slice_fbx_anim_curve(node, source_start_time, source_end_time, overrides, tolerance,
+                                 start_time - source_start_time)
+        elif node.name == 'AnimationStack':
+            # 重命名Take并设置时间范围
+            properties = list(node.properties)
+            properties[1] = ('S', take_name + b'\x00\x01AnimStack')
+            overrides[node] = properties
+            stack_properties = fbx_properties70(node)
+            for name, value in ((b'LocalStart', start_time), (b'LocalStop', end_time),
+                                (b'ReferenceStart', start_time), (b'ReferenceStop', end_time)):
+                if name in stack_properties:
+                    _override_p70_value(overrides, stack_properties[name], value)
+
+    settings = fbx_properties70(document.find('GlobalSettings'))
+    for name, value in ((b'TimeSpanStart', start_time), (b'TimeSpanStop', end_time)):
+        if name in settings:
+            _override_p70_value(overrides, settings[name], value)
+
+    documents = document.find('Documents')
+    for doc_node in documents.find_all('Document') if documents else []:
+        doc_properties = fbx_properties70(doc_node)
+        if b'ActiveAnimStackName' in doc_properties:
+            _override_p70_value(overrides, doc_properties[b'ActiveAnimStackName'], take_name)
+
+    takes = document.find('Takes')
+    if takes is not None:
+        current = takes.find('Current')
+        if current is not None:
+            overrides[current] = [('S', take_name)]
+        for take in takes.find_all('Take'):
+            overrides[take] = [('S', take_name)]
+            file_name = take.find('FileName')
+            if file_name is not None:
+                overrides[file_name] = [('S', take_name + b'.tak')]
+            for time_node_name in ('LocalTime', 'ReferenceTime'):
+                time_node = take.find(time_node_name)
+                if time_node is not None:
+                    overrides[time_node] = [('L', start_time), ('L', end_time)]
+
+    write_fbx(output_path, document, overrides)
+
+
+# 拆分进程中缓存的整段时间轴FBX
+_split_document = None
+
+
+def _init_split_worker(source_path):
+    """拆分进程初始化: 每个进程只读取一次源文件"""
+    global _split_document
+    _split_document = read_fbx(source_path)
+
+
+def _split_worker_task(anim, output_path, fps):
+    """拆分进程中执行的任务"""
+    split_fbx_clip(_split_document, anim, output_path, fps)
+    return output_path
+
+
+def _split_process_context():
+    """拆分进程使用的multiprocessing上下文（在Maya界面中时用mayapy启动子进程）"""
+    context = multiprocessing.get_context('spawn')
+    if _running_in_maya_gui():
+        context.set_executable(default_mayapy_path())
+    return context
+
+
+def split_fbx_clips(source_path, animations, output_dir, workers=None, fps=None):
+    """离线把整段时间轴的FBX拆分为每个片段一个FBX，返回与animations对应的错误列表（成功为None）"""
+    tasks = [(anim, os.path.join(output_dir, clip_file_name(anim))) for anim in animations]
+    errors = [None] * len(tasks)
+    remaining = set(range(len(tasks)))
+    workers = workers or os.cpu_count() or 1
+
+    if workers > 1 and len(tasks) > 1:
         try:
-            self.animation_data = []
-            lines = text.strip().split('\n')
-            
-            # 匹配Noesis插件fmt_RE_MESH.py中输出的格式
-            pattern = r'@\s*(\d+)\s*[\'"]([^\'\"]*)\s*\((\d+)\s*frames\).*ID:\s*(\d+)'
-            
-            for line in lines:
-                line = line.strip()
-                if not line or not line.startswith('@'):
-                    continue
-                
-                match = re.search(pattern, line)
-                if match:
-                    start_frame = int(match.group(1))
-                    name = match.group(2).strip()
-                    frame_count = int(match.group(3))
-                    anim_id = int(match.group(4))
-                    
-                    self.animation_data.append({
-                        'name': name,
-                        'start_frame': start_frame,
-                        'frame_count': frame_count,
-                        'end_frame': start_frame + frame_count - 1,
-                        'id': anim_id
-                    })
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=_split_process_context(),
+                                     initializer=_init_split_worker, initargs=(source_path,)) as pool:
+                futures = {pool.submit(_split_worker_task, anim, output_path, fps): i
+                           for i, (anim, output_path) in enumerate(tasks)}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        future.result()
+                    except BrokenProcessPool:
+                        # 进程池损坏，剩下的片段在当前进程中拆分
+                        continue
+                    except Exception as e:
+                        errors[i] = str(e)
+                    remaining.discard(i)
+        except Exception as e:
+            # 进程池不可用（例如脚本不是作为模块加载的）时在当前进程中拆分
+            print(f"Warning: Parallel FBX split unavailable, splitting in this process: {str(e)}")
+
+    if remaining:
+        document = read_fbx(source_path)
+        try:
+            for i in sorted(remaining):
+                anim, output_path = tasks[i]
+                try:
+                    split_fbx_clip(document, anim, output_path, fps)
+                except Exception as e:
+                    errors[i] = str(e)
+        finally:
+            document.close()
+
+    return errors
+
+
+# ---------------------------------------------------------------------------
+# 片段包: 不经过FBX插件的紧凑二进制动画数据（读取不依赖Maya）
+# ---------------------------------------------------------------------------
+
+CLIP_PACK_FILE_NAME = "clips.reapack"
+CLIP_PACK_MAGIC = b'REAPACK\x00'
+CLIP_PACK_VERSION = 2
+# 文件头: 标识、版本、骨骼数、通道数、片段数、帧速率、字符串区字节数
+CLIP_PACK_HEADER = struct.Struct('<8sIIIIdQ')
+# 骨骼表: 父骨骼序号（-1为根）、名称在字符串区的偏移和长度、旋转顺序（Maya的rotateOrder，0为xyz），
+# jointOrient XYZ和rotateAxis XYZ（弧度）
+CLIP_PACK_JOINT = struct.Struct('<iIII6d')
+# 片段索引: ID、起始帧、帧数、数据偏移、数据字节数、名称在字符串区的偏移和长度
+CLIP_PACK_ENTRY = struct.Struct('<qqqQQII')
+# 每个片段的数据按此对齐
+CLIP_PACK_ALIGNMENT = 16
+# 每个骨骼采样的局部通道（Maya内部单位: 厘米、弧度）
+CLIP_PACK_CHANNELS = ('translateX', 'translateY', 'translateZ', 'rotateX', 'rotateY', 'rotateZ',
+                      'scaleX', 'scaleY', 'scaleZ')
+
+
+def write_clip_pack(path, joint_names, parents, fps, animations, clip_data,
+                    joint_orients=None, rotate_axes=None, rotate_orders=None):
+    """写入片段包
+
+    animations中每个片段对应clip_data（可以是生成器）中的一块数据: 小端float32，
+    按[帧][骨骼][通道]排列。joint_orients和rotate_axes为每个骨骼的(x, y, z)弧度，
+    rotate_orders为每个骨骼的rotateOrder，没有时为0。先写入临时文件，完成后替换为path。
+    """
+    joint_orients = joint_orients or [(0.0, 0.0, 0.0)] * len(joint_names)
+    rotate_axes = rotate_axes or [(0.0, 0.0, 0.0)] * len(joint_names)
+    rotate_orders = rotate_orders or [0] * len(joint_names)
+    strings = bytearray()
+
+    def add_string(text):
+        offset = len(strings)
+        strings.extend(text.encode('utf-8'))
+        return offset, len(strings) - offset
+
+    joint_table = [CLIP_PACK_JOINT.pack(parent, *add_string(name), rotate_order, *joint_orient, *rotate_axis)
+                   for name, parent, joint_orient, rotate_axis, rotate_order
+                   in zip(joint_names, parents, joint_orients, rotate_axes, rotate_orders)]
+    name_spans = [add_string(anim['name']) for anim in animations]
+
+    data_start = (CLIP_PACK_HEADER.size + CLIP_PACK_JOINT.size * len(joint_names) +
+                  CLIP_PACK_ENTRY.size * len(animations) + len(strings))
+    frame_size = 4 * len(joint_names) * len(CLIP_PACK_CHANNELS)
+
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            # 索引在数据写完后再回填
+            f.write(b'\x00' * data_start)
+            entries = []
+            for anim, data, name_span in zip(animations, clip_data, name_spans):
+                if len(data) != frame_size * anim['frame_count']:
+                    raise Exception(f"Clip data of {anim['name']} has {len(data)} bytes, "
+                                    f"expected {frame_size * anim['frame_count']}")
+                padding = -f.tell() % CLIP_PACK_ALIGNMENT
+                f.write(b'\x00' * padding)
+                entries.append(CLIP_PACK_ENTRY.pack(anim['id'], anim['start_frame'], anim['frame_count'],
+                                                    f.tell(), len(data), *name_span))
+                f.write(data)
+            if len(entries) != len(animations):
+                raise Exception(f"Clip data for {len(entries)} of {len(animations)} clips")
+
+            f.seek(0)
+            f.write(CLIP_PACK_HEADER.pack(CLIP_PACK_MAGIC, CLIP_PACK_VERSION, len(joint_names),
+                                          len(CLIP_PACK_CHANNELS), len(animations), float(fps), len(strings)))
+            f.write(b''.join(joint_table))
+            f.write(b''.join(entries))
+            f.write(strings)
+    except Exception:
+        # 写入失败或取消时不留下不完整的文件
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, path)
+    return path
+
+
+class ClipPack:
+    """以内存映射方式读取片段包，clip()返回直接引用文件映射的数组（不复制数据）
+
+    有NumPy时返回形状为(帧, 骨骼, 通道)的float32数组，否则返回相同形状的memoryview（用data[帧, 骨骼, 通道]读取）。
+    关闭前需要先释放这些数组。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file_handle = open(path, 'rb')
+        try:
+            self._source = mmap.mmap(self._file_handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file_handle.close()
+            raise ValueError(f"Empty clip pack: {path}")
+
+        try:
+            (magic, version, joint_count, self.channel_count, clip_count,
+             self.fps, strings_size) = CLIP_PACK_HEADER.unpack_from(self._source)
+            if magic != CLIP_PACK_MAGIC:
+                raise ValueError(f"Not a clip pack: {path}")
+            if version != CLIP_PACK_VERSION:
+                raise ValueError(f"Unsupported clip pack version {version} (expected {CLIP_PACK_VERSION}): {path}")
+
+            offset = CLIP_PACK_HEADER.size
+            joints = list(CLIP_PACK_JOINT.iter_unpack(
+                self._source[offset:offset + CLIP_PACK_JOINT.size * joint_count]))
+            offset += CLIP_PACK_JOINT.size * joint_count
+            entries = list(CLIP_PACK_ENTRY.iter_unpack(
+                self._source[offset:offset + CLIP_PACK_ENTRY.size * clip_count]))
+            offset += CLIP_PACK_ENTRY.size * clip_count
+            strings = self._source[offset:offset + strings_size]
+        except Exception:
+            self.close()
+            raise
+
+        self.joint_names = [strings[joint[1]:joint[1] + joint[2]].decode('utf-8') for joint in joints]
+        self.parents = [joint[0] for joint in joints]
+        # 每个骨骼的旋转顺序、jointOrient和rotateAxis（弧度），用来从旋转通道还原局部旋转
+        self.rotate_orders = [joint[3] for joint in joints]
+        self.joint_orients = [joint[4:7] for joint in joints]
+        self.rotate_axes = [joint[7:10] for joint in joints]
+        self.channels = CLIP_PACK_CHANNELS[:self.channel_count]
+        # ID -> (起始帧, 帧数, 数据偏移, 数据字节数, 名称)
+        self._entries = {}
+        for clip_id, start_frame, frame_count, data_offset, data_size, name_start, name_length in entries:
+            name = strings[name_start:name_start + name_length].decode('utf-8')
+            self._entries[clip_id] = (start_frame, frame_count, data_offset, data_size, name)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, clip_id):
+        return clip_id in self._entries
+
+    def ids(self):
+        """包中所有片段的ID（写入顺序）"""
+        return list(self._entries)
+
+    def info(self, clip_id):
+        """片段的名称、ID和帧范围"""
+        start_frame, frame_count, _, _, name = self._entries[clip_id]
+        return {'name': name, 'id': clip_id, 'start_frame': start_frame, 'frame_count': frame_count,
+                'end_frame': start_frame + frame_count - 1}
+
+    def clip(self, clip_id):
+        """片段的采样数据，形状为(帧, 骨骼, 通道)，直接引用文件映射"""
+        _, frame_count, data_offset, data_size, _ = self._entries[clip_id]
+        shape = (frame_count, len(self.joint_names), self.channel_count)
+        if np is not None:
+            return np.frombuffer(self._source, dtype='<f4', count=data_size // 4,
+                                 offset=data_offset).reshape(shape)
+        return memoryview(self._source)[data_offset:data_offset + data_size].cast('f', shape)
+
+    def close(self):
+        """关闭内存映射（还有数组引用时映射在数组释放后关闭）"""
+        if self._source is not None:
+            try:
+                self._source.close()
+            except BufferError:
+                pass
+            self._file_handle.close()
+            self._source = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ExportCancelled(Exception):
+    """片段包采样过程中取消导出"""
+
+
+class JointChannelSampler:
+    """用OpenMaya批量采样骨骼的局部通道
+
+    每个通道只查找一次数据来源: 直接连接到通道、以时间为输入的单条动画曲线直接求值，
+    其他有输入连接的通道（动画层、pairBlend、约束、驱动关键帧等）按帧切换DG上下文读取通道本身，
+    没有输入的通道为常量。
+    同时读取每个骨骼的jointOrient、rotateAxis（弧度）和rotateOrder，写入片段包的骨骼表。
+    """
+
+    def __init__(self, joints):
+        time_curve_types = (om.MFn.kAnimCurveTimeToAngular, om.MFn.kAnimCurveTimeToDistance,
+                            om.MFn.kAnimCurveTimeToTime, om.MFn.kAnimCurveTimeToUnitless)
+        self.joint_count = len(joints)
+        self.time_unit = om.MTime.uiUnit()
+        selection = om.MSelectionList()
+        for joint in joints:
+            selection.add(joint)
+
+        # 采样数组中的位置 -> 数据来源
+        self.curves = []
+        self.driven_plugs = []
+        self.constants = []
+        self.joint_orients = []
+        self.rotate_axes = []
+        self.rotate_orders = []
+        for joint_index in range(selection.length()):
+            node = om.MFnDependencyNode(selection.getDependNode(joint_index))
+            self.joint_orients.append(tuple(node.findPlug(f'jointOrient{axis}', False).asDouble() for axis in 'XYZ'))
+            self.rotate_axes.append(tuple(node.findPlug(f'rotateAxis{axis}', False).asDouble() for axis in 'XYZ'))
+            self.rotate_orders.append(node.findPlug('rotateOrder', False).asInt())
+            for channel_index, attribute in enumerate(CLIP_PACK_CHANNELS):
+                position = joint_index * len(CLIP_PACK_CHANNELS) + channel_index
+                plug = node.findPlug(attribute, False)
+                source = plug.source()
+                if not source.isNull and self._is_time_curve(source.node(), time_curve_types):
+                    self.curves.append((position, oma.MFnAnimCurve(source.node())))
+                elif plug.isDestination:
+                    self.driven_plugs.append((position, plug))
                 else:
-                    print(f"Warning: Could not parse line: {line}")
-            
-            # 修正blend pose条目的帧数并重新计算起始帧
-            if self.animation_data:
-                self.fix_blend_pose_frames()
-            
-            if self.animation_data:
-                # 清空并更新下拉列表
-                menu_items = cmds.optionMenu(self.animation_combo, query=True, itemListLong=True)
-                if menu_items:
-                    cmds.deleteUI(menu_items)
-                
-                # 添加新的菜单项
-                for anim in self.animation_data:
-                    display_text = f"{anim['name']} (Frames: {anim['start_frame']}-{anim['end_frame']}, ID: {anim['id']})"
-                    cmds.menuItem(label=display_text, parent=self.animation_combo)
-                
-                # 启用控件
-                cmds.optionMenu(self.animation_combo, edit=True, enable=True)
-                cmds.button(self.export_button, edit=True, enable=True)
-                cmds.button(self.set_timeline_button, edit=True, enable=True)
-                
-                self.update_status(f"Successfully parsed {len(self.animation_data)} animations")
-                print(f"Parsed {len(self.animation_data)} animations successfully")
+                    self.constants.append((position, plug.asDouble()))
+
+    @staticmethod
+    def _is_time_curve(curve_node, time_curve_types):
+        """是否是可以直接按时间求值的动画曲线（输入没有连接，例如没有时间扭曲）"""
+        if curve_node.apiType() not in time_curve_types:
+            return False
+        return not om.MFnDependencyNode(curve_node).findPlug('input', False).isDestination
+
+    def sample(self, frames):
+        """采样frames（帧号列表），返回小端float32字节，按[帧][骨骼][通道]排列"""
+        stride = self.joint_count * len(CLIP_PACK_CHANNELS)
+        times = [om.MTime(frame, self.time_unit) for frame in frames]
+
+        if np is not None:
+            samples = np.empty((len(frames), stride), dtype='<f4')
+            for position, value in self.constants:
+                samples[:, position] = value
+            for position, curve in self.curves:
+                samples[:, position] = [curve.evaluate(t) for t in times]
+        else:
+            samples = array.array('f', bytes(4 * len(frames) * stride))
+            for position, value in self.constants:
+                samples[position::stride] = array.array('f', [value]) * len(frames)
+            for position, curve in self.curves:
+                samples[position::stride] = array.array('f', [curve.evaluate(t) for t in times])
+
+        if self.driven_plugs:
+            flat = samples.reshape(-1) if np is not None else samples
+            # 每帧切换一次上下文，读取所有被驱动的通道
+            for row, t in enumerate(times):
+                previous = om.MDGContext(t).makeCurrent()
+                try:
+                    for position, plug in self.driven_plugs:
+                        flat[row * stride + position] = plug.asDouble()
+                finally:
+                    previous.makeCurrent()
+
+        if np is not None:
+            return samples.tobytes()
+        if sys.byteorder == 'big':
+            samples.byteswap()
+        return samples.tobytes()
+
+
+def initialize_batch_session(undo=False):
+    """初始化mayapy独立会话并加载FBX插件
+
+    独立会话默认不记录撤销；undo为True时打开撤销（导出服务需要撤销烘焙来保持场景不变）。
+    """
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+    if not cmds.pluginInfo('fbxmaya', query=True, loaded=True):
+        cmds.loadPlugin('fbxmaya', quiet=True)
+    if undo:
+        cmds.undoInfo(state=True, infinity=True)
+
+
+def export_scene_batch(jobs, output_dir, select_nodes=None, flat=False, runner=None, options=None,
+                       rerun_failures=False):
+    """批量导出: jobs为[(场景路径, Noesis列表路径), ...]，返回每个场景的导出结果
+
+    runner为ParallelExportRunner时，片段由多个mayapy进程并行导出。
+    options为AnimationExporter的导出选项。
+    每个场景的片段结果写入导出目录的结果文件；rerun_failures为True时只导出上次失败、被隔离或取消的片段。
+    """
+    # 批处理中场景不会保存，不需要撤销烘焙
+    options = dict({'restore_after_bake': False}, **(options or {}))
+    exporter = AnimationExporter(options=options)
+    results = []
+
+    for scene_path, list_path in jobs:
+        scene_name = os.path.splitext(os.path.basename(scene_path))[0]
+        export_path = output_dir if flat else os.path.join(output_dir, scene_name)
+        os.makedirs(export_path, exist_ok=True)
+
+        try:
+            animations = exporter.load_animation_file(list_path, scene_path)
+            if not animations:
+                raise Exception(f"No valid animation data found in {list_path}")
+
+            if rerun_failures:
+                rerun = {record['file'] for record in read_export_results(export_path)
+                         if record['status'] in RERUN_STATUSES}
+                # 取出部分片段时保留完整的片段表，片段范围仍按整个列表检查
+                animations = animations.subset(row for row, anim in enumerate(animations)
+                                               if clip_file_name(anim) in rerun)
+                print(f"Re-running {len(animations)} failed animations of {scene_name}")
+
+            if not animations:
+                result = {'exported': [], 'skipped': [], 'failed': []}
+            elif runner:
+                result = runner.run(scene_path, animations, export_path, select_nodes, options)
             else:
-                cmds.warning("No valid animation data found in text!")
-                self.update_status("No valid animation data found!")
-        
+                exporter.open_scene(scene_path)
+                cmds.select(clear=True)
+                if select_nodes:
+                    cmds.select(select_nodes)
+
+                result = exporter.export_animations(animations, export_path)
+        except Exception as e:
+            print(f"Failed to process scene {scene_path}: {str(e)}")
+            result = {'exported': [], 'skipped': [], 'failed': [f"{scene_path}: {str(e)}"]}
+
+        if result.get('statuses'):
+            try:
+                write_export_results(export_path, animations, result, scene_path, merge=rerun_failures)
+            except OSError as e:
+                print(f"Warning: Could not write export results: {str(e)}")
+
+        result['scene'] = scene_path
+        results.append(result)
+        print(f"Scene {scene_name}: exported {len(result['exported'])}, "
+              f"up to date {len(result['skipped'])}, failed {len(result['failed'])}")
+
+    return results
+
+
+def compare_scene_content_modes(jobs, output_dir, select_nodes=None, sample_size=10, options=None):
+    """对每个场景抽取部分片段，对比完整导出和仅骨骼导出，报告写入各场景的导出目录"""
+    options = dict({'restore_after_bake': False}, **(options or {}))
+    exporter = AnimationExporter(options=options)
+    reports = []
+
+    for scene_path, list_path in jobs:
+        scene_name = os.path.splitext(os.path.basename(scene_path))[0]
+        export_path = os.path.join(output_dir, scene_name)
+        os.makedirs(export_path, exist_ok=True)
+
+        animations = exporter.load_animation_file(list_path, scene_path)
+        exporter.open_scene(scene_path)
+        cmds.select(clear=True)
+        if select_nodes:
+            cmds.select(select_nodes)
+
+        report = exporter.compare_content_modes(animations, export_path, sample_size)
+        report['scene'] = scene_path
+        with open(os.path.join(export_path, CONTENT_REPORT_FILE_NAME), 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        reports.append(report)
+
+    return reports
+
+
+def retime_scene_batch(scenes, source_fps, target_fps, pivot=0.0, select_nodes=None,
+                       output_dir=None, snap=False):
+    """批量重定时: 打开每个场景，重定时后保存到output_dir（None表示覆盖原场景），返回报告"""
+    exporter = AnimationExporter()
+    reports = []
+
+    for scene_path in scenes:
+        save_path = os.path.join(output_dir, os.path.basename(scene_path)) if output_dir else scene_path
+        try:
+            exporter.open_scene(scene_path)
+            # 没有指定节点时处理场景中所有的顶层节点
+            roots = select_nodes or cmds.ls(assemblies=True, long=True)
+            report = exporter.retime_animation(source_fps, target_fps, pivot, roots=roots, snap=snap)
+
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            scene_type = 'mayaAscii' if save_path.lower().endswith('.ma') else 'mayaBinary'
+            cmds.file(rename=save_path)
+            cmds.file(save=True, force=True, type=scene_type)
+            print(f"Saved retimed scene: {save_path}")
         except Exception as e:
-            error_msg = f"Failed to parse animation text: {str(e)}"
-            cmds.error(error_msg)
-            self.update_status("Parse failed - Check script editor for details")
-    
-    def on_animation_selected(self, *args):
-        """动画选择改变时的回调"""
-        selected_index = cmds.optionMenu(self.animation_combo, query=True, select=True) - 1
-        if 0 <= selected_index < len(self.animation_data):
-            anim = self.animation_data[selected_index]
-            self.update_status(f"Selected: {anim['name']} ({anim['frame_count']} frames, ID: {anim['id']})")
-    
-    def set_timeline_range(self, *args):
-        """设置timeline范围为选中动画的范围"""
-        if not self.animation_data:
-            cmds.warning("No animation data available!")
-            return
-        
-        selected_index = cmds.optionMenu(self.animation_combo, query=True, select=True) - 1
-        if 0 <= selected_index < len(self.animation_data):
-            anim = self.animation_data[selected_index]
-            
+            print(f"Failed to retime scene {scene_path}: {str(e)}")
+            report = {'error': str(e)}
+
+        report['scene'] = scene_path
+        report['output'] = save_path
+        reports.append(report)
+
+    return reports
+
+
+def default_mayapy_path():
+    """推测mayapy的路径（用于启动并行导出进程）"""
+    if os.path.basename(sys.executable).lower().startswith("mayapy"):
+        return sys.executable
+    return os.environ.get("MAYAPY", "mayapy")
+
+
+def split_into_shards(clips, shard_count):
+    """按帧数把[(索引, 动画), ...]切成最多shard_count份连续的分片"""
+    total_frames = sum(max(anim['frame_count'], 1) for _, anim in clips)
+    frames_per_shard = total_frames / max(shard_count, 1)
+
+    shards = [[]]
+    accumulated_frames = 0
+    for index, anim in clips:
+        # 当前分片的帧数已够，开始下一个分片
+        if shards[-1] and len(shards) < shard_count and accumulated_frames >= frames_per_shard * len(shards):
+            shards.append([])
+        shards[-1].append((index, anim))
+        accumulated_frames += max(anim['frame_count'], 1)
+
+    return [shard for shard in shards if shard]
+
+
+def run_export_worker(scene_path, clips_path, export_path, results_path, select_nodes=None):
+    """并行导出的工作进程: 导出分配到的片段，每完成一个就写入一行结果"""
+    with open(clips_path, 'r', encoding='utf-8') as f:
+        work = json.load(f)
+
+    indices = [index for index, _ in work['clips']]
+    animations = [anim for _, anim in work['clips']]
+
+    exporter = AnimationExporter(options=work['options'])
+    # 所有工作进程打开同一个场景，只读使用，不会保存
+    exporter.open_scene(scene_path)
+    cmds.select(clear=True)
+    if select_nodes:
+        cmds.select(select_nodes)
+
+    with open(results_path, 'a', encoding='utf-8') as results_file:
+        def write_result(i, anim, status, error):
+            record = {'index': indices[i], 'status': status}
+            if error is not None:
+                record['error'] = error
+            # 尝试次数和失败分类
+            record['attempts'] = exporter.clip_attempts[i]
+            record.update(exporter.clip_failures.get(i, {}))
+
+            # 逐条写入，进程崩溃时已完成的片段不会丢失
+            results_file.write(json.dumps(record) + '\n')
+            results_file.flush()
+
+        result = exporter.export_animations(animations, export_path, clip_callback=write_result)
+        # 因致命错误没有导出的片段也写入结果，不再交给其他工作进程
+        for i, status in enumerate(result['statuses']):
+            if status == 'cancelled':
+                write_result(i, animations[i], 'cancelled', result['fatal'] or "Not exported")
+
+
+def run_keyed_range_worker(scene_path, output_path, select_nodes=None):
+    """并行导出前的预检查进程: 打开场景，把导出选择的关键帧范围写入output_path"""
+    exporter = AnimationExporter(options={'restore_after_bake': False})
+    exporter.open_scene(scene_path)
+    cmds.select(clear=True)
+    if select_nodes:
+        cmds.select(select_nodes)
+    keyed_range = exporter.scene_keyed_range()
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump({'keyed_range': keyed_range}, f)
+
+
+class ParallelExportRunner:
+    """把动画列表分片，交给多个mayapy进程并行导出并合并结果"""
+
+    def __init__(self, workers, mayapy=None, max_retries=2, worker_timeout=None, poll_interval=0.5):
+        self.workers = max(int(workers), 1)
+        self.mayapy = mayapy or default_mayapy_path()
+        # 工作进程失败后，未完成的片段最多重新排队的次数
+        self.max_retries = max_retries
+        # 单个工作进程的超时时间（秒），None表示不限制
+        self.worker_timeout = worker_timeout
+        self.poll_interval = poll_interval
+
+    def run(self, scene_path, animations, export_path, select_nodes=None, options=None):
+        """并行导出一个场景的所有片段，返回与AnimationExporter.export_animations相同格式的结果"""
+        # 工作进程只有部分片段，在这里检查整个列表；场景的关键帧范围在分片前由一个mayapy进程读取
+        preflight_mode = (options or {}).get('preflight', 'off')
+        if preflight_mode != 'off':
+            keyed_range, partial = None, False
             try:
-                # 设置动画范围
-                cmds.playbackOptions(
-                    minTime=anim['start_frame'],
-                    maxTime=anim['end_frame'],
-                    animationStartTime=anim['start_frame'],
-                    animationEndTime=anim['end_frame']
-                )
-                
-                # 将当前时间设置为动画开始帧
-                cmds.currentTime(anim['start_frame'])
-                
-                # 更新状态
-                self.update_status(f"Timeline set to {anim['name']}: frames {anim['start_frame']}-{anim['end_frame']}")
-                
-                print(f"Timeline range set to: {anim['start_frame']}-{anim['end_frame']} for animation '{anim['name']}'")
-                
+                keyed_range = self.query_keyed_range(scene_path, select_nodes)
             except Exception as e:
-                error_msg = f"Failed to set timeline range: {str(e)}"
-                cmds.error(error_msg)
-                self.update_status("Failed to set timeline range")
-        else:
-            cmds.warning("Invalid animation selection!")
-    
-    def fix_blend_pose_frames(self):
-        """修正blend pose条目的帧数并重新计算起始帧"""
-        corrected_animations = []
-        current_start_frame = 0
-        
-        for i, anim in enumerate(self.animation_data):
-            # 检查是否是blend pose条目（包含_blend*_*pose_模式）
-            is_blend_pose = "_blend" in anim['name'].lower() and "_pose_" in anim['name'].lower()
-            
-            if is_blend_pose:
-                # 修正blend pose的帧数为1
-                corrected_frame_count = 1
-                print(f"Corrected blend pose '{anim['name']}': {anim['frame_count']} frames -> {corrected_frame_count} frame")
-            else:
-                corrected_frame_count = anim['frame_count']
-            
-            # 重新计算起始帧
-            if i == 0:
-                # 第一个动画保持原始起始帧
-                new_start_frame = anim['start_frame']
+                partial = True
+                print(f"Warning: {str(e)}, the pre-flight check is partial "
+                      f"(ranges outside the keyed animation and the list length are not checked)")
+            preflight = check_clip_ranges(animations, keyed_range)
+            preflight.partial = partial
+            print(preflight.report())
+            if preflight.issue_count and preflight_mode == 'strict':
+                raise Exception(f"Pre-flight check found {preflight.issue_count} issues, nothing exported")
+
+        work_dir = tempfile.mkdtemp(prefix="re_anim_export_")
+        indexed = list(enumerate(animations))
+        pending = deque(split_into_shards(indexed, self.workers))
+        attempts = {index: 0 for index, _ in indexed}
+        outcomes = {}
+        running = []
+        launched = 0
+
+        try:
+            while pending or running:
+                # 启动空闲的工作进程
+                while pending and len(running) < self.workers:
+                    shard = pending.popleft()
+                    running.append(self._start_worker(scene_path, shard, export_path, select_nodes,
+                                                      options or {}, work_dir, launched))
+                    launched += 1
+
+                time.sleep(self.poll_interval)
+
+                for worker in list(running):
+                    returncode = worker['process'].poll()
+                    timed_out = (self.worker_timeout is not None
+                                 and time.time() - worker['started'] > self.worker_timeout)
+                    if returncode is None and not timed_out:
+                        continue
+
+                    if returncode is None:
+                        worker['process'].kill()
+                        worker['process'].wait()
+                        print(f"Worker {worker['id']} timed out after {self.worker_timeout}s")
+
+                    running.remove(worker)
+                    worker['log_file'].close()
+                    retry_shard = self._collect_worker(worker, attempts, outcomes)
+                    if retry_shard:
+                        pending.append(retry_shard)
+        finally:
+            for worker in running:
+                worker['process'].kill()
+                worker['log_file'].close()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        if (options or {}).get('incremental'):
+            # 合并各工作进程写入的导出清单分片
+            ExportManifest(export_path).consolidate()
+
+        exported = []
+        skipped = []
+        failed_exports = []
+        quarantined = []
+        cancelled = []
+        statuses = []
+        attempt_counts = []
+        failures = {}
+        for index, anim in indexed:
+            outcome = outcomes.get(index, {'status': 'cancelled', 'error': 'Not exported'})
+            if outcome['status'] == 'exported':
+                exported.append(anim)
+            elif outcome['status'] == 'skipped':
+                skipped.append(anim)
+            elif outcome['status'] == 'cancelled':
+                cancelled.append(anim)
             else:
-                # 后续动画的起始帧基于前一个动画的结束帧+1
-                new_start_frame = current_start_frame
-            
-            new_end_frame = new_start_frame + corrected_frame_count - 1
-            
-            corrected_anim = {
-                'name': anim['name'],
-                'start_frame': new_start_frame,
-                'frame_count': corrected_frame_count,
-                'end_frame': new_end_frame,
-                'id': anim['id'],
-                'original_frame_count': anim['frame_count']  # 保存原始帧数用于调试
-            }
-            
-            corrected_animations.append(corrected_anim)
-            
-            # 更新下一个动画的起始帧
-            current_start_frame = new_end_frame + 1
-            
-            # 如果有修正，输出调试信息
-            if is_blend_pose or new_start_frame != anim['start_frame']:
-                print(f"Animation '{anim['name']}': "
-                      f"start {anim['start_frame']}->{new_start_frame}, "
-                      f"frames {anim['frame_count']}->{corrected_frame_count}, "
-                      f"end {anim['end_frame']}->{new_end_frame}")
-        
-        # 替换原始数据
-        self.animation_data = corrected_animations
-        
-        # 统计修正的数量
-        blend_pose_count = sum(1 for anim in corrected_animations 
-                              if "_blend" in anim['name'].lower() and "_pose_" in anim['name'].lower())
-        if blend_pose_count > 0:
-            print(f"Fixed {blend_pose_count} blend pose animations and recalculated frame ranges")
-    
-    def on_export_option_changed(self, *args):
-        """导出选项改变时的处理"""
-        selected_radio = cmds.radioCollection(self.radio_collection, query=True, select=True)
-        
-        # 使用字符串比较来判断选中的单选按钮
-        if cmds.radioButton(self.export_selected_radio, query=True, select=True):
-            # Export Selected Animation 被选中
-            if self.animation_data:  # 只有在有动画数据时才启用下拉列表
-                cmds.optionMenu(self.animation_combo, edit=True, enable=True)
-                cmds.button(self.set_timeline_button, edit=True, enable=True)
-                selected_index = cmds.optionMenu(self.animation_combo, query=True, select=True) - 1
-                if 0 <= selected_index < len(self.animation_data):
-                    anim = self.animation_data[selected_index]
-                    self.update_status(f"Export mode: Selected animation - {anim['name']}")
-                else:
-                    self.update_status("Export mode: Selected animation")
+                if outcome['status'] == 'quarantined':
+                    quarantined.append(anim)
+                failed_exports.append(f"{anim['name']}: {outcome['error']}")
+            statuses.append(outcome['status'])
+            attempt_counts.append(outcome.get('attempts', 0))
+            if 'failure_class' in outcome or outcome['status'] == 'cancelled':
+                failures[index] = {key: outcome[key] for key in ('status', 'failure_class', 'error') if key in outcome}
+
+        return {'exported': exported, 'skipped': skipped, 'failed': failed_exports, 'cancelled': cancelled,
+                'quarantined': quarantined, 'statuses': statuses, 'attempts': attempt_counts, 'failures': failures,
+                'workers_launched': launched}
+
+    def query_keyed_range(self, scene_path, select_nodes=None):
+        """用一个mayapy进程读取场景中导出选择的关键帧范围，没有关键帧时返回None，失败时抛出异常"""
+        work_dir = tempfile.mkdtemp(prefix="re_anim_preflight_")
+        output_path = os.path.join(work_dir, "keyed_range.json")
+        log_path = os.path.join(work_dir, "keyed_range.log")
+        command = [self.mayapy, "-u", os.path.abspath(__file__), "keyed-range",
+                   "--scene", scene_path, "--output", output_path]
+        for node in select_nodes or []:
+            command += ["--select", node]
+
+        try:
+            with open(log_path, 'w', encoding='utf-8') as log_file:
+                returncode = subprocess.call(command, stdout=log_file, stderr=subprocess.STDOUT,
+                                             timeout=self.worker_timeout)
+            if returncode != 0 or not os.path.exists(output_path):
+                print_log_tail(log_path)
+                raise Exception(f"Could not read the keyed range of {scene_path} (exit code {returncode})")
+            with open(output_path, 'r', encoding='utf-8') as f:
+                keyed_range = json.load(f)['keyed_range']
+        except subprocess.TimeoutExpired:
+            raise Exception(f"Reading the keyed range of {scene_path} timed out after {self.worker_timeout}s")
+        except (OSError, ValueError, KeyError) as e:
+            raise Exception(f"Could not read the keyed range of {scene_path}: {str(e)}")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        return tuple(keyed_range) if keyed_range else None
+
+    def _start_worker(self, scene_path, shard, export_path, select_nodes, options, work_dir, worker_id):
+        """启动一个mayapy工作进程"""
+        clips_path = os.path.join(work_dir, f"worker_{worker_id}_clips.json")
+        results_path = os.path.join(work_dir, f"worker_{worker_id}_results.jsonl")
+        log_path = os.path.join(work_dir, f"worker_{worker_id}.log")
+
+        # 每个工作进程写入自己的导出清单分片
+        # 绑定姿势文件只由第一个工作进程导出
+        options = dict(options, manifest_part=f"{os.getpid()}-{worker_id}", preflight='off',
+                       bind_pose_mesh=options.get('bind_pose_mesh', False) and worker_id == 0)
+        with open(clips_path, 'w', encoding='utf-8') as f:
+            json.dump({'options': options, 'clips': shard}, f)
+
+        command = [
+            # -u: 不缓冲输出，进程崩溃时日志也是完整的
+            self.mayapy, "-u", os.path.abspath(__file__), "worker",
+            "--scene", scene_path,
+            "--clips", clips_path,
+            "--output", export_path,
+            "--results", results_path
+        ]
+        for node in select_nodes or []:
+            command += ["--select", node]
+
+        log_file = open(log_path, 'w', encoding='utf-8')
+        process = subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT)
+        print(f"Started worker {worker_id} with {len(shard)} clips")
+
+        return {
+            'id': worker_id,
+            'process': process,
+            'shard': shard,
+            'results_path': results_path,
+            'log_path': log_path,
+            'log_file': log_file,
+            'started': time.time()
+        }
+
+    def _collect_worker(self, worker, attempts, outcomes):
+        """读取工作进程的结果，返回需要重新排队的片段"""
+        for record in read_worker_results(worker['results_path']):
+            outcomes[record['index']] = record
+
+        unfinished = [(index, anim) for index, anim in worker['shard'] if index not in outcomes]
+        if not unfinished:
+            return None
+
+        print(f"Worker {worker['id']} exited with code {worker['process'].returncode}, "
+              f"{len(unfinished)} clips unfinished (log: {worker['log_path']})")
+        print_log_tail(worker['log_path'])
+
+        retry_shard = []
+        for index, anim in unfinished:
+            attempts[index] += 1
+            if attempts[index] > self.max_retries:
+                outcomes[index] = {'index': index, 'status': 'quarantined', 'failure_class': 'transient',
+                                   'attempts': attempts[index], 'error': f"Worker failed {attempts[index]} times"}
             else:
-                cmds.optionMenu(self.animation_combo, edit=True, enable=False)
-                cmds.button(self.set_timeline_button, edit=True, enable=False)
-                self.update_status("Export mode: Selected animation (No animations loaded)")
+                retry_shard.append((index, anim))
+
+        return retry_shard
+
+
+def read_worker_results(results_path):
+    """读取工作进程逐行写入的结果，忽略被截断的最后一行"""
+    if not os.path.exists(results_path):
+        return []
+
+    records = []
+    with open(results_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def print_log_tail(log_path, line_count=10):
+    """输出工作进程日志的最后几行"""
+    try:
+        with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+            lines = f.readlines()[-line_count:]
+    except OSError:
+        return
+    for line in lines:
+        print(f"    | {line.rstrip()}")
+
+
+# 导出服务默认监听的本机端口
+DEFAULT_SERVER_PORT = 47821
+
+
+class ExportJobQueue:
+    """导出服务的任务队列: 按优先级（数值小的先执行）和提交顺序出队，
+
+    同一优先级中优先选择当前已打开场景的任务，减少重新打开场景。
+    """
+
+    def __init__(self):
+        self._jobs = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self.closed = False
+
+    def __len__(self):
+        with self._condition:
+            return len(self._jobs)
+
+    def put(self, job, priority=0):
+        """加入任务，返回排队位置；关闭后不再接受任务"""
+        with self._condition:
+            if self.closed:
+                raise Exception("Export server is shutting down")
+            heapq.heappush(self._jobs, (priority, next(self._sequence), job))
+            self._condition.notify()
+            return len(self._jobs)
+
+    def pop(self, current_scene=None):
+        """取出下一个任务，队列为空时等待；关闭后返回None"""
+        with self._condition:
+            while not self._jobs and not self.closed:
+                self._condition.wait()
+            if self.closed:
+                return None
+
+            best_priority = self._jobs[0][0]
+            candidates = [entry for entry in self._jobs
+                          if entry[0] == best_priority and entry[2]['scene'] == current_scene]
+            entry = min(candidates) if candidates else self._jobs[0]
+            self._jobs.remove(entry)
+            heapq.heapify(self._jobs)
+            return entry[2]
+
+    def close(self):
+        """停止出队并唤醒等待的线程，返回还在排队的任务（按出队顺序）"""
+        with self._condition:
+            self.closed = True
+            dropped = [entry[2] for entry in sorted(self._jobs)]
+            self._jobs = []
+            self._condition.notify_all()
+            return dropped
+
+
+class ExportServerConnection:
+    """导出服务的一个客户端连接，按行发送JSON消息"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        """发送一条消息，客户端断开后忽略（导出结果仍然写入磁盘）"""
+        data = (json.dumps(message) + '\n').encode('utf-8')
+        with self._lock:
+            if self.closed:
+                return
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                self.closed = True
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+
+
+class ExportServer:
+    """常驻的导出服务: 保持Maya会话和打开的场景，通过本机socket接收导出任务
+
+    连接在后台线程中读取，任务在主线程中按队列顺序执行（Maya命令只能在主线程调用）。
+    每行一个JSON请求:
+      {"type": "submit", "scene": ..., "list": ... 或 "text": ..., "output": ...,
+       "priority": 0, "select": [...], "options": {...}}
+      {"type": "status"} / {"type": "shutdown"}
+    每个片段完成后返回{"type": "clip", ...}，任务结束返回{"type": "done", ...}或{"type": "error", ...}。
+    """
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_SERVER_PORT, options=None):
+        self.host = host
+        self.port = port
+        self.options = dict(options or {})
+        self.jobs = ExportJobQueue()
+        self.job_ids = itertools.count(1)
+        # 当前打开的场景(路径, 修改时间)，文件被修改后重新打开
+        self.current_scene = None
+        self.current_job = None
+        self.completed_jobs = 0
+        self.scene_opens = 0
+        self._server_socket = None
+
+    def start(self):
+        """开始监听，在后台线程中接受连接"""
+        self._server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server_socket.bind((self.host, self.port))
+        self._server_socket.listen()
+        # 端口为0时使用系统分配的端口
+        self.port = self._server_socket.getsockname()[1]
+        threading.Thread(target=self._accept_loop, name="REAnimExportAccept", daemon=True).start()
+        print(f"Export server listening on {self.host}:{self.port}")
+
+    def serve_forever(self):
+        """在当前（主）线程中执行任务，直到收到shutdown请求"""
+        if self._server_socket is None:
+            self.start()
+        try:
+            while True:
+                job = self.jobs.pop(self.current_scene[0] if self.current_scene else None)
+                if job is None:
+                    break
+                self.run_job(job)
+        finally:
+            self._server_socket.close()
+            print(f"Export server stopped after {self.completed_jobs} jobs ({self.scene_opens} scene opens)")
+
+    def _accept_loop(self):
+        """接受连接，每个连接一个读取线程"""
+        while not self.jobs.closed:
+            try:
+                sock, _ = self._server_socket.accept()
+            except OSError:
+                break
+            connection = ExportServerConnection(sock)
+            threading.Thread(target=self._read_requests, args=(connection,), daemon=True).start()
+
+    def _read_requests(self, connection):
+        """读取一个连接的请求"""
+        with connection.sock.makefile('r', encoding='utf-8') as reader:
+            for line in reader:
+                if not line.strip():
+                    continue
+                try:
+                    self.handle_request(json.loads(line), connection)
+                except Exception as e:
+                    connection.send({'type': 'error', 'error': f"Invalid request: {str(e)}"})
+
+    def handle_request(self, request, connection):
+        """处理一个请求（在读取线程中调用，只操作队列，不调用Maya）"""
+        request_type = request.get('type')
+        if request_type == 'submit':
+            if not request.get('scene') or not request.get('output') or \
+                    not (request.get('list') or request.get('text')):
+                raise Exception("submit needs scene, output and list or text")
+            job = dict(request, id=next(self.job_ids), connection=connection,
+                       scene=os.path.abspath(request['scene']))
+            position = self.jobs.put(job, request.get('priority', 0))
+            connection.send({'type': 'queued', 'job': job['id'], 'position': position})
+        elif request_type == 'status':
+            connection.send({
+                'type': 'status',
+                'queued': len(self.jobs),
+                'current_job': self.current_job,
+                'current_scene': self.current_scene[0] if self.current_scene else None,
+                'completed_jobs': self.completed_jobs,
+                'scene_opens': self.scene_opens
+            })
+        elif request_type == 'shutdown':
+            connection.send({'type': 'shutdown'})
+            # 还在排队的任务不再执行，通知它们的客户端
+            for job in self.jobs.close():
+                job['connection'].send({'type': 'error', 'job': job['id'],
+                                        'error': "Export server shut down before the job started"})
+            # 唤醒accept，让后台线程退出
+            self._server_socket.close()
         else:
-            # Export All Animations 被选中
-            cmds.optionMenu(self.animation_combo, edit=True, enable=False)
-            cmds.button(self.set_timeline_button, edit=True, enable=False)
-            if self.animation_data:
-                self.update_status(f"Export mode: All animations ({len(self.animation_data)} total)")
-            else:
-                self.update_status("Export mode: All animations (No animations loaded)")
-    
-    def export_animation(self, *args):
-        """导出动画"""
-        if not self.animation_data:
-            cmds.warning("No animation data to export!")
-            return
-        
-        # 分别导出每个动画
-        self.export_animations_separately()
-    
-    def export_animations_separately(self):
-        """分别导出每个动画"""
-        # 选择导出文件夹
-        export_path = cmds.fileDialog2(
-            caption="Select Export Directory",
-            fileMode=3,  # 文件夹选择模式
-            okCaption="Select"
-        )
-        
-        if not export_path:
-            self.update_status("Export cancelled by user")
+            raise Exception(f"Unknown request type: {request_type}")
+
+    def ensure_scene(self, exporter, scene_path):
+        """需要时打开场景；已打开且文件没有修改时直接使用"""
+        scene_key = (scene_path, os.path.getmtime(scene_path))
+        if self.current_scene == scene_key:
+            print(f"Reusing open scene: {scene_path}")
             return
-        
-        export_path = export_path[0]
-        
+        self.current_scene = None
+        exporter.open_scene(scene_path)
+        self.current_scene = scene_key
+        self.scene_opens += 1
+
+    def run_job(self, job):
+        """在主线程中执行一个导出任务，逐个片段返回结果
+
+        任务失败，或者烘焙后没能撤销时，场景可能已经改变，下一个任务重新打开场景。
+        """
+        connection = job['connection']
+        self.current_job = job['id']
+        start_time = time.perf_counter()
+        exporter = None
         try:
-            export_selected = cmds.radioButton(self.export_selected_radio, query=True, select=True)
-            
-            if export_selected:
-                # 导出选中的动画
-                selected_index = cmds.optionMenu(self.animation_combo, query=True, select=True) - 1
-                if 0 <= selected_index < len(self.animation_data):
-                    anim = self.animation_data[selected_index]
-                    self.update_status(f"Exporting: {anim['name']}...")
-                    self.export_single_animation_as_take(anim, export_path)
-                    self.update_status(f"Exported: {anim['name']}")
-                    cmds.confirmDialog(
-                        title="Export Complete",
-                        message=f"Successfully exported: {anim['name']}\nTo: {export_path}",
-                        button=["OK"]
-                    )
-                else:
-                    cmds.warning("Invalid animation selection!")
+            # 导出后撤销烘焙，保持场景不变供后续任务使用
+            options = dict(self.options, **job.get('options', {}))
+            options['restore_after_bake'] = True
+            exporter = AnimationExporter(options=options)
+
+            if job.get('text'):
+                animations = exporter.parse_animation_text(job['text'])
             else:
-                # 导出所有动画
-                exported_count = 0
-                failed_exports = []
-                
-                for i, anim in enumerate(self.animation_data):
-                    try:
-                        self.update_status(f"Exporting... {i+1}/{len(self.animation_data)}: {anim['name']}")
-                        self.export_single_animation_as_take(anim, export_path)
-                        exported_count += 1
-                    except Exception as e:
-                        failed_exports.append(f"{anim['name']}: {str(e)}")
-                        print(f"Failed to export {anim['name']}: {str(e)}")
-                
-                if failed_exports:
-                    self.update_status(f"Export complete: {exported_count}/{len(self.animation_data)} successful")
-                    error_message = f"Exported {exported_count}/{len(self.animation_data)} animations.\n\nFailed exports:\n" + "\n".join(failed_exports[:5])
-                    if len(failed_exports) > 5:
-                        error_message += f"\n... and {len(failed_exports)-5} more"
-                    cmds.confirmDialog(
-                        title="Export Complete with Errors",
-                        message=error_message,
-                        button=["OK"],
-                        icon="warning"
-                    )
-                else:
-                    self.update_status(f"Export complete: {exported_count} animations")
-                    cmds.confirmDialog(
-                        title="Export Complete",
-                        message=f"Successfully exported all {exported_count} animations to:\n{export_path}",
-                        button=["OK"]
-                    )
-        
+                animations = exporter.load_animation_file(job['list'], job['scene'])
+            if not animations:
+                raise Exception("No valid animation data found")
+
+            self.ensure_scene(exporter, job['scene'])
+            cmds.select(clear=True)
+            if job.get('select'):
+                cmds.select(job['select'])
+
+            export_path = job['output']
+            os.makedirs(export_path, exist_ok=True)
+
+            def send_clip_result(index, anim, status, error):
+                connection.send({'type': 'clip', 'job': job['id'], 'index': index, 'name': anim['name'],
+                                 'id': anim['id'], 'status': status, 'error': error})
+
+            result = exporter.export_animations(animations, export_path, clip_callback=send_clip_result)
+            connection.send({
+                'type': 'done',
+                'job': job['id'],
+                'exported': len(result['exported']),
+                'skipped': len(result['skipped']),
+                'failed': result['failed'],
+                'seconds': round(time.perf_counter() - start_time, 3)
+            })
         except Exception as e:
-            error_msg = f"Export failed: {str(e)}"
-            cmds.error(error_msg)
-            self.update_status("Export failed - Check script editor for details")
-            cmds.confirmDialog(
-                title="Export Error",
-                message=f"Export failed:\n{str(e)}",
-                button=["OK"],
-                icon="critical"
-            )
-    
-    def export_single_animation_as_take(self, anim_data, export_path):
-        """导出单个动画片段作为独立的Take"""
+            print(f"Export job {job['id']} failed: {str(e)}")
+            self.current_scene = None
+            connection.send({'type': 'error', 'job': job['id'], 'error': str(e)})
+        finally:
+            if exporter is not None and exporter.timeline_baked and self.current_scene is not None:
+                print(f"Timeline bake of {job['scene']} was not undone, the scene will be reopened")
+                self.current_scene = None
+            self.current_job = None
+            self.completed_jobs += 1
+
+
+class ExportClient:
+    """导出服务的客户端（不需要Maya）"""
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_SERVER_PORT, timeout=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    @contextlib.contextmanager
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
         try:
-            # 设置FBX导出参数
-            self.setup_fbx_export_settings_for_clips()
-            
-            # 清除现有的动画分割设置
-            mel.eval('FBXExportSplitAnimationIntoTakes -clear')
-            
-            # 创建单个Take
-            take_name = f"{anim_data['name']}_ID{anim_data['id']}"
-            start_frame = anim_data['start_frame']
-            end_frame = anim_data['end_frame']
-            
-            # 设置烘焙时间范围
-            mel.eval(f'FBXExportBakeComplexStart -v {start_frame}')
-            mel.eval(f'FBXExportBakeComplexEnd -v {end_frame}')
-            
-            # 添加Take scripts/others/gameFbxExporter.mel
-            mel.eval(f'FBXExportSplitAnimationIntoTakes -v "{take_name}" {start_frame} {end_frame}')
-            
-            # 检查选择
-            selected_objects = cmds.ls(selection=True, long=True)
-            if not selected_objects:
-                result = cmds.confirmDialog(
-                    title="No Selection",
-                    message="No objects selected. Export all visible objects?",
-                    button=["Yes", "No"],
-                    defaultButton="Yes",
-                    cancelButton="No",
-                    dismissString="No"
-                )
-                
-                if result == "Yes":
-                    all_transforms = cmds.ls(type='transform', long=True)
-                    visible_objects = [obj for obj in all_transforms 
-                                     if cmds.getAttr(f"{obj}.visibility") 
-                                     and not cmds.getAttr(f"{obj}.intermediateObject", default=False)]
-                    if visible_objects:
-                        cmds.select(visible_objects)
-                    else:
-                        raise Exception("No visible objects found to export!")
+            with sock.makefile('r', encoding='utf-8') as reader:
+                yield sock, reader
+        finally:
+            sock.close()
+
+    def _request(self, request):
+        """发送一个请求并返回一条回复"""
+        with self._connect() as (sock, reader):
+            sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+            line = reader.readline()
+        if not line:
+            raise Exception("Export server closed the connection")
+        return json.loads(line)
+
+    def submit(self, scene, list_path, output, priority=0, select=None, options=None):
+        """提交导出任务，逐条生成服务返回的消息，直到任务完成或失败
+
+        list_path为'-'时从标准输入读取列表并发送内容。
+        """
+        request = {
+            'type': 'submit',
+            'scene': os.path.abspath(scene),
+            'output': os.path.abspath(output),
+            'priority': priority,
+            'select': select,
+            'options': options or {}
+        }
+        if list_path == '-':
+            request['text'] = sys.stdin.read()
+        else:
+            request['list'] = os.path.abspath(list_path)
+
+        with self._connect() as (sock, reader):
+            sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+            job_id = None
+            for line in reader:
+                message = json.loads(line)
+                if message['type'] == 'queued':
+                    job_id = message['job']
+                elif message.get('job') != job_id:
+                    continue
+                yield message
+                if message['type'] in ('done', 'error'):
+                    return
+        raise Exception("Export server closed the connection before the job finished")
+
+    def status(self):
+        """查询服务状态"""
+        return self._request({'type': 'status'})
+
+    def shutdown(self):
+        """停止服务（当前任务完成后）"""
+        return self._request({'type': 'shutdown'})
+
+
+def parse_key_tolerances(values):
+    """解析命令行的CHANNEL=VALUE简化误差"""
+    tolerances = {}
+    for value in values:
+        channel, _, tolerance = value.partition('=')
+        if channel not in DEFAULT_KEY_TOLERANCES:
+            raise argparse.ArgumentTypeError(f"Unknown channel for --key-tolerance: {channel}")
+        tolerances[channel] = float(tolerance)
+    return tolerances
+
+
+def build_arg_parser():
+    """命令行参数"""
+    parser = argparse.ArgumentParser(
+        prog="REMayaAnimationExportTool",
+        description="RE Maya Animation Export Tool (batch mode)"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser(
+        "export",
+        help="Export every clip of one or more scenes without UI (run with mayapy)"
+    )
+    export_parser.add_argument(
+        "--job", nargs=2, action="append", required=True, metavar=("SCENE", "LIST"),
+        help="Scene file and its Noesis animation list or log, - for stdin (can be repeated)"
+    )
+    export_parser.add_argument("--output", required=True, help="Export directory")
+    export_parser.add_argument(
+        "--select", action="append",
+        help="Node to select before exporting (can be repeated, default: all visible objects)"
+    )
+    export_parser.add_argument(
+        "--flat", action="store_true",
+        help="Write all scenes into the export directory instead of one subfolder per scene"
+    )
+    export_parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of parallel mayapy worker processes per scene (default: 1, export in this process)"
+    )
+    export_parser.add_argument(
+        "--max-retries", type=int, default=2,
+        help="How many times unfinished clips of a failed worker are queued again (default: 2)"
+    )
+    export_parser.add_argument(
+        "--worker-timeout", type=float, default=None,
+        help="Kill a worker after this many seconds and queue its unfinished clips again"
+    )
+    export_parser.add_argument(
+        "--mayapy", default=None,
+        help="mayapy executable used for workers (default: this interpreter or $MAYAPY)"
+    )
+    export_parser.add_argument(
+        "--bake", choices=["per-clip", "once"], default="per-clip",
+        help="per-clip: FBX plugin bakes complex animation for every clip; "
+             "once: bake the whole timeline to plain keys once, then export clips without complex bake"
+    )
+
+    export_parser.add_argument(
+        "--export-mode", choices=["per-clip", "split", "pack"], default="per-clip",
+        help="per-clip: call FBXExport once per clip; "
+             "split: export the whole timeline once and cut it into per-clip FBX files offline; "
+             f"pack: no FBX, sample the joints with OpenMaya into one {CLIP_PACK_FILE_NAME} file per scene"
+    )
+    export_parser.add_argument(
+        "--split-workers", type=int, default=None,
+        help="Processes used to split the timeline FBX (default: number of CPU cores)"
+    )
+
+    export_parser.add_argument(
+        "--incremental", action="store_true",
+        help="Skip clips whose frame range, curve data, settings and output file are unchanged "
+             "since the last run (recorded in a manifest in the export directory)"
+    )
+    export_parser.add_argument(
+        "--max-attempts", type=int, default=3,
+        help="How many times a clip is exported before it is quarantined; only transient errors are retried "
+             "(default: 3)"
+    )
+    export_parser.add_argument(
+        "--retry-delay", type=float, default=2.0,
+        help="Seconds before the first retry round, doubled for every further round (default: 2)"
+    )
+    export_parser.add_argument(
+        "--rerun-failures", action="store_true",
+        help="Only export the clips that failed, were quarantined or were not exported in the last run "
+             "(read from the results file in each export directory)"
+    )
+
+    export_parser.add_argument(
+        "--content", choices=["full", "skeleton"], default="full",
+        help="full: export the selection with geometry; "
+             "skeleton: export only the joints under the selection and their animation"
+    )
+    export_parser.add_argument(
+        "--bind-pose-mesh", action="store_true",
+        help="With --content skeleton, also export the geometry once in bind pose without animation "
+             f"({BIND_POSE_FILE_NAME})"
+    )
+
+    export_parser.add_argument(
+        "--stage", nargs="?", const="", default=None, metavar="SCRATCH_DIR",
+        help="Write FBX files to a local scratch directory (default: system temp) and copy them to --output "
+             "in the background"
+    )
+    export_parser.add_argument(
+        "--transfer-workers", type=int, default=4,
+        help="Background threads copying staged files to --output (default: 4)"
+    )
+    export_parser.add_argument(
+        "--preflight", choices=["off", "warn", "strict"], default="warn",
+        help="Check clip ranges for overlaps, gaps, ranges past the keyed animation and frame count mismatches "
+             "before exporting; strict skips scenes with issues (default: warn)"
+    )
+    export_parser.add_argument(
+        "--reduce-keys", action="store_true",
+        help="With --bake once, remove baked keys that linear interpolation reproduces within the tolerances"
+    )
+    export_parser.add_argument(
+        "--key-tolerance", action="append", default=[], metavar="CHANNEL=VALUE",
+        help="Key reduction tolerance for translate, rotate (degrees), scale or other channels "
+             "(can be repeated, default: " + ", ".join(f"{k}={v}" for k, v in DEFAULT_KEY_TOLERANCES.items()) + ")"
+    )
+    export_parser.add_argument(
+        "--dedupe", choices=["off", "copy", "link"], default="off",
+        help="With --bake once, export clips with identical motion only once; copy writes the others "
+             "with their own take name and frame range, link hard-links the same file (source take name and frames)"
+    )
+    export_parser.add_argument(
+        "--clip-catalog", action="store_true",
+        help="Save parsed clip tables to <scene>.reclips.json next to each scene "
+             "(existing catalogs are always read)"
+    )
+    export_parser.add_argument(
+        "--profile", metavar="DIR", default=None,
+        help="Record time, bytes written and MEL calls per phase and per clip, "
+             "and write a JSON summary and a Chrome trace per batch to DIR"
+    )
+
+    compare_parser = subparsers.add_parser(
+        "compare-content",
+        help="Export a sample of clips with full and skeleton-only content and report size and time"
+    )
+    compare_parser.add_argument(
+        "--job", nargs=2, action="append", required=True, metavar=("SCENE", "LIST"),
+        help="Scene file and its Noesis animation list or log (can be repeated)"
+    )
+    compare_parser.add_argument("--output", required=True, help="Directory for the sample exports and reports")
+    compare_parser.add_argument("--select", action="append", help="Node to select before exporting")
+    compare_parser.add_argument("--sample", type=int, default=10,
+                                help="Number of clips spread over the list to export (default: 10)")
+    compare_parser.add_argument("--bake", choices=["per-clip", "once"], default="per-clip",
+                                help="Bake mode used for both exports")
+
+    retime_parser = subparsers.add_parser(
+        "retime",
+        help="Retime the animation of one or more scenes to another frame rate and save them (run with mayapy)"
+    )
+    retime_parser.add_argument("--scene", action="append", required=True, help="Scene file (can be repeated)")
+    retime_parser.add_argument("--source-fps", type=float, required=True, help="Frame rate the keys were made for")
+    retime_parser.add_argument("--target-fps", type=float, required=True,
+                               help="Frame rate the same frame numbers should play at")
+    retime_parser.add_argument("--pivot", type=float, default=0.0, help="Time pivot frame (default: 0)")
+    retime_parser.add_argument(
+        "--select", action="append",
+        help="Root node whose hierarchy is retimed (can be repeated, default: the whole scene)"
+    )
+    retime_parser.add_argument("--snap", action="store_true",
+                               help="Snap keys that end up between frames to whole frames")
+    retime_output = retime_parser.add_mutually_exclusive_group(required=True)
+    retime_output.add_argument("--output", help="Directory to save the retimed scenes to")
+    retime_output.add_argument("--in-place", action="store_true", help="Overwrite the original scenes")
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Keep a Maya session and scenes open and export jobs submitted over a local socket (run with mayapy)"
+    )
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_SERVER_PORT,
+                              help=f"Port to listen on (default: {DEFAULT_SERVER_PORT})")
+
+    submit_parser = subparsers.add_parser(
+        "submit",
+        help="Submit export jobs to a running export server and print the result of every clip"
+    )
+    submit_parser.add_argument(
+        "--job", nargs=2, action="append", metavar=("SCENE", "LIST"),
+        help="Scene file and its Noesis animation list or log, - for stdin (can be repeated)"
+    )
+    submit_parser.add_argument("--output", help="Export directory (one subfolder per scene)")
+    submit_parser.add_argument("--select", action="append", help="Node to select before exporting")
+    submit_parser.add_argument("--priority", type=int, default=0,
+                               help="Lower numbers are exported first (default: 0)")
+    submit_parser.add_argument("--bake", choices=["per-clip", "once"], default="per-clip")
+    submit_parser.add_argument("--content", choices=["full", "skeleton"], default="full")
+    submit_parser.add_argument("--incremental", action="store_true")
+    submit_parser.add_argument("--clip-catalog", action="store_true",
+                               help="Save parsed clip tables to <scene>.reclips.json next to each scene")
+    submit_parser.add_argument("--host", default="127.0.0.1")
+    submit_parser.add_argument("--port", type=int, default=DEFAULT_SERVER_PORT)
+    submit_parser.add_argument("--status", action="store_true", help="Print the server status instead")
+    submit_parser.add_argument("--shutdown", action="store_true", help="Stop the server after its current job")
+
+    split_parser = subparsers.add_parser(
+        "split",
+        help="Cut a binary timeline FBX into one FBX per clip (no Maya needed)"
+    )
+    split_parser.add_argument("--source", required=True, help="Binary FBX containing the whole timeline")
+    split_parser.add_argument("--list", required=True, help="Noesis animation list or log (- for stdin)")
+    split_parser.add_argument("--output", required=True, help="Export directory")
+    split_parser.add_argument("--workers", type=int, default=None,
+                              help="Number of processes (default: number of CPU cores)")
+    split_parser.add_argument("--fps", type=float, default=None,
+                              help="Frame rate of the frame numbers in the list (default: read from the FBX)")
+
+    clips_parser = subparsers.add_parser(
+        "clips",
+        help="Print clip ranges from a scene's clip catalog (<scene>.reclips.json, no Maya needed)"
+    )
+    clips_parser.add_argument("--scene", required=True, help="Scene file the catalog was saved for")
+    clips_parser.add_argument("--list", help="Noesis list or log the catalog was made from (default: latest catalog)")
+    clips_query = clips_parser.add_mutually_exclusive_group()
+    clips_query.add_argument("--name", help="Only clips with this name")
+    clips_query.add_argument("--id", type=int, help="Only clips with this ID")
+    clips_query.add_argument("--frame", type=int, help="Only the clip containing this frame")
+    clips_parser.add_argument("--json", action="store_true", help="Print JSON records")
+
+    # 并行导出的工作进程（由ParallelExportRunner启动）
+    worker_parser = subparsers.add_parser("worker", help="Internal: parallel export worker process")
+    worker_parser.add_argument("--scene", required=True)
+    worker_parser.add_argument("--clips", required=True)
+    worker_parser.add_argument("--output", required=True)
+    worker_parser.add_argument("--results", required=True)
+    worker_parser.add_argument("--select", action="append")
+
+    # 并行导出前读取场景关键帧范围的进程（由ParallelExportRunner启动）
+    keyed_range_parser = subparsers.add_parser("keyed-range", help="Internal: read the keyed range for pre-flight")
+    keyed_range_parser.add_argument("--scene", required=True)
+    keyed_range_parser.add_argument("--output", required=True)
+    keyed_range_parser.add_argument("--select", action="append")
+
+    return parser
+
+
+def main(argv=None):
+    """命令行入口"""
+    args = build_arg_parser().parse_args(argv)
+
+    if args.command == "export":
+        runner = None
+        if args.workers > 1 and args.export_mode != 'pack':
+            # 主进程只负责解析和调度，不需要初始化Maya
+            runner = ParallelExportRunner(
+                args.workers,
+                mayapy=args.mayapy,
+                max_retries=args.max_retries,
+                worker_timeout=args.worker_timeout
+            )
+        else:
+            if args.workers > 1:
+                print("Warning: --export-mode pack writes one file per scene, --workers is ignored")
+            initialize_batch_session()
+        options = {
+            'bake_mode': args.bake.replace('-', '_'),
+            'export_mode': args.export_mode.replace('-', '_'),
+            'split_workers': args.split_workers,
+            'incremental': args.incremental,
+            'content': args.content,
+            'bind_pose_mesh': args.bind_pose_mesh,
+            'profile_dir': os.path.abspath(args.profile) if args.profile else None,
+            'dedupe': args.dedupe,
+            'preflight': args.preflight,
+            'staging': args.stage is not None,
+            'scratch_dir': args.stage or None,
+            'transfer_workers': args.transfer_workers,
+            'max_attempts': max(args.max_attempts, 1),
+            'retry_delay': args.retry_delay,
+            'reduce_keys': args.reduce_keys,
+            'key_tolerances': parse_key_tolerances(args.key_tolerance),
+            'clip_catalog': args.clip_catalog,
+        }
+        results = export_scene_batch(args.job, args.output, args.select, args.flat, runner, options,
+                                     args.rerun_failures)
+
+        exported_count = sum(len(r['exported']) for r in results)
+        skipped_count = sum(len(r['skipped']) for r in results)
+        duplicate_count = sum(len(group) - 1 for r in results for group in r.get('duplicates', []))
+        quarantined_count = sum(len(r.get('quarantined', [])) for r in results)
+        not_exported_count = sum(len(r.get('cancelled', [])) for r in results)
+        failed_exports = [f for r in results for f in r['failed']]
+        print(f"Batch export complete: {exported_count} exported ({duplicate_count} reused from identical clips), "
+              f"{skipped_count} up to date, {len(failed_exports)} failed ({quarantined_count} quarantined), "
+              f"{not_exported_count} not exported")
+        for failure in failed_exports:
+            print(f"  Failed: {failure}")
+        for result in results:
+            if result.get('fatal'):
+                print(f"  Stopped {result['scene']}: {result['fatal']}")
+        return 1 if failed_exports or not_exported_count else 0
+
+    if args.command == "compare-content":
+        initialize_batch_session()
+        options = {'bake_mode': args.bake.replace('-', '_')}
+        compare_scene_content_modes(args.job, args.output, args.select, args.sample, options)
+        return 0
+
+    if args.command == "retime":
+        initialize_batch_session()
+        reports = retime_scene_batch(args.scene, args.source_fps, args.target_fps, args.pivot,
+                                     args.select, None if args.in_place else args.output, args.snap)
+        failed = [r for r in reports if 'error' in r]
+        print(f"Retime complete: {len(reports) - len(failed)} scenes retimed, {len(failed)} failed")
+        return 1 if failed else 0
+
+    if args.command == "serve":
+        initialize_batch_session(undo=True)
+        ExportServer(args.host, args.port).serve_forever()
+        return 0
+
+    if args.command == "submit":
+        client = ExportClient(args.host, args.port)
+        if args.status or args.shutdown:
+            print(json.dumps(client.shutdown() if args.shutdown else client.status(), indent=2))
+            return 0
+        if not args.job or not args.output:
+            build_arg_parser().error("submit needs --job and --output")
+
+        options = {'bake_mode': args.bake.replace('-', '_'), 'content': args.content,
+                   'incremental': args.incremental, 'clip_catalog': args.clip_catalog}
+        failed_count = 0
+        for scene_path, list_path in args.job:
+            scene_name = os.path.splitext(os.path.basename(scene_path))[0]
+            export_path = os.path.join(args.output, scene_name)
+            for message in client.submit(scene_path, list_path, export_path, args.priority, args.select, options):
+                if message['type'] == 'queued':
+                    print(f"Job {message['job']} queued at position {message['position']}: {scene_path}")
+                elif message['type'] == 'clip':
+                    error = f": {message['error']}" if message['error'] else ""
+                    print(f"  [{message['status']}] {message['name']} (ID: {message['id']}){error}")
+                elif message['type'] == 'done':
+                    failed_count += len(message['failed'])
+                    print(f"Job {message['job']} done in {message['seconds']}s: {message['exported']} exported, "
+                          f"{message['skipped']} up to date, {len(message['failed'])} failed")
                 else:
-                    raise Exception("Export cancelled - no objects to export!")
-            
-            # 生成文件名
-            safe_name = re.sub(r'[<>:"/\\|?*]', '_', anim_data['name'])
-            filename = f"{safe_name}_ID{anim_data['id']}.fbx"
-            filepath = os.path.join(export_path, filename).replace('\\', '/')
-            
-            # 执行导出
-            mel.eval(f'FBXExport -f "{filepath}" -s')
-            
-            # 清理
-            mel.eval('FBXExportSplitAnimationIntoTakes -clear')
-            
-            print(f"Exported animation: {anim_data['name']} (Frames: {start_frame}-{end_frame}, ID: {anim_data['id']}) to {filepath}")
-            
-        except Exception as e:
-            # 确保清理
-            mel.eval('FBXExportSplitAnimationIntoTakes -clear')
-            raise e
-    
-    def setup_fbx_export_settings_for_clips(self):
-        """设置FBX导出选项用于动画片段"""
-        try:
-            # 重置FBX导出设置
-            mel.eval('FBXResetExport')
-            
-            # 设置动画导出选项
-            mel.eval('FBXExportBakeComplexAnimation -v true')
-            mel.eval('FBXExportBakeComplexStep -v 1')
-            
-            # 导出设置
-            mel.eval('FBXExportAnimationOnly -v false')  # 导出几何体和动画
-            mel.eval('FBXExportBakeComplexAnimation -v true')
-            
-            # 启用删除原始Take（这样只保留我们分割的Takes）
-            mel.eval('FBXExportDeleteOriginalTakeOnSplitAnimation -v true')
-            
-            # 其他常用设置
-            mel.eval('FBXExportSmoothingGroups -v true')
-            mel.eval('FBXExportHardEdges -v false')
-            mel.eval('FBXExportTangents -v false')
-            mel.eval('FBXExportSmoothMesh -v true')
-            mel.eval('FBXExportInstances -v false')
-            mel.eval('FBXExportReferencedAssetsContent -v true')
-            
-            # 单位设置
-            mel.eval('FBXExportConvertUnitString "cm"')
-            
-        except Exception as e:
-            print(f"Warning: Some FBX export settings may not be available: {str(e)}")
-    
-    def update_status(self, message):
-        """更新状态显示"""
-        cmds.text(self.status_text, edit=True, label=message)
-        cmds.refresh()  # 强制刷新界面
-    
-    def close_window(self):
-        """关闭窗口"""
-        if cmds.window(self.window_name, exists=True):
-            cmds.deleteUI(self.window_name)
+                    failed_count += 1
+                    print(f"Job {message['job']} failed: {message['error']}")
+        return 1 if failed_count else 0
 
+    if args.command == "split":
+        animations = AnimationExporter().load_animation_file(args.list)
+        os.makedirs(args.output, exist_ok=True)
+        errors = split_fbx_clips(args.source, animations, args.output, workers=args.workers, fps=args.fps)
 
-def show_animation_exporter():
-    """显示动画导出工具"""
-    exporter = AnimationExporterUI()
-    return exporter
+        failed_exports = [f"{anim['name']}: {error}" for anim, error in zip(animations, errors) if error]
+        print(f"Split complete: {len(animations) - len(failed_exports)} exported, {len(failed_exports)} failed")
+        for failure in failed_exports:
+            print(f"  Failed: {failure}")
+        return 1 if failed_exports else 0
+
+    if args.command == "clips":
+        source_hash = None
+        if args.list:
+            with open(args.list, 'r', encoding='utf-8', errors='replace') as f:
+                source_hash = noesis_source_hash(f)
+        cached = ClipCatalog.load_sidecar(args.scene, source_hash)
+        if cached is None:
+            source = f" for {args.list}" if args.list else ""
+            print(f"No clip catalog{source} found in {ClipCatalog.sidecar_path(args.scene)}")
+            return 1
+
+        table = cached[0]
+        if args.frame is not None:
+            rows = [row for row in [table.row_at_frame(args.frame)] if row is not None]
+        elif args.id is not None:
+            rows = table.rows_by_id(args.id)
+        elif args.name:
+            rows = table.rows_by_name(args.name)
+        else:
+            rows = range(len(table))
+
+        records = [table.record(row) for row in rows]
+        if args.json:
+            print(json.dumps(records, indent=1))
+        else:
+            for anim in records:
+                print(f"{anim['name']}\t{anim['start_frame']}\t{anim['end_frame']}\t{anim['id']}")
+        return 0 if records else 1
+
+    if args.command == "worker":
+        initialize_batch_session()
+        run_export_worker(args.scene, args.clips, args.output, args.results, args.select)
+        return 0
+
+    if args.command == "keyed-range":
+        initialize_batch_session()
+        run_keyed_range_worker(args.scene, args.output, args.select)
+        return 0
+
+    return 0
+
+
+def _running_in_maya_gui():
+    """判断是否在Maya界面中运行（而不是mayapy）"""
+    executable = os.path.basename(sys.executable).lower()
+    return executable.startswith("maya") and not executable.startswith("mayapy")
 
 
 # 运行脚本
 if __name__ == "__main__":
-    show_animation_exporter()
+    if _running_in_maya_gui():
+        show_animation_exporter()
+    else:
+        sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 测试直接导入单文件工具（不在Maya中运行时Maya模块为None，只测试不依赖Maya的部分）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
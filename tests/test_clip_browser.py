@@ -0,0 +1,68 @@
+from REMayaAnimationExportTool import ClipBrowserModel, ClipTable
+
+
+def make_table(count=25):
+    """每个片段10帧，名称交替为walk和run"""
+    table = ClipTable()
+    for i in range(count):
+        table.append(f"{'walk' if i % 2 == 0 else 'Run'}_{i:02d}", i * 10, 10, 100 + i)
+    return table
+
+
+def test_unfiltered_pages():
+    model = ClipBrowserModel(make_table(), page_size=10)
+    assert model.page_count == 3
+    assert list(model.page_rows(0)) == list(range(10))
+    assert list(model.page_rows(2)) == list(range(20, 25))
+    assert model.page_labels(2)[0] == "walk_20 (Frames: 200-209, ID: 120)"
+
+
+def test_name_filter_is_case_insensitive_and_narrows():
+    model = ClipBrowserModel(make_table(), page_size=10)
+    assert model.set_filter("run") == 12
+    assert all(model.table.names[row].startswith("Run") for row in model.rows)
+    assert model.page_count == 2
+
+    # 条件变长时只在上次的结果中查找
+    assert model.set_filter("run_1") == 5
+    assert list(model.rows) == [11, 13, 15, 17, 19]
+
+    # 条件变短时重新在所有片段中查找
+    assert model.set_filter("_1") == 10
+    assert model.set_filter("") == 25
+
+
+def test_number_filter_matches_id_frame_and_name():
+    model = ClipBrowserModel(make_table(), page_size=10)
+    # ID 103、包含第103帧的片段（行10）以及名称中的"103"（没有）
+    assert model.set_filter("103") == 2
+    assert list(model.rows) == [3, 10]
+
+    assert model.set_filter("id:103") == 1
+    assert list(model.rows) == [3]
+    assert model.set_filter("frame:103") == 1
+    assert list(model.rows) == [10]
+    assert model.set_filter("frame:999") == 0
+    assert model.page_count == 1
+    assert list(model.page_rows(0)) == []
+
+
+def test_selection_across_pages_and_filters():
+    model = ClipBrowserModel(make_table(), page_size=10)
+    model.select_on_page(0, [1, 3])
+    model.select_on_page(1, [0])
+    assert model.selected_rows() == [1, 3, 10]
+
+    # 替换一页的选择不影响其他页
+    model.select_on_page(0, [2])
+    assert model.selected_rows() == [2, 10]
+    assert model.page_selection(1) == [0]
+
+    # 过滤后选择仍然按ClipTable的行号保存
+    model.set_filter("run")
+    model.select_on_page(0, [0])
+    assert model.selected_rows() == [1, 2, 10]
+    assert model.page_selection(0) == [0]
+
+    model.select_all_matching()
+    assert len(model.selected_rows()) == 12 + 2
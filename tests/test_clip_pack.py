@@ -0,0 +1,122 @@
+import os
+import struct
+
+import pytest
+
+import REMayaAnimationExportTool as tool
+from REMayaAnimationExportTool import ClipPack, write_clip_pack
+
+JOINT_NAMES = ['root', 'spine', 'head']
+PARENTS = [-1, 0, 1]
+JOINT_ORIENTS = [(0.0, 0.0, 0.0), (0.5, 0.25, -0.5), (0.0, 1.5, 0.0)]
+ROTATE_AXES = [(0.0, 0.0, 0.0), (0.0, 0.0, 0.125), (0.25, 0.0, 0.0)]
+ROTATE_ORDERS = [0, 3, 5]
+ANIMATIONS = [{'name': 'walk', 'id': 1, 'start_frame': 0, 'frame_count': 4},
+              {'name': 'run', 'id': 7, 'start_frame': 4, 'frame_count': 2}]
+VALUES_PER_FRAME = len(JOINT_NAMES) * len(tool.CLIP_PACK_CHANNELS)
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def pack_backend(request, monkeypatch):
+    """分别用NumPy数组和memoryview读取"""
+    if request.param == 'numpy':
+        if tool.np is None:
+            pytest.skip("NumPy is not installed")
+    else:
+        monkeypatch.setattr(tool, 'np', None)
+    return request.param
+
+
+def clip_values(anim):
+    """片段的测试数据: 值由片段ID、帧、骨骼和通道决定"""
+    return [anim['id'] * 1000 + frame * 100 + index
+            for frame in range(anim['frame_count']) for index in range(VALUES_PER_FRAME)]
+
+
+def clip_bytes(anim):
+    values = clip_values(anim)
+    return struct.pack(f'<{len(values)}f', *values)
+
+
+def write_pack(path, animations=ANIMATIONS, clip_data=None):
+    if clip_data is None:
+        clip_data = (clip_bytes(anim) for anim in animations)
+    return write_clip_pack(str(path), JOINT_NAMES, PARENTS, 30.0, animations, clip_data,
+                           JOINT_ORIENTS, ROTATE_AXES, ROTATE_ORDERS)
+
+
+def test_pack_round_trips_joints_and_clip_index(tmp_path):
+    path = write_pack(tmp_path / 'clips.reapack')
+
+    with ClipPack(path) as pack:
+        assert len(pack) == 2
+        assert pack.ids() == [1, 7]
+        assert 7 in pack and 2 not in pack
+        assert pack.joint_names == JOINT_NAMES
+        assert pack.parents == PARENTS
+        assert pack.fps == 30.0
+        assert pack.channels == tool.CLIP_PACK_CHANNELS
+        assert pack.info(7) == {'name': 'run', 'id': 7, 'start_frame': 4, 'frame_count': 2, 'end_frame': 5}
+
+
+def test_pack_keeps_joint_orientation(tmp_path):
+    path = write_pack(tmp_path / 'clips.reapack')
+
+    with ClipPack(path) as pack:
+        assert pack.rotate_orders == ROTATE_ORDERS
+        assert [tuple(orient) for orient in pack.joint_orients] == JOINT_ORIENTS
+        assert [tuple(axis) for axis in pack.rotate_axes] == ROTATE_AXES
+
+
+def test_missing_joint_orientation_defaults_to_zero(tmp_path):
+    path = write_clip_pack(str(tmp_path / 'clips.reapack'), JOINT_NAMES, PARENTS, 30.0,
+                           ANIMATIONS[:1], [clip_bytes(ANIMATIONS[0])])
+
+    with ClipPack(path) as pack:
+        assert pack.rotate_orders == [0, 0, 0]
+        assert [tuple(orient) for orient in pack.joint_orients] == [(0.0, 0.0, 0.0)] * 3
+        assert [tuple(axis) for axis in pack.rotate_axes] == [(0.0, 0.0, 0.0)] * 3
+
+
+def test_clip_data_has_frame_joint_channel_layout(tmp_path, pack_backend):
+    path = write_pack(tmp_path / 'clips.reapack')
+    channel_count = len(tool.CLIP_PACK_CHANNELS)
+
+    pack = ClipPack(path)
+    for anim in ANIMATIONS:
+        data = pack.clip(anim['id'])
+        assert tuple(data.shape) == (anim['frame_count'], len(JOINT_NAMES), channel_count)
+        values = clip_values(anim)
+        for frame in range(anim['frame_count']):
+            for joint in range(len(JOINT_NAMES)):
+                for channel in (0, channel_count - 1):
+                    index = (frame * len(JOINT_NAMES) + joint) * channel_count + channel
+                    assert data[frame, joint, channel] == values[index]
+        del data
+    pack.close()
+
+
+def test_rejects_file_that_is_not_a_pack(tmp_path):
+    path = tmp_path / 'clips.reapack'
+    path.write_bytes(b'NOTAPACK' + b'\x00' * 64)
+
+    with pytest.raises(ValueError, match="Not a clip pack"):
+        ClipPack(str(path))
+
+
+def test_rejects_other_pack_version(tmp_path):
+    path = write_pack(tmp_path / 'clips.reapack')
+    with open(path, 'r+b') as f:
+        f.seek(len(tool.CLIP_PACK_MAGIC))
+        f.write(struct.pack('<I', 1))
+
+    with pytest.raises(ValueError, match="Unsupported clip pack version 1"):
+        ClipPack(path)
+
+
+def test_wrong_clip_data_size_leaves_no_file(tmp_path):
+    path = tmp_path / 'clips.reapack'
+
+    with pytest.raises(Exception, match="Clip data of walk"):
+        write_pack(path, ANIMATIONS[:1], [b'\x00' * 12])
+    assert os.listdir(str(tmp_path)) == []
@@ -0,0 +1,98 @@
+import pytest
+
+import REMayaAnimationExportTool as tool
+from REMayaAnimationExportTool import ClipTable
+
+NOESIS_LIST = """\
+@ 100 'walk (30 frames) ID: 1'
+@ 130 'ch_blend2_pose_a (12 frames) ID: 2'
+@ 142 'run (20 frames) ID: 3'
+@ 162 'ch_blend3_pose_b (8 frames) ID: 4'
+@ 170 'walk (10 frames) ID: 5'
+"""
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def layout_backend(request, monkeypatch):
+    """分别用NumPy和纯Python实现重新排列"""
+    if request.param == 'numpy':
+        if tool.np is None:
+            pytest.skip("NumPy is not installed")
+    else:
+        monkeypatch.setattr(tool, 'np', None)
+    return request.param
+
+
+def parsed_table():
+    return ClipTable.from_records(tool.iter_noesis_clips(NOESIS_LIST.splitlines()))
+
+
+def test_relayout_shortens_blend_poses_and_moves_later_clips(layout_backend):
+    table = parsed_table()
+    assert table.blend_pose_count == 2
+
+    moved = table.relayout()
+
+    assert list(table.frame_counts) == [30, 1, 20, 1, 10]
+    assert list(table.start_frames) == [100, 130, 131, 151, 152]
+    assert list(table.end_frames) == [129, 130, 150, 151, 161]
+    assert moved == 3
+    # 原始帧数和起始帧保留
+    assert list(table.original_frame_counts) == [30, 12, 20, 8, 10]
+    assert list(table.original_start_frames) == [100, 130, 142, 162, 170]
+
+
+def test_relayout_empty_table(layout_backend):
+    assert ClipTable().relayout() == 0
+
+
+def test_lookups_after_relayout(layout_backend):
+    table = parsed_table()
+    table.relayout()
+
+    assert table.rows_by_name('walk') == [0, 4]
+    assert table.rows_by_id(3) == [2]
+    assert table.rows_by_id(99) == []
+    assert table.row_at_frame(131) == 2
+    assert table.clip_at_frame(152)['name'] == 'walk'
+    assert table.row_at_frame(99) is None
+    assert table.row_at_frame(162) is None
+
+
+def test_row_at_frame_with_unsorted_starts():
+    table = ClipTable()
+    table.append('late', 50, 10, 1)
+    table.append('early', 0, 10, 2)
+    assert table.row_at_frame(55) == 0
+    assert table.row_at_frame(5) == 1
+    assert table.row_at_frame(20) is None
+
+
+def test_records_match_the_dict_format():
+    table = parsed_table()
+    assert table[0] == {'name': 'walk', 'start_frame': 100, 'frame_count': 30, 'end_frame': 129, 'id': 1,
+                        'original_frame_count': 30, 'original_start_frame': 100}
+    assert table[-1]['id'] == 5
+    assert [record['id'] for record in table[1:3]] == [2, 3]
+    with pytest.raises(IndexError):
+        table[5]
+
+
+def test_bytes_round_trip():
+    table = parsed_table()
+    table.relayout()
+
+    restored = ClipTable.from_bytes(table.to_bytes())
+
+    assert list(restored) == list(table)
+    assert list(restored.blend_flags) == list(table.blend_flags)
+    assert restored.row_at_frame(131) == 2
+
+
+def test_bytes_round_trip_empty_table():
+    assert len(ClipTable.from_bytes(ClipTable().to_bytes())) == 0
+
+
+def test_from_bytes_rejects_other_data():
+    with pytest.raises(Exception):
+        ClipTable.from_bytes(tool.zlib.compress(b'XXXX' + bytes(8)))
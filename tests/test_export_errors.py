@@ -0,0 +1,60 @@
+import pytest
+
+from REMayaAnimationExportTool import (
+    classify_export_error, read_export_results, validate_clip, write_export_results,
+)
+
+
+@pytest.mark.parametrize('message, failure_class', [
+    ("Invalid frame range: start -5, 10 frames", 'invalid'),
+    ("Empty animation name", 'invalid'),
+    ("Export cancelled - no objects to export!", 'fatal'),
+    ("No joints found under the export selection!", 'fatal'),
+    ("Plugin fbxmaya is not loaded", 'fatal'),
+    ("[Errno 28] No space left on device", 'fatal'),
+    ("[Errno 30] Read-only file system: 'D:/export/walk_ID1.fbx'", 'fatal'),
+    ("Transfer failed after 4 attempts: [Errno 13] Permission denied", 'transient'),
+    ("Error: FBXExport failed", 'transient'),
+    ("", 'transient'),
+])
+def test_classify_export_error(message, failure_class):
+    assert classify_export_error(message) == failure_class
+
+
+def test_validate_clip_errors_are_not_retried():
+    assert validate_clip({'name': 'walk', 'start_frame': 0, 'frame_count': 10}) is None
+    for anim in ({'name': ' ', 'start_frame': 0, 'frame_count': 10},
+                 {'name': 'walk', 'start_frame': 0, 'frame_count': 0},
+                 {'name': 'walk', 'start_frame': -1, 'frame_count': 10}):
+        assert classify_export_error(validate_clip(anim)) == 'invalid'
+
+
+def export_result(statuses, attempts, failures=None):
+    return {'statuses': statuses, 'attempts': attempts, 'failures': failures or {}}
+
+
+ANIMATIONS = [{'name': 'walk', 'id': 1, 'start_frame': 0, 'frame_count': 10},
+              {'name': 'run', 'id': 2, 'start_frame': 10, 'frame_count': 5}]
+
+
+def test_results_file_round_trip(tmp_path):
+    failure = {'status': 'quarantined', 'failure_class': 'transient', 'error': "FBXExport failed"}
+    write_export_results(str(tmp_path), ANIMATIONS,
+                         export_result(['exported', 'quarantined'], [1, 3], {1: failure}))
+
+    records = {record['file']: record for record in read_export_results(str(tmp_path))}
+    assert records['walk_ID1.fbx']['status'] == 'exported'
+    assert records['run_ID2.fbx']['attempts'] == 3
+    assert records['run_ID2.fbx']['failure_class'] == 'transient'
+
+
+def test_results_merge_keeps_other_clips(tmp_path):
+    write_export_results(str(tmp_path), ANIMATIONS, export_result(['exported', 'failed'], [1, 1]))
+    write_export_results(str(tmp_path), ANIMATIONS[1:], export_result(['exported'], [1]), merge=True)
+
+    statuses = {record['file']: record['status'] for record in read_export_results(str(tmp_path))}
+    assert statuses == {'walk_ID1.fbx': 'exported', 'run_ID2.fbx': 'exported'}
+
+
+def test_missing_results_file(tmp_path):
+    assert read_export_results(str(tmp_path)) == []
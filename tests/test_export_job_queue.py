@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from REMayaAnimationExportTool import ExportJobQueue
+
+
+def job(name, scene):
+    return {'id': name, 'scene': scene}
+
+
+def drain(queue, current_scene=None):
+    names = []
+    while len(queue):
+        next_job = queue.pop(current_scene)
+        names.append(next_job['id'])
+        current_scene = next_job['scene']
+    return names
+
+
+def test_priority_then_submission_order():
+    queue = ExportJobQueue()
+    assert queue.put(job('a', 'one.mb'), priority=1) == 1
+    queue.put(job('b', 'two.mb'), priority=0)
+    queue.put(job('c', 'three.mb'), priority=1)
+    queue.put(job('d', 'four.mb'), priority=0)
+    assert drain(queue) == ['b', 'd', 'a', 'c']
+
+
+def test_prefers_the_open_scene_within_a_priority():
+    queue = ExportJobQueue()
+    queue.put(job('a', 'one.mb'))
+    queue.put(job('b', 'two.mb'))
+    queue.put(job('c', 'one.mb'))
+    queue.put(job('d', 'two.mb'))
+    # 打开的场景是two.mb，先导出它的任务，再按顺序导出one.mb的任务
+    assert drain(queue, 'two.mb') == ['b', 'd', 'a', 'c']
+
+
+def test_open_scene_does_not_override_priority():
+    queue = ExportJobQueue()
+    queue.put(job('a', 'one.mb'), priority=1)
+    queue.put(job('b', 'two.mb'), priority=0)
+    assert queue.pop('one.mb')['id'] == 'b'
+
+
+def test_pop_waits_for_a_job_and_close_wakes_waiters():
+    queue = ExportJobQueue()
+    results = []
+    consumer = threading.Thread(target=lambda: results.append(queue.pop()))
+    consumer.start()
+    queue.put(job('a', 'one.mb'))
+    consumer.join(5)
+    assert [result['id'] for result in results] == ['a']
+
+    waiter = threading.Thread(target=lambda: results.append(queue.pop()))
+    waiter.start()
+    queue.close()
+    waiter.join(5)
+    assert not waiter.is_alive()
+    assert results[-1] is None
+
+
+def test_close_returns_queued_jobs_and_refuses_new_ones():
+    queue = ExportJobQueue()
+    queue.put(job('a', 'one.mb'), priority=1)
+    queue.put(job('b', 'two.mb'), priority=0)
+    assert [dropped['id'] for dropped in queue.close()] == ['b', 'a']
+    assert len(queue) == 0
+    assert queue.pop() is None
+    with pytest.raises(Exception, match="shutting down"):
+        queue.put(job('c', 'one.mb'))
@@ -0,0 +1,81 @@
+import os
+
+from REMayaAnimationExportTool import ExportManifest
+
+FINGERPRINT = {'name': 'walk', 'id': 1, 'start_frame': 0, 'end_frame': 29,
+               'source_hash': 'abc', 'settings_hash': 'def'}
+
+
+def write_clip(export_path, file_name, data=b'fbx data'):
+    with open(os.path.join(export_path, file_name), 'wb') as f:
+        f.write(data)
+
+
+def test_recorded_clip_is_up_to_date_after_reload(tmp_path):
+    write_clip(tmp_path, 'walk_ID1.fbx')
+    manifest = ExportManifest(str(tmp_path))
+    manifest.record('walk_ID1.fbx', FINGERPRINT)
+    manifest.save()
+
+    reloaded = ExportManifest(str(tmp_path))
+    assert reloaded.last_completed == 'walk_ID1.fbx'
+    assert reloaded.is_up_to_date('walk_ID1.fbx', FINGERPRINT)
+
+
+def test_changed_fingerprint_is_stale(tmp_path):
+    write_clip(tmp_path, 'walk_ID1.fbx')
+    manifest = ExportManifest(str(tmp_path))
+    manifest.record('walk_ID1.fbx', FINGERPRINT)
+
+    assert not manifest.is_up_to_date('walk_ID1.fbx', dict(FINGERPRINT, source_hash='changed'))
+    assert not manifest.is_up_to_date('walk_ID1.fbx', dict(FINGERPRINT, end_frame=30))
+    assert not manifest.is_up_to_date('run_ID2.fbx', FINGERPRINT)
+
+
+def test_missing_or_modified_output_is_stale(tmp_path):
+    write_clip(tmp_path, 'walk_ID1.fbx')
+    write_clip(tmp_path, 'run_ID2.fbx')
+    manifest = ExportManifest(str(tmp_path))
+    manifest.record('walk_ID1.fbx', FINGERPRINT)
+    manifest.record('run_ID2.fbx', FINGERPRINT)
+
+    os.remove(os.path.join(tmp_path, 'walk_ID1.fbx'))
+    assert not manifest.is_up_to_date('walk_ID1.fbx', FINGERPRINT)
+
+    # 大小不变但内容和修改时间变化时按校验和判断
+    path = os.path.join(tmp_path, 'run_ID2.fbx')
+    write_clip(tmp_path, 'run_ID2.fbx', b'FBX DATA')
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert not manifest.is_up_to_date('run_ID2.fbx', FINGERPRINT)
+
+    # 只有修改时间变化时仍然是最新的
+    write_clip(tmp_path, 'run_ID2.fbx')
+    os.utime(path, (stat.st_atime, stat.st_mtime + 20))
+    assert manifest.is_up_to_date('run_ID2.fbx', FINGERPRINT)
+
+
+def test_parts_are_merged_and_removed(tmp_path):
+    for part, file_name in (('0', 'walk_ID1.fbx'), ('1', 'run_ID2.fbx')):
+        write_clip(tmp_path, file_name)
+        manifest = ExportManifest(str(tmp_path), part_name=part)
+        manifest.record(file_name, FINGERPRINT)
+        manifest.save()
+    assert not os.path.exists(os.path.join(tmp_path, ExportManifest.FILE_NAME))
+
+    merged = ExportManifest(str(tmp_path))
+    assert set(merged.entries) == {'walk_ID1.fbx', 'run_ID2.fbx'}
+    merged.consolidate()
+
+    assert sorted(os.listdir(tmp_path)) == sorted([ExportManifest.FILE_NAME, 'walk_ID1.fbx', 'run_ID2.fbx'])
+    assert set(ExportManifest(str(tmp_path)).entries) == {'walk_ID1.fbx', 'run_ID2.fbx'}
+
+
+def test_unreadable_or_old_manifest_is_ignored(tmp_path):
+    with open(os.path.join(tmp_path, ExportManifest.FILE_NAME), 'w', encoding='utf-8') as f:
+        f.write('{"version": 0, "clips": {"walk_ID1.fbx": {}}}')
+    assert ExportManifest(str(tmp_path)).entries == {}
+
+    with open(os.path.join(tmp_path, ExportManifest.FILE_NAME), 'w', encoding='utf-8') as f:
+        f.write('not json')
+    assert ExportManifest(str(tmp_path)).entries == {}
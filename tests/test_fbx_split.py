@@ -0,0 +1,261 @@
+import array
+
+import pytest
+
+import REMayaAnimationExportTool as tool
+from REMayaAnimationExportTool import FBXDocument, FBXNode
+
+FPS = 30.0
+
+
+def tick(frame):
+    return tool.frame_to_fbx_time(frame, FPS)
+
+
+def p70(name, type_name, value, code):
+    """Properties70中的一个P节点"""
+    return FBXNode('P', [('S', name), ('S', type_name), ('S', b''), ('S', b'A'), (code, value)])
+
+
+def make_timeline_document(version):
+    """30帧的整段时间轴: 一条逐帧的曲线（两段关键帧属性）和一条只有第0帧关键帧的曲线"""
+    frames = range(30)
+    curve = FBXNode('AnimationCurve', [('L', 100), ('S', b'\x00\x01AnimCurve'), ('S', b'')], [
+        FBXNode('Default', [('D', 0.0)]),
+        FBXNode('KeyVer', [('I', 4009)]),
+        FBXNode('KeyTime', [('l', array.array('q', [tick(f) for f in frames]))]),
+        FBXNode('KeyValueFloat', [('f', array.array('f', [float(f) for f in frames]))]),
+        FBXNode('KeyAttrFlags', [('i', array.array('i', [24840, 8456]))]),
+        FBXNode('KeyAttrDataFloat', [('f', array.array('f', [0, 0, 1, 0, 0, 0, 2, 0]))]),
+        FBXNode('KeyAttrRefCount', [('i', array.array('i', [15, 15]))]),
+    ])
+    constant = FBXNode('AnimationCurve', [('L', 101), ('S', b'\x00\x01AnimCurve'), ('S', b'')], [
+        FBXNode('KeyTime', [('l', array.array('q', [tick(0)]))]),
+        FBXNode('KeyValueFloat', [('f', array.array('f', [5.0]))]),
+        FBXNode('KeyAttrFlags', [('i', array.array('i', [1]))]),
+        FBXNode('KeyAttrDataFloat', [('f', array.array('f', [0, 0, 0, 0]))]),
+        FBXNode('KeyAttrRefCount', [('i', array.array('i', [1]))]),
+    ])
+    stack = FBXNode('AnimationStack', [('L', 1), ('S', b'Timeline\x00\x01AnimStack'), ('S', b'')], [
+        FBXNode('Properties70', [], [p70(b'LocalStart', b'KTime', tick(0), 'L'),
+                                     p70(b'LocalStop', b'KTime', tick(29), 'L')])
+    ])
+    settings = FBXNode('GlobalSettings', [], [
+        FBXNode('Version', [('I', 1000)]),
+        FBXNode('Properties70', [], [p70(b'TimeMode', b'enum', 6, 'I'),
+                                     p70(b'TimeSpanStart', b'KTime', 0, 'L'),
+                                     p70(b'TimeSpanStop', b'KTime', tick(29), 'L')]),
+    ])
+    references = FBXNode('References', [])
+    references.has_sentinel = True
+    takes = FBXNode('Takes', [], [
+        FBXNode('Current', [('S', b'Timeline')]),
+        FBXNode('Take', [('S', b'Timeline')], [
+            FBXNode('FileName', [('S', b'Timeline.tak')]),
+            FBXNode('LocalTime', [('L', 0), ('L', tick(29))]),
+        ]),
+    ])
+    return FBXDocument(version, [
+        FBXNode('FBXHeaderExtension', [], [FBXNode('FBXVersion', [('I', version)])]),
+        settings,
+        references,
+        FBXNode('Objects', [], [stack, curve, constant]),
+        takes,
+    ])
+
+
+@pytest.fixture(params=[7400, 7500])
+def timeline_path(request, tmp_path):
+    path = str(tmp_path / f"timeline_{request.param}.fbx")
+    tool.write_fbx(path, make_timeline_document(request.param))
+    return path
+
+
+def test_round_trip_keeps_structure_and_bytes(timeline_path, tmp_path):
+    document = tool.read_fbx(timeline_path)
+    try:
+        assert document.version in (7400, 7500)
+        assert [node.name for node in document.nodes] == [
+            'FBXHeaderExtension', 'GlobalSettings', 'References', 'Objects', 'Takes']
+        assert document.find('References').has_sentinel
+        assert tool.fbx_frame_rate(document) == FPS
+
+        curve = document.find('Objects').children[1]
+        assert list(curve.find('KeyTime').value()) == [tick(f) for f in range(30)]
+        assert curve.find('Default').value() == 0.0
+
+        # 没有修改时原样复制属性字节，文件完全相同
+        copy_path = str(tmp_path / "copy.fbx")
+        tool.write_fbx(copy_path, document)
+        with open(timeline_path, 'rb') as original, open(copy_path, 'rb') as copy:
+            assert original.read() == copy.read()
+    finally:
+        document.close()
+
+
+def test_read_rejects_non_binary_fbx(tmp_path):
+    path = tmp_path / "ascii.fbx"
+    path.write_bytes(b"; FBX 7.4.0 project file\n")
+    with pytest.raises(ValueError):
+        tool.read_fbx(str(path))
+
+
+def test_split_clip_slices_keys_and_renames_take(timeline_path, tmp_path):
+    anim = {'name': 'walk', 'id': 7, 'start_frame': 10, 'end_frame': 19}
+    clip_path = str(tmp_path / "walk_ID7.fbx")
+    document = tool.read_fbx(timeline_path)
+    try:
+        tool.split_fbx_clip(document, anim, clip_path)
+    finally:
+        document.close()
+
+    clip = tool.read_fbx(clip_path)
+    try:
+        stack, curve, _ = clip.find('Objects').children
+        assert list(curve.find('KeyTime').value()) == [tick(f) for f in range(10, 20)]
+        assert list(curve.find('KeyValueFloat').value()) == [float(f) for f in range(10, 20)]
+        # 关键帧属性引用按截取的范围重新计算（两段各5个）
+        assert list(curve.find('KeyAttrRefCount').value()) == [5, 5]
+        assert list(curve.find('KeyAttrFlags').value()) == [24840, 8456]
+        assert list(curve.find('KeyAttrDataFloat').value()) == [0, 0, 1, 0, 0, 0, 2, 0]
+
+        assert stack.value(1) == b'walk_ID7\x00\x01AnimStack'
+        stack_properties = tool.fbx_properties70(stack)
+        assert stack_properties[b'LocalStart'].value(4) == tick(10)
+        assert stack_properties[b'LocalStop'].value(4) == tick(19)
+        settings = tool.fbx_properties70(clip.find('GlobalSettings'))
+        assert settings[b'TimeSpanStart'].value(4) == tick(10)
+        assert settings[b'TimeSpanStop'].value(4) == tick(19)
+
+        takes = clip.find('Takes')
+        assert takes.find('Current').value() == b'walk_ID7'
+        take = takes.find('Take')
+        assert take.value() == b'walk_ID7'
+        assert take.find('FileName').value() == b'walk_ID7.tak'
+        assert take.find('LocalTime').properties == [('L', tick(10)), ('L', tick(19))]
+    finally:
+        clip.close()
+
+
+def test_split_clip_attribute_runs_inside_one_run(timeline_path, tmp_path):
+    anim = {'name': 'idle', 'id': 1, 'start_frame': 16, 'end_frame': 20}
+    clip_path = str(tmp_path / "idle_ID1.fbx")
+    document = tool.read_fbx(timeline_path)
+    try:
+        tool.split_fbx_clip(document, anim, clip_path)
+    finally:
+        document.close()
+
+    clip = tool.read_fbx(clip_path)
+    try:
+        curve = clip.find('Objects').children[1]
+        # 第16-20帧都在第二段关键帧属性中
+        assert list(curve.find('KeyAttrRefCount').value()) == [5]
+        assert list(curve.find('KeyAttrFlags').value()) == [8456]
+        assert list(curve.find('KeyAttrDataFloat').value()) == [0, 0, 2, 0]
+    finally:
+        clip.close()
+
+
+def test_split_clip_without_keys_in_range_holds_last_value(timeline_path, tmp_path):
+    anim = {'name': 'pose', 'id': 3, 'start_frame': 10, 'end_frame': 19}
+    clip_path = str(tmp_path / "pose_ID3.fbx")
+    document = tool.read_fbx(timeline_path)
+    try:
+        tool.split_fbx_clip(document, anim, clip_path)
+    finally:
+        document.close()
+
+    clip = tool.read_fbx(clip_path)
+    try:
+        constant = clip.find('Objects').children[2]
+        assert list(constant.find('KeyTime').value()) == [tick(10)]
+        assert list(constant.find('KeyValueFloat').value()) == [5.0]
+        assert list(constant.find('KeyAttrRefCount').value()) == [1]
+    finally:
+        clip.close()
+
+
+def split_animations():
+    return [{'name': name, 'id': i + 1, 'start_frame': i * 10, 'end_frame': i * 10 + 9}
+            for i, name in enumerate(['a', 'b', 'c'])]
+
+
+def first_key_values(path):
+    document = tool.read_fbx(path)
+    try:
+        return list(document.find('Objects').children[1].find('KeyValueFloat').value())
+    finally:
+        document.close()
+
+
+def test_split_clips_in_spawned_processes(timeline_path, tmp_path, capsys):
+    errors = tool.split_fbx_clips(timeline_path, split_animations(), str(tmp_path), workers=2)
+    assert errors == [None, None, None]
+    assert "splitting in this process" not in capsys.readouterr().out
+    assert first_key_values(str(tmp_path / "c_ID3.fbx")) == [float(f) for f in range(20, 30)]
+
+
+def test_split_clips_falls_back_when_pool_is_unavailable(timeline_path, tmp_path, monkeypatch, capsys):
+    def unavailable():
+        raise OSError("no processes")
+    monkeypatch.setattr(tool, '_split_process_context', unavailable)
+
+    errors = tool.split_fbx_clips(timeline_path, split_animations(), str(tmp_path), workers=4)
+    assert errors == [None, None, None]
+    assert "splitting in this process" in capsys.readouterr().out
+    assert first_key_values(str(tmp_path / "b_ID2.fbx")) == [float(f) for f in range(10, 20)]
+
+
+def test_split_clips_finishes_in_process_after_broken_pool(timeline_path, tmp_path, monkeypatch):
+    class BrokenFuture:
+        def result(self):
+            raise tool.BrokenProcessPool("worker died")
+
+    class BrokenPool:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            return False
+
+        def submit(self, *args):
+            return BrokenFuture()
+
+    monkeypatch.setattr(tool, 'ProcessPoolExecutor', BrokenPool)
+    monkeypatch.setattr(tool, 'as_completed', lambda futures: list(futures))
+
+    errors = tool.split_fbx_clips(timeline_path, split_animations(), str(tmp_path), workers=2)
+    assert errors == [None, None, None]
+    assert first_key_values(str(tmp_path / "a_ID1.fbx")) == [float(f) for f in range(10)]
+
+
+def test_duplicate_copy_gets_its_own_take_and_frames(timeline_path, tmp_path):
+    source = {'name': 'walk', 'id': 7, 'start_frame': 10, 'end_frame': 19}
+    duplicate = {'name': 'walk_again', 'id': 9, 'start_frame': 40, 'end_frame': 49}
+    source_path = str(tmp_path / "walk_ID7.fbx")
+    duplicate_path = str(tmp_path / "walk_again_ID9.fbx")
+    document = tool.read_fbx(timeline_path)
+    try:
+        tool.split_fbx_clip(document, source, source_path)
+    finally:
+        document.close()
+
+    tool.copy_duplicate_export(source_path, duplicate_path, source, duplicate)
+
+    clip = tool.read_fbx(duplicate_path)
+    try:
+        stack, curve, constant = clip.find('Objects').children
+        assert list(curve.find('KeyTime').value()) == [tick(f) for f in range(40, 50)]
+        assert list(curve.find('KeyValueFloat').value()) == [float(f) for f in range(10, 20)]
+        assert list(constant.find('KeyTime').value()) == [tick(40)]
+        assert stack.value(1) == b'walk_again_ID9\x00\x01AnimStack'
+        assert tool.fbx_properties70(stack)[b'LocalStart'].value(4) == tick(40)
+        take = clip.find('Takes').find('Take')
+        assert take.value() == b'walk_again_ID9'
+        assert take.find('LocalTime').properties == [('L', tick(40)), ('L', tick(49))]
+    finally:
+        clip.close()
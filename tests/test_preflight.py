@@ -0,0 +1,80 @@
+from REMayaAnimationExportTool import ClipTable, PreflightReport, check_clip_ranges
+
+
+def clip(name, start_frame, frame_count, anim_id):
+    return {'name': name, 'start_frame': start_frame, 'frame_count': frame_count, 'id': anim_id}
+
+
+def test_contiguous_list_has_no_issues():
+    report = check_clip_ranges([clip('a', 0, 10, 1), clip('b', 10, 5, 2), clip('c', 15, 5, 3)], (0, 19))
+    assert report.issue_count == 0
+    assert "0 issues" in report.report()
+
+
+def test_overlaps_and_gaps():
+    report = check_clip_ranges([clip('a', 0, 10, 1), clip('b', 5, 10, 2), clip('c', 30, 5, 3)])
+    assert report.counts['overlap'] == 1
+    assert report.counts['gap'] == 1
+    assert "15 frames before c" in report.samples['gap'][0]
+    # 没有关键帧范围时不检查超出范围
+    assert report.counts['out_of_range'] == 0
+    assert report.counts['total_length'] == 0
+
+
+def test_overlap_with_a_long_earlier_clip():
+    # b在a内部结束，c仍然和a重叠
+    report = check_clip_ranges([clip('a', 0, 100, 1), clip('b', 10, 10, 2), clip('c', 50, 10, 3)])
+    assert report.counts['overlap'] == 2
+    assert all("overlaps a" in message for message in report.samples['overlap'])
+
+
+def test_ranges_outside_the_keyed_animation():
+    report = check_clip_ranges([clip('a', 0, 10, 1), clip('b', 10, 10, 2)], (5, 40))
+    assert report.counts['out_of_range'] == 1
+    assert report.samples['out_of_range'][0].startswith("a (ID: 1")
+    assert report.counts['total_length'] == 1
+    assert "keys end at frame 40" in report.samples['total_length'][0]
+
+
+def test_frame_count_mismatch_skips_blend_poses():
+    report = check_clip_ranges([clip('a', 0, 12, 1), clip('x_blend1_pose_2', 10, 7, 2), clip('b', 12, 5, 3)])
+    assert report.counts['length_mismatch'] == 1
+    assert "a (ID: 1) has 12 frames" in report.samples['length_mismatch'][0]
+
+
+def test_samples_are_limited():
+    animations = [clip(f"c{i}", i * 20, 10, i) for i in range(PreflightReport.MAX_SAMPLES + 5)]
+    report = check_clip_ranges(animations)
+    assert report.counts['gap'] == PreflightReport.MAX_SAMPLES + 4
+    assert len(report.samples['gap']) == PreflightReport.MAX_SAMPLES
+    assert "... and 4 more" in report.report()
+
+
+def test_empty_list():
+    report = check_clip_ranges([], (0, 10))
+    assert report.issue_count == 0
+    assert report.clip_count == 0
+
+
+def test_subset_of_a_contiguous_list_has_no_issues():
+    table = ClipTable.from_records([clip('a', 0, 10, 1), clip('b', 10, 5, 2), clip('c', 15, 5, 3), clip('d', 20, 5, 4)])
+    report = check_clip_ranges(table.subset([0, 2]), (0, 30))
+    assert report.issue_count == 0
+    assert report.clip_count == 2
+
+
+def test_subset_only_reports_its_own_clips():
+    table = ClipTable.from_records([clip('a', 0, 10, 1), clip('b', 5, 10, 2), clip('c', 30, 5, 3),
+                                    clip('d', 35, 5, 4), clip('e', 60, 5, 5)])
+    report = check_clip_ranges(table.subset([1, 3]), (0, 50))
+    # b和a重叠，b和d之后有间隔；a的帧数不符、e超出关键帧范围和列表总长度与选中的片段无关
+    assert report.counts == {'overlap': 1, 'gap': 2, 'out_of_range': 0, 'length_mismatch': 2, 'total_length': 0}
+    assert report.samples['overlap'][0].startswith("b (ID: 2")
+
+
+def test_subset_of_a_subset_checks_the_full_list():
+    table = ClipTable.from_records([clip('a', 0, 10, 1), clip('b', 10, 5, 2), clip('c', 15, 5, 3)])
+    subset = table.subset([0, 2]).subset([1])
+    assert subset.source is table
+    assert subset.source_rows == [2]
+    assert check_clip_ranges(subset, (0, 19)).issue_count == 0